@@ -0,0 +1,26 @@
+"""Initial schema
+
+Revision ID: 15da8818f4a9
+Revises: 
+Create Date: 2026-10-19 08:00:00.000000
+
+Existing databases are stamped with this revision. The tables it stands
+for are created by the application on startup (SQLModel create_all), so
+upgrading from an empty database starts here without doing anything.
+
+"""
+
+
+# revision identifiers, used by Alembic.
+revision = '15da8818f4a9'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
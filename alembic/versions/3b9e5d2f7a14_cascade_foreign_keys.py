@@ -0,0 +1,90 @@
+"""Recreate foreign keys with ON DELETE CASCADE and index the referencing columns
+
+Revision ID: 3b9e5d2f7a14
+Revises: 7c2e4b1a9d30
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e5d2f7a14'
+down_revision = '7c2e4b1a9d30'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, referred table)
+CASCADE_FOREIGN_KEYS = [
+    ("article", "category_id", "category"),
+    ("article", "author_id", "user"),
+    ("articletaglink", "article_id", "article"),
+    ("articletaglink", "tag_id", "tag"),
+    ("productarticlelink", "product_id", "product"),
+    ("productarticlelink", "article_id", "article"),
+    ("comment", "article_id", "article"),
+    ("comment", "author_id", "user"),
+    ("systemlog", "user_id", "user"),
+]
+
+# Referencing columns that are not already the leading column of a primary key
+INDEXED_COLUMNS = [
+    ("article", "category_id"),
+    ("article", "author_id"),
+    ("articletaglink", "tag_id"),
+    ("productarticlelink", "article_id"),
+    ("comment", "article_id"),
+    ("comment", "author_id"),
+    ("systemlog", "user_id"),
+]
+
+
+def _set_ondelete(ondelete):
+    bind = op.get_bind()
+    # SQLite cannot alter constraints in place; the cascade engine deletes
+    # children explicitly for tables that lack ON DELETE CASCADE
+    if bind.dialect.name == "sqlite":
+        return
+
+    inspector = sa.inspect(bind)
+    for table, column, referred in CASCADE_FOREIGN_KEYS:
+        if not inspector.has_table(table):
+            continue
+        for fk in inspector.get_foreign_keys(table):
+            if fk["constrained_columns"] != [column] or fk["referred_table"] != referred:
+                continue
+            current = ((fk.get("options") or {}).get("ondelete") or "").upper()
+            if current == (ondelete or ""):
+                continue
+            name = fk["name"] or f"{table}_{column}_fkey"
+            op.drop_constraint(fk["name"], table, type_="foreignkey")
+            op.create_foreign_key(name, table, referred, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade():
+    _set_ondelete("CASCADE")
+
+    inspector = sa.inspect(op.get_bind())
+    for table, column in INDEXED_COLUMNS:
+        if not inspector.has_table(table):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        name = f"ix_{table}_{column}"
+        if name not in existing:
+            op.create_index(name, table, [column])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, column in INDEXED_COLUMNS:
+        if not inspector.has_table(table):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        name = f"ix_{table}_{column}"
+        if name in existing:
+            op.drop_index(name, table_name=table)
+
+    _set_ondelete(None)
@@ -0,0 +1,66 @@
+"""Add the job table for the background job queue
+
+Revision ID: 5d8a1c3e9f27
+Revises: 3b9e5d2f7a14
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8a1c3e9f27'
+down_revision = '3b9e5d2f7a14'
+branch_labels = None
+depends_on = None
+
+
+def _json():
+    return sa.JSON().with_variant(postgresql.JSONB(), "postgresql", "cockroachdb")
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("job"):
+        return
+
+    op.create_table(
+        "job",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("type", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=False),
+        sa.Column("description", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+        sa.Column("status", sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_at", sa.DateTime(), nullable=False),
+        sa.Column("processed", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("payload", _json(), nullable=False),
+        sa.Column("result", _json(), nullable=True),
+        sa.Column("locked_by", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True),
+        sa.Column("lease_expires_at", sa.DateTime(), nullable=True),
+        sa.Column("dedupe_key", sqlmodel.sql.sqltypes.AutoString(length=200), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("dedupe_key"),
+    )
+    op.create_index("ix_job_type", "job", ["type"])
+    op.create_index("ix_job_status_run_at", "job", ["status", "run_at"])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("job"):
+        return
+
+    op.drop_index("ix_job_status_run_at", table_name="job")
+    op.drop_index("ix_job_type", table_name="job")
+    op.drop_table("job")
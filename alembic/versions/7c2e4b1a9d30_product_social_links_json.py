@@ -0,0 +1,68 @@
+"""Store product social_links as a native JSON column
+
+Revision ID: 7c2e4b1a9d30
+Revises: 15da8818f4a9
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e4b1a9d30'
+down_revision = '15da8818f4a9'
+branch_labels = None
+depends_on = None
+
+
+def _product_table_exists(bind):
+    return sa.inspect(bind).has_table("product")
+
+
+def _alter_on_cockroachdb(type_and_using):
+    # CockroachDB changes column types only outside explicit transactions,
+    # and converting between types needs the general ALTER COLUMN TYPE
+    with op.get_context().autocommit_block():
+        op.execute("SET enable_experimental_alter_column_type_general = true")
+        op.execute(f"ALTER TABLE product ALTER COLUMN social_links TYPE {type_and_using}")
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Fresh databases get the JSON column from create_all
+    if not _product_table_exists(bind):
+        return
+
+    # Empty strings are not valid JSON documents
+    op.execute("UPDATE product SET social_links = NULL WHERE social_links = ''")
+
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        op.execute(
+            "ALTER TABLE product ALTER COLUMN social_links TYPE JSONB "
+            "USING social_links::jsonb"
+        )
+    elif dialect == "cockroachdb":
+        _alter_on_cockroachdb("JSONB USING social_links::JSONB")
+    elif dialect in ("mysql", "mariadb"):
+        op.execute("ALTER TABLE product MODIFY social_links JSON NULL")
+    # SQLite stores JSON as text, so existing values are already readable
+
+
+def downgrade():
+    bind = op.get_bind()
+    if not _product_table_exists(bind):
+        return
+
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        op.execute(
+            "ALTER TABLE product ALTER COLUMN social_links TYPE VARCHAR "
+            "USING social_links::text"
+        )
+    elif dialect == "cockroachdb":
+        _alter_on_cockroachdb("STRING USING social_links::STRING")
+    elif dialect in ("mysql", "mariadb"):
+        op.execute("ALTER TABLE product MODIFY social_links TEXT NULL")
@@ -0,0 +1,46 @@
+"""Add the mediablob table for content-addressed uploads
+
+Revision ID: 8e4f2a6b1c53
+Revises: 5d8a1c3e9f27
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4f2a6b1c53'
+down_revision = '5d8a1c3e9f27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("mediablob"):
+        return
+
+    op.create_table(
+        "mediablob",
+        sa.Column("digest", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column("path", sqlmodel.sql.sqltypes.AutoString(length=500), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("content_type", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("digest"),
+        sa.UniqueConstraint("path"),
+    )
+    op.create_index("ix_mediablob_ref_count", "mediablob", ["ref_count"])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("mediablob"):
+        return
+
+    op.drop_index("ix_mediablob_ref_count", table_name="mediablob")
+    op.drop_table("mediablob")
@@ -0,0 +1,45 @@
+"""Add the mediaobject table for the R2 media inventory
+
+Revision ID: a1c7e3f9d245
+Revises: 8e4f2a6b1c53
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c7e3f9d245'
+down_revision = '8e4f2a6b1c53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("mediaobject"):
+        return
+
+    op.create_table(
+        "mediaobject",
+        sa.Column("key", sqlmodel.sql.sqltypes.AutoString(length=1024), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("content_type", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True),
+        sa.Column("extension", sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column("last_modified", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index("ix_mediaobject_last_modified", "mediaobject", ["last_modified"])
+    op.create_index("ix_mediaobject_extension_size", "mediaobject", ["extension", "size"])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("mediaobject"):
+        return
+
+    op.drop_index("ix_mediaobject_extension_size", table_name="mediaobject")
+    op.drop_index("ix_mediaobject_last_modified", table_name="mediaobject")
+    op.drop_table("mediaobject")
@@ -0,0 +1,46 @@
+"""Index the columns the admin dashboard sorts by
+
+Revision ID: c4e8a2d6f1b9
+Revises: a1c7e3f9d245
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2d6f1b9'
+down_revision = 'a1c7e3f9d245'
+branch_labels = None
+depends_on = None
+
+
+# Top articles by views, and the most recent articles and comments
+INDEXED_COLUMNS = [
+    ("article", "views"),
+    ("article", "created_at"),
+    ("comment", "created_at"),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, column in INDEXED_COLUMNS:
+        if not inspector.has_table(table):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        name = f"ix_{table}_{column}"
+        if name not in existing:
+            op.create_index(name, table, [column])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, column in INDEXED_COLUMNS:
+        if not inspector.has_table(table):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        name = f"ix_{table}_{column}"
+        if name in existing:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,82 @@
+"""Add the statsrollup table, article.published_at, and index the columns the rollups count by
+
+Revision ID: e7b3d9f2a4c6
+Revises: c4e8a2d6f1b9
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3d9f2a4c6'
+down_revision = 'c4e8a2d6f1b9'
+branch_labels = None
+depends_on = None
+
+
+# Published articles, logins and new media blobs by time
+INDEXES = [
+    ("article", "ix_article_published_at", ["published_at"]),
+    ("systemlog", "ix_systemlog_action_created_at", ["action", "created_at"]),
+    ("mediablob", "ix_mediablob_created_at", ["created_at"]),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("statsrollup"):
+        op.create_table(
+            "statsrollup",
+            sa.Column("period", sqlmodel.sql.sqltypes.AutoString(length=10), nullable=False),
+            sa.Column("metric", sqlmodel.sql.sqltypes.AutoString(length=50), nullable=False),
+            sa.Column("bucket_start", sa.DateTime(), nullable=False),
+            sa.Column("value", sa.BigInteger(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("period", "metric", "bucket_start"),
+        )
+
+    if inspector.has_table("article"):
+        article_columns = {column["name"] for column in inspector.get_columns("article")}
+        if "published_at" not in article_columns:
+            op.add_column("article", sa.Column("published_at", sa.DateTime(), nullable=True))
+            # Articles published so far count as published when created
+            article = sa.table(
+                "article",
+                sa.column("published", sa.Boolean()),
+                sa.column("published_at", sa.DateTime()),
+                sa.column("created_at", sa.DateTime()),
+            )
+            op.execute(
+                article.update()
+                .where(article.c.published == sa.true())
+                .values(published_at=article.c.created_at)
+            )
+
+    for table, name, columns in INDEXES:
+        if not inspector.has_table(table):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, name, columns in INDEXES:
+        if not inspector.has_table(table):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        if name in existing:
+            op.drop_index(name, table_name=table)
+
+    if inspector.has_table("article"):
+        article_columns = {column["name"] for column in inspector.get_columns("article")}
+        if "published_at" in article_columns:
+            with op.batch_alter_table("article") as batch_op:
+                batch_op.drop_column("published_at")
+
+    if inspector.has_table("statsrollup"):
+        op.drop_table("statsrollup")
@@ -7,6 +7,7 @@ from app.api.comments import router as comments_router
 from app.api.tags import router as tags_router
 from app.api.products import router as products_router
 from app.api.upload import router as upload_router
+from app.api.jobs import router as jobs_router
 
 api_router = APIRouter(prefix="/api")
 
@@ -16,4 +17,5 @@ api_router.include_router(articles_router)
 api_router.include_router(comments_router)
 api_router.include_router(tags_router)
 api_router.include_router(products_router)
-api_router.include_router(upload_router) 
\ No newline at end of file
+api_router.include_router(upload_router)
+api_router.include_router(jobs_router) 
\ No newline at end of file
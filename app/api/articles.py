@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, Form, UploadFile, File, Q
 from sqlmodel import Session, select, delete, or_, func
 from sqlalchemy.orm import selectinload
 from typing import List, Optional, Generic, TypeVar
-from pydantic import BaseModel
+from uuid import UUID
+from pydantic import BaseModel, Field
 import logging
 
 from app.database import get_db
@@ -13,12 +14,16 @@ from app.models import (
     ArticleUpdate,
     Category,
     ArticleTagLink,
+    JobRead,
     Product,
     ProductRead
 )
 from app.auth.deps import get_current_active_user, get_current_active_superuser
 from app.utils.text import generate_unique_slug
 from app.utils.media import save_upload
+from app.utils.links import link_products_to_article, unlink_products_from_article, get_article_product_ids
+from app.utils.tags import resolve_tags, sync_article_tags
+from app.utils.cascade import schedule_deletion
 
 router = APIRouter(prefix="/articles", tags=["articles"])
 
@@ -29,6 +34,34 @@ class PaginatedResponse(BaseModel):
     per_page: int
     total_pages: int
 
+class ProductIdsRequest(BaseModel):
+    product_ids: List[UUID] = Field(..., max_length=10000)
+
+class LinkResult(BaseModel):
+    linked: int
+    missing: List[UUID]
+
+class UnlinkResult(BaseModel):
+    unlinked: int
+
+def _apply_article_tags(
+    db: Session,
+    article_id: UUID,
+    tag_ids: Optional[List[UUID]],
+    tag_names: Optional[List[str]]
+):
+    """Replace an article's tags with the given ids and names, applying only the diff."""
+    try:
+        resolved, missing = resolve_tags(db, tag_ids, tag_names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tags not found: {', '.join(str(tag_id) for tag_id in missing)}"
+        )
+    sync_article_tags(db, article_id, resolved)
+
 @router.post("/", response_model=ArticleRead)
 async def create_article(
     article: ArticleCreate, 
@@ -45,6 +78,11 @@ async def create_article(
         article_obj.slug = generate_unique_slug(article_obj.title, existing_slugs)
     
     db.add(article_obj)
+    
+    if article.tag_ids or article.tag_names:
+        db.flush()
+        _apply_article_tags(db, article_obj.id, article.tag_ids, article.tag_names)
+    
     db.commit()
     db.refresh(article_obj)
     return article_obj
@@ -53,12 +91,14 @@ async def create_article(
 async def create_article_with_file(
     title: str = Form(...),
     content: str = Form(...),
-    category_id: str = Form(...),
+    category_id: UUID = Form(...),
     featured_image: Optional[UploadFile] = File(None),
     excerpt: Optional[str] = Form(None),
     footer_content: Optional[str] = Form(None),
     slug: Optional[str] = Form(None),
     published: bool = Form(False),
+    tag_ids: Optional[List[UUID]] = Form(None),
+    tag_names: Optional[List[str]] = Form(None),
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -86,6 +126,11 @@ async def create_article_with_file(
     )
     
     db.add(article)
+    
+    if tag_ids or tag_names:
+        db.flush()
+        _apply_article_tags(db, article.id, tag_ids, tag_names)
+    
     db.commit()
     db.refresh(article)
     return article
@@ -208,7 +253,7 @@ async def get_articles(
     )
 
 @router.get("/{article_id}", response_model=ArticleRead)
-async def get_article(article_id: str, db: Session = Depends(get_db)):
+async def get_article(article_id: UUID, db: Session = Depends(get_db)):
     article = db.execute(
         select(Article)
         .where(Article.id == article_id)
@@ -243,7 +288,7 @@ async def get_article_by_slug(slug: str, db: Session = Depends(get_db)):
 
 @router.put("/{article_id}", response_model=ArticleRead)
 async def update_article(
-    article_id: str,
+    article_id: UUID,
     article_update: ArticleUpdate,
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -257,6 +302,8 @@ async def update_article(
         raise HTTPException(status_code=403, detail="Not authorized to update this article")
     
     article_data = article_update.dict(exclude_unset=True)
+    tag_ids = article_data.pop("tag_ids", None)
+    tag_names = article_data.pop("tag_names", None)
     
     # If title is updated but slug is not provided, regenerate slug
     if "title" in article_data and "slug" not in article_data:
@@ -267,6 +314,10 @@ async def update_article(
     for key, value in article_data.items():
         setattr(article, key, value)
     
+    # Only retag when tags were sent; an empty list clears them
+    if tag_ids is not None or tag_names is not None:
+        _apply_article_tags(db, article.id, tag_ids, tag_names)
+    
     db.add(article)
     db.commit()
     db.refresh(article)
@@ -274,15 +325,17 @@ async def update_article(
 
 @router.put("/{article_id}/upload", response_model=ArticleRead)
 async def update_article_with_file(
-    article_id: str,
+    article_id: UUID,
     title: str = Form(...),
     content: str = Form(...),
-    category_id: str = Form(...),
+    category_id: UUID = Form(...),
     featured_image: Optional[UploadFile] = File(None),
     excerpt: Optional[str] = Form(None),
     footer_content: Optional[str] = Form(None),
     slug: Optional[str] = Form(None),
     published: bool = Form(False),
+    tag_ids: Optional[List[UUID]] = Form(None),
+    tag_names: Optional[List[str]] = Form(None),
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -312,6 +365,9 @@ async def update_article_with_file(
     article.footer_content = footer_content if footer_content and footer_content.strip() else None
     article.published = published
     
+    if tag_ids is not None or tag_names is not None:
+        _apply_article_tags(db, article.id, tag_ids, tag_names)
+    
     db.add(article)
     db.commit()
     db.refresh(article)
@@ -319,7 +375,7 @@ async def update_article_with_file(
 
 @router.delete("/{article_id}", status_code=204)
 async def delete_article(
-    article_id: str,
+    article_id: UUID,
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -354,34 +410,56 @@ async def delete_article(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting article: {str(e)}")
 
-@router.delete("/", status_code=204)
+@router.delete("/", status_code=202, response_model=JobRead)
 async def delete_all_articles(
     current_user = Depends(get_current_active_superuser),
     db: Session = Depends(get_db)
 ):
-    try:
-        # Import these models here to avoid circular imports
-        from app.models import Comment, ArticleTagLink, ProductArticleLink
-        
-        # Get all article IDs
-        article_ids = [row[0] for row in db.execute(select(Article.id)).all()]
-        
-        if article_ids:
-            # Delete all article-tag links
-            db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id.in_(article_ids)))
-            
-            # Delete all article-product links
-            db.execute(delete(ProductArticleLink).where(ProductArticleLink.article_id.in_(article_ids)))
-            
-            # Delete all comments on all articles
-            db.execute(delete(Comment).where(Comment.article_id.in_(article_ids)))
-        
-        # Delete all articles
-        db.execute(delete(Article))
-        
-        db.commit()
-        return None
-    except Exception as e:
-        # Roll back transaction on error
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting all articles: {str(e)}") 
\ No newline at end of file
+    """Delete all articles with their comments and links in the background."""
+    job = schedule_deletion(db, Article, "Delete all articles")
+    db.commit()
+    return job
+
+def _ensure_article_exists(db: Session, article_id: UUID):
+    """Raise 404 unless the article exists, using an id-only lookup."""
+    exists = db.execute(select(Article.id).where(Article.id == article_id)).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Article not found")
+
+@router.get("/{article_id}/products", response_model=List[UUID])
+async def get_article_products(article_id: UUID, db: Session = Depends(get_db)):
+    product_ids = get_article_product_ids(db, article_id)
+    
+    # An empty result may just mean the article has no products
+    if not product_ids:
+        _ensure_article_exists(db, article_id)
+    
+    return product_ids
+
+@router.post("/{article_id}/products/link", response_model=LinkResult)
+async def link_article_products(
+    article_id: UUID,
+    payload: ProductIdsRequest,
+    current_user = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db)
+):
+    """Link many products to an article in one statement; existing links are kept."""
+    _ensure_article_exists(db, article_id)
+    
+    linked, missing = link_products_to_article(db, article_id, payload.product_ids)
+    db.commit()
+    
+    return LinkResult(linked=linked, missing=missing)
+
+@router.post("/{article_id}/products/unlink", response_model=UnlinkResult)
+async def unlink_article_products(
+    article_id: UUID,
+    payload: ProductIdsRequest,
+    current_user = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db)
+):
+    """Unlink many products from an article in one statement."""
+    unlinked = unlink_products_from_article(db, article_id, payload.product_ids)
+    db.commit()
+    
+    return UnlinkResult(unlinked=unlinked)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, delete, func
+from sqlmodel import Session, select, func
 from typing import List
+from uuid import UUID
 from pydantic import BaseModel
 
 from app.database import get_db
-from app.models import Category, CategoryCreate, CategoryRead, CategoryUpdate, Article
+from app.models import Category, CategoryCreate, CategoryRead, CategoryUpdate, Article, JobRead
 from app.auth.deps import get_current_active_user, get_current_active_superuser
+from app.utils.cascade import schedule_deletion
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
@@ -79,87 +81,27 @@ async def update_category(
     db.refresh(category)
     return category
 
-@router.delete("/{category_id}", status_code=204)
+@router.delete("/{category_id}", status_code=202, response_model=JobRead)
 async def delete_category(
-    category_id: str,
+    category_id: UUID,
     current_user = Depends(get_current_active_superuser),
     db: Session = Depends(get_db)
 ):
-    try:
-        category = db.get(Category, category_id)
-        if not category:
-            raise HTTPException(status_code=404, detail="Category not found")
-        
-        # Get category name for logging
-        category_name = category.name
-        
-        # Get all articles in this category
-        from app.models import Article, Comment
-
-        # Find all articles in this category
-        article_query = select(Article.id).where(Article.category_id == category_id)
-        article_ids = [row[0] for row in db.execute(article_query).all()]
-        
-        # If there are articles, delete related data
-        if article_ids:
-            # Import these models here to avoid circular imports
-            from app.models import ArticleTagLink, ProductArticleLink
-            
-            # Delete article-tag links for these articles
-            db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id.in_(article_ids)))
-            
-            # Delete article-product links for these articles
-            db.execute(delete(ProductArticleLink).where(ProductArticleLink.article_id.in_(article_ids)))
-            
-            # Delete comments on these articles
-            db.execute(delete(Comment).where(Comment.article_id.in_(article_ids)))
-            
-            # Delete all articles in this category
-            db.execute(delete(Article).where(Article.category_id == category_id))
-        
-        # Delete category
-        db.delete(category)
-        db.commit()
-        
-        return None
-    except Exception as e:
-        # Roll back transaction on error
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting category: {str(e)}")
+    """Delete a category with its articles and their data in the background."""
+    category = db.execute(select(Category.id, Category.name).where(Category.id == category_id)).first()
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    
+    job = schedule_deletion(db, Category, f"Delete category {category.name}", ids=[category.id])
+    db.commit()
+    return job
 
-@router.delete("/", status_code=204)
+@router.delete("/", status_code=202, response_model=JobRead)
 async def delete_all_categories(
     current_user = Depends(get_current_active_superuser),
     db: Session = Depends(get_db)
 ):
-    try:
-        # Find all articles to be deleted
-        from app.models import Article, Comment
-        article_ids = [row[0] for row in db.execute(select(Article.id)).all()]
-        
-        # If articles exist, delete all related data first
-        if article_ids:
-            # Import these models here to avoid circular imports
-            from app.models import ArticleTagLink, ProductArticleLink
-            
-            # Delete article-tag links
-            db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id.in_(article_ids)))
-            
-            # Delete article-product links
-            db.execute(delete(ProductArticleLink).where(ProductArticleLink.article_id.in_(article_ids)))
-            
-            # Delete all comments on these articles
-            db.execute(delete(Comment).where(Comment.article_id.in_(article_ids)))
-        
-        # Delete all articles
-        db.execute(delete(Article))
-        
-        # Delete all categories
-        db.execute(delete(Category))
-        
-        db.commit()
-        return None
-    except Exception as e:
-        # Roll back transaction on error
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting all categories: {str(e)}") 
\ No newline at end of file
+    """Delete all categories with their articles and their data in the background."""
+    job = schedule_deletion(db, Category, "Delete all categories")
+    db.commit()
+    return job
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session, select
+from typing import List, Optional
+from uuid import UUID
+
+from app.database import get_db
+from app.models import Job, JobRead
+from app.auth.deps import get_current_active_superuser
+from app.jobs import cancel_job, get_job, retry_job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/", response_model=List[JobRead])
+async def read_jobs(
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(default=50, le=200),
+    current_user = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db)
+):
+    """List background jobs, newest first."""
+    query = select(Job)
+    if status:
+        query = query.where(Job.status == status)
+    if type:
+        query = query.where(Job.type == type)
+    query = query.order_by(Job.created_at.desc()).offset(skip).limit(limit)
+    return db.execute(query).scalars().all()
+
+@router.get("/{job_id}", response_model=JobRead)
+async def read_job(
+    job_id: UUID,
+    current_user = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db)
+):
+    """Return the status and progress of a background job."""
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/{job_id}/cancel", response_model=JobRead)
+async def cancel_background_job(
+    job_id: UUID,
+    current_user = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db)
+):
+    """Cancel a queued job, or stop a running one at its next progress report."""
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not cancel_job(db, job_id):
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+    db.refresh(job)
+    return job
+
+@router.post("/{job_id}/retry", response_model=JobRead)
+async def retry_background_job(
+    job_id: UUID,
+    current_user = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db)
+):
+    """Queue a failed or cancelled job again."""
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not retry_job(db, job_id):
+        raise HTTPException(status_code=409, detail=f"Only failed or cancelled jobs can be retried (job is {job.status})")
+    db.refresh(job)
+    return job
@@ -1,26 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List
-import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session, select, delete, func, or_, literal, union_all
+from sqlalchemy import String, cast
+from typing import List, Optional
+from datetime import date, datetime, time
+from uuid import UUID
+from pydantic import BaseModel, Field
 
 from app.database import get_db
-from app.models import Product, ProductCreate, ProductRead, ProductUpdate, ProductReadWithParsedLinks
-from app.auth.deps import get_current_active_user
+from app.models import Product, ProductArticleLink, ProductCreate, ProductRead, ProductUpdate, ProductReadWithParsedLinks, JobRead
+from app.auth.deps import get_current_active_user, get_current_active_superuser
 from app.utils.text import generate_unique_slug
+from app.utils.query import date_bucket, DATE_BUCKET_INTERVALS
+from app.utils.links import link_articles_to_product, unlink_articles_from_product, get_product_article_ids
+from app.utils.cascade import schedule_deletion
 
 router = APIRouter(prefix="/products", tags=["products"])
 
-def _parse_product_for_response(product: Product) -> ProductReadWithParsedLinks:
-    """Convert a Product instance to ProductReadWithParsedLinks with parsed social_links."""
-    product_dict = product.dict()
-    social_links_str = product_dict.pop("social_links", None)
-    
-    # Create a new dictionary with the parsed social_links
-    product_data = ProductReadWithParsedLinks(
-        **product_dict,
-        social_links=json.loads(social_links_str) if social_links_str else None
-    )
-    return product_data
+# Sort options use the same keys as the admin product list; each is index-backed
+PRODUCT_SORTS = {
+    "name_asc": Product.name.asc(),
+    "name_desc": Product.name.desc(),
+    "price_asc": Product.price.asc(),
+    "price_desc": Product.price.desc(),
+    "date_asc": Product.created_at.asc(),
+    "date_desc": Product.created_at.desc(),
+}
+
+class PriceBucket(BaseModel):
+    min_price: int
+    max_price: int
+    count: int
+
+class DateBucket(BaseModel):
+    period: str
+    count: int
+
+class ProductFacets(BaseModel):
+    price: List[PriceBucket]
+    date: List[DateBucket]
+
+class ArticleIdsRequest(BaseModel):
+    article_ids: List[UUID] = Field(..., max_length=10000)
+
+class LinkResult(BaseModel):
+    linked: int
+    missing: List[UUID]
+
+class UnlinkResult(BaseModel):
+    unlinked: int
+
+class PaginatedProductResponse(BaseModel):
+    items: List[ProductReadWithParsedLinks]
+    total: int
+    page: int
+    per_page: int
+    total_pages: int
+    facets: Optional[ProductFacets] = None
 
 @router.post("/", response_model=ProductReadWithParsedLinks)
 async def create_product(
@@ -32,13 +67,6 @@ async def create_product(
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Not authorized to create products")
     
-    # Validate social_links as valid JSON if provided
-    if product.social_links:
-        try:
-            json.loads(product.social_links)
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=400, detail="social_links must be a valid JSON string")
-    
     product_obj = Product.from_orm(product)
     
     # Generate slug from name if not provided
@@ -51,31 +79,190 @@ async def create_product(
     db.commit()
     db.refresh(product_obj)
     
-    # Convert to response model with parsed social_links
-    return _parse_product_for_response(product_obj)
+    return product_obj
+
+def _ensure_product_exists(db: Session, product_id: UUID):
+    """Raise 404 unless the product exists, using an id-only lookup."""
+    exists = db.execute(select(Product.id).where(Product.id == product_id)).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+def _product_filter_conditions(
+    search: Optional[str],
+    price_min: Optional[int],
+    price_max: Optional[int],
+    date_from: Optional[date],
+    date_to: Optional[date]
+) -> list:
+    """Build the WHERE conditions shared by the product list and its facets."""
+    conditions = []
+    
+    if search:
+        search_term = f"%{search}%"
+        conditions.append(
+            or_(
+                Product.name.ilike(search_term),
+                Product.description.ilike(search_term)
+            )
+        )
+    
+    if price_min is not None:
+        conditions.append(Product.price >= price_min)
+    
+    if price_max is not None:
+        conditions.append(Product.price <= price_max)
+    
+    if date_from is not None:
+        conditions.append(Product.created_at >= datetime.combine(date_from, time.min))
+    
+    if date_to is not None:
+        # Include the whole end day
+        conditions.append(Product.created_at <= datetime.combine(date_to, time.max))
+    
+    return conditions
+
+def _get_product_facets(
+    db: Session,
+    conditions: list,
+    price_bucket_size: int,
+    date_interval: str
+) -> ProductFacets:
+    """
+    Compute price and date histograms for the filtered products.
+    
+    Both histograms are grouped in a single UNION ALL aggregate query, so the
+    facets cost one round trip regardless of how many buckets are returned.
+    """
+    dialect_name = db.get_bind().dialect.name
+    
+    price_key = Product.price // price_bucket_size
+    price_query = (
+        select(
+            literal("price").label("facet"),
+            cast(price_key, String).label("bucket"),
+            func.count().label("count")
+        )
+        .where(*conditions)
+        .group_by(price_key)
+    )
+    
+    date_key = date_bucket(Product.created_at, date_interval, dialect_name)
+    date_query = (
+        select(
+            literal("date").label("facet"),
+            cast(date_key, String).label("bucket"),
+            func.count().label("count")
+        )
+        .where(*conditions)
+        .group_by(date_key)
+    )
+    
+    price_buckets = []
+    date_buckets = []
+    for facet, bucket, count in db.execute(union_all(price_query, date_query)).all():
+        if facet == "price":
+            bucket_index = int(bucket)
+            price_buckets.append(PriceBucket(
+                min_price=bucket_index * price_bucket_size,
+                max_price=(bucket_index + 1) * price_bucket_size - 1,
+                count=count
+            ))
+        else:
+            date_buckets.append(DateBucket(period=bucket, count=count))
+    
+    price_buckets.sort(key=lambda bucket: bucket.min_price)
+    date_buckets.sort(key=lambda bucket: bucket.period)
+    return ProductFacets(price=price_buckets, date=date_buckets)
+
+def _check_sort(sort: str):
+    if sort not in PRODUCT_SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Supported values: {', '.join(PRODUCT_SORTS)}")
 
 @router.get("/", response_model=List[ProductReadWithParsedLinks])
-async def get_products(db: Session = Depends(get_db)):
-    products = db.execute(select(Product)).scalars().all()
-    return [_parse_product_for_response(product) for product in products]
+async def get_products(
+    search: Optional[str] = Query(None, description="Search in name and description"),
+    price_min: Optional[int] = Query(None, ge=0, description="Minimum price (inclusive)"),
+    price_max: Optional[int] = Query(None, ge=0, description="Maximum price (inclusive)"),
+    date_from: Optional[date] = Query(None, description="Created on or after this date (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Created on or before this date (YYYY-MM-DD)"),
+    sort: Optional[str] = Query("date_desc", description=f"Sort order ({', '.join(PRODUCT_SORTS)})"),
+    db: Session = Depends(get_db)
+):
+    """List all matching products; GET /search pages them and adds facets."""
+    _check_sort(sort)
+    conditions = _product_filter_conditions(search, price_min, price_max, date_from, date_to)
+    query = select(Product).where(*conditions).order_by(PRODUCT_SORTS[sort], Product.id)
+    return db.execute(query).scalars().all()
+
+@router.get("/search", response_model=PaginatedProductResponse)
+async def search_products(
+    search: Optional[str] = Query(None, description="Search in name and description"),
+    price_min: Optional[int] = Query(None, ge=0, description="Minimum price (inclusive)"),
+    price_max: Optional[int] = Query(None, ge=0, description="Maximum price (inclusive)"),
+    date_from: Optional[date] = Query(None, description="Created on or after this date (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Created on or before this date (YYYY-MM-DD)"),
+    sort: Optional[str] = Query("date_desc", description=f"Sort order ({', '.join(PRODUCT_SORTS)})"),
+    page: Optional[int] = Query(1, ge=1, description="Page number"),
+    per_page: Optional[int] = Query(20, ge=1, le=100, description="Items per page"),
+    facets: bool = Query(True, description="Include price and date histograms"),
+    price_bucket_size: int = Query(1000, ge=1, description="Width of each price histogram bucket"),
+    date_interval: str = Query("month", description=f"Date histogram interval ({', '.join(DATE_BUCKET_INTERVALS)})"),
+    db: Session = Depends(get_db)
+):
+    _check_sort(sort)
+    
+    if date_interval not in DATE_BUCKET_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Invalid date_interval. Supported values: {', '.join(DATE_BUCKET_INTERVALS)}")
+    
+    conditions = _product_filter_conditions(search, price_min, price_max, date_from, date_to)
+    
+    # Every product falls into exactly one price bucket, so the facet query
+    # doubles as the total count
+    product_facets = None
+    if facets:
+        product_facets = _get_product_facets(db, conditions, price_bucket_size, date_interval)
+        total = sum(bucket.count for bucket in product_facets.price)
+    else:
+        total = db.execute(select(func.count()).select_from(Product).where(*conditions)).scalar() or 0
+    
+    total_pages = (total + per_page - 1) // per_page if total > 0 else 0
+    
+    # Break ties on the primary key so pages stay stable
+    query = (
+        select(Product)
+        .where(*conditions)
+        .order_by(PRODUCT_SORTS[sort], Product.id)
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+    )
+    products = db.execute(query).scalars().all()
+    
+    return PaginatedProductResponse(
+        items=products,
+        total=total,
+        page=page,
+        per_page=per_page,
+        total_pages=total_pages,
+        facets=product_facets
+    )
 
 @router.get("/{product_id}", response_model=ProductReadWithParsedLinks)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(product_id: UUID, db: Session = Depends(get_db)):
     product = db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return _parse_product_for_response(product)
+    return product
 
 @router.get("/by-slug/{slug}", response_model=ProductReadWithParsedLinks)
 async def get_product_by_slug(slug: str, db: Session = Depends(get_db)):
     product = db.execute(select(Product).where(Product.slug == slug)).scalar_one_or_none()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return _parse_product_for_response(product)
+    return product
 
 @router.put("/{product_id}", response_model=ProductReadWithParsedLinks)
 async def update_product(
-    product_id: int,
+    product_id: UUID,
     product_update: ProductUpdate,
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -90,13 +277,6 @@ async def update_product(
     
     product_data = product_update.dict(exclude_unset=True)
     
-    # Validate social_links as valid JSON if provided
-    if "social_links" in product_data and product_data["social_links"]:
-        try:
-            json.loads(product_data["social_links"])
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=400, detail="social_links must be a valid JSON string")
-    
     # If name is updated but slug is not provided, regenerate slug
     if "name" in product_data and "slug" not in product_data:
         # Get existing slugs excluding current product's slug
@@ -110,12 +290,11 @@ async def update_product(
     db.commit()
     db.refresh(product)
     
-    # Convert to response model with parsed social_links
-    return _parse_product_for_response(product)
+    return product
 
 @router.delete("/{product_id}", status_code=204)
 async def delete_product(
-    product_id: int,
+    product_id: UUID,
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -129,11 +308,8 @@ async def delete_product(
     
     try:
         # First delete all ProductArticleLink entries associated with this product
-        from app.models import ProductArticleLink
         db.execute(
-            select(ProductArticleLink)
-            .where(ProductArticleLink.product_id == product_id)
-            .delete()
+            delete(ProductArticleLink).where(ProductArticleLink.product_id == product_id)
         )
         
         # Then delete the product
@@ -145,36 +321,20 @@ async def delete_product(
     
     return None
 
-@router.delete("/", status_code=204)
+@router.delete("/", status_code=202, response_model=JobRead)
 async def delete_all_products(
-    current_user = Depends(get_current_active_user),
+    current_user = Depends(get_current_active_superuser),
     db: Session = Depends(get_db)
 ):
-    # Only allow superusers to delete all products
-    if not current_user.is_superuser:
-        raise HTTPException(status_code=403, detail="Not authorized to delete all products")
-    
-    try:
-        # First delete all ProductArticleLink entries
-        from app.models import ProductArticleLink
-        db.execute(select(ProductArticleLink).delete())
-        
-        # Then delete all products
-        products = db.execute(select(Product)).scalars().all()
-        for product in products:
-            db.delete(product)
-        
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to delete all products: {str(e)}")
-    
-    return None
+    """Delete all products and their article links in the background."""
+    job = schedule_deletion(db, Product, "Delete all products")
+    db.commit()
+    return job
 
 @router.post("/{product_id}/add-to-article/{article_id}", status_code=200)
 async def add_product_to_article(
-    product_id: int,
-    article_id: int,
+    product_id: UUID,
+    article_id: UUID,
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -182,38 +342,23 @@ async def add_product_to_article(
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Not authorized to associate products with articles")
     
-    from app.models import Article, ProductArticleLink
+    _ensure_product_exists(db, product_id)
     
-    product = db.get(Product, product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    article = db.get(Article, article_id)
-    if not article:
+    linked, missing = link_articles_to_product(db, product_id, [article_id])
+    if missing:
         raise HTTPException(status_code=404, detail="Article not found")
     
-    # Check if association already exists
-    existing_link = db.execute(
-        select(ProductArticleLink).where(
-            (ProductArticleLink.product_id == product_id) & 
-            (ProductArticleLink.article_id == article_id)
-        )
-    ).scalar_one_or_none()
+    db.commit()
     
-    if existing_link:
+    if not linked:
         return {"message": "Product already associated with article"}
     
-    # Create association
-    product_article_link = ProductArticleLink(product_id=product_id, article_id=article_id)
-    db.add(product_article_link)
-    db.commit()
-    
     return {"message": "Product added to article successfully"}
 
 @router.delete("/{product_id}/remove-from-article/{article_id}", status_code=200)
 async def remove_product_from_article(
-    product_id: int,
-    article_id: int,
+    product_id: UUID,
+    article_id: UUID,
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -221,33 +366,50 @@ async def remove_product_from_article(
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Not authorized to disassociate products from articles")
     
-    from app.models import ProductArticleLink
-    
-    link = db.execute(
-        select(ProductArticleLink).where(
-            (ProductArticleLink.product_id == product_id) & 
-            (ProductArticleLink.article_id == article_id)
-        )
-    ).scalar_one_or_none()
-    
-    if not link:
+    if not unlink_articles_from_product(db, product_id, [article_id]):
         raise HTTPException(status_code=404, detail="Association not found")
     
-    db.delete(link)
     db.commit()
     
     return {"message": "Product removed from article successfully"}
 
-@router.get("/{product_id}/articles", response_model=List[int])
+@router.get("/{product_id}/articles", response_model=List[UUID])
 async def get_product_articles(
-    product_id: int,
+    product_id: UUID,
     db: Session = Depends(get_db)
 ):
-    product = db.get(Product, product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+    article_ids = get_product_article_ids(db, product_id)
+    
+    # An empty result may just mean the product has no articles
+    if not article_ids:
+        _ensure_product_exists(db, product_id)
+    
+    return article_ids
+
+@router.post("/{product_id}/articles/link", response_model=LinkResult)
+async def link_product_articles(
+    product_id: UUID,
+    payload: ArticleIdsRequest,
+    current_user = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db)
+):
+    """Link many articles to a product in one statement; existing links are kept."""
+    _ensure_product_exists(db, product_id)
+    
+    linked, missing = link_articles_to_product(db, product_id, payload.article_ids)
+    db.commit()
     
-    # Get article IDs associated with the product
-    article_ids = [article.id for article in product.articles]
+    return LinkResult(linked=linked, missing=missing)
+
+@router.post("/{product_id}/articles/unlink", response_model=UnlinkResult)
+async def unlink_product_articles(
+    product_id: UUID,
+    payload: ArticleIdsRequest,
+    current_user = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db)
+):
+    """Unlink many articles from a product in one statement."""
+    unlinked = unlink_articles_from_product(db, product_id, payload.article_ids)
+    db.commit()
     
-    return article_ids 
\ No newline at end of file
+    return UnlinkResult(unlinked=unlinked)
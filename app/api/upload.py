@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import BaseModel
 from sqlmodel import Session
-import os
+from typing import List, Literal
+import asyncio
 from datetime import datetime
 import shutil
 import uuid
@@ -12,11 +15,25 @@ from app.auth.utils import get_user_from_cookie
 from app.models import User
 from app.config import settings
 from app.utils.storage import StorageManager
+from app.utils.media import IMAGE_EXTENSIONS, SNIFF_LENGTH, image_filename, sniff_image_type
+from app.utils.direct_uploads import complete_upload, presign_upload
 
 # Set up OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
 router = APIRouter(prefix="/upload")
 
+
+class PresignRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+    method: Literal["put", "post"] = "put"
+
+
+class CompleteUploadRequest(BaseModel):
+    upload_token: str
+
+
 @router.post("/image")
 async def upload_image(
     file: UploadFile = File(...),
@@ -52,23 +69,96 @@ async def upload_image_web(
     # Process the upload
     return await process_image_upload(file)
 
+@router.post("/images")
+async def upload_images(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Upload several images with token authentication and return a result per file."""
+    if not current_user or not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Not enough permissions"
+        )
+    
+    return await process_image_uploads(files)
+
+@router.post("/images/web")
+async def upload_images_web(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db)
+):
+    """Upload several images using cookie authentication and return a result per file."""
+    user = await get_user_from_cookie(request, db)
+    if not user or not user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Not enough permissions"
+        )
+    
+    return await process_image_uploads(files)
+
+async def process_image_uploads(files: List[UploadFile]):
+    """
+    Process several image uploads at once, UPLOAD_BATCH_CONCURRENCY at a time.
+    
+    Each file is validated and stored on its own; a rejected file does not
+    fail the others. Results are returned in the order the files were sent.
+    """
+    if len(files) > settings.UPLOAD_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files (max {settings.UPLOAD_BATCH_MAX_FILES} per request)"
+        )
+    
+    semaphore = asyncio.Semaphore(settings.UPLOAD_BATCH_CONCURRENCY)
+    
+    async def upload_one(file: UploadFile):
+        filename = file.filename
+        async with semaphore:
+            try:
+                result = await process_image_upload(file)
+            except HTTPException as e:
+                return {"filename": filename, "success": False, "status_code": e.status_code, "error": e.detail}
+        return {"filename": filename, **result}
+    
+    results = await asyncio.gather(*(upload_one(file) for file in files))
+    uploaded = sum(1 for result in results if result["success"])
+    return {
+        "success": uploaded == len(results),
+        "uploaded": uploaded,
+        "failed": len(results) - uploaded,
+        "results": results
+    }
+
 async def process_image_upload(file: UploadFile):
     """Process image upload and return the file URL."""
-    # Validate file type
-    valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-    file_ext = os.path.splitext(file.filename)[1].lower()
+    # Validate the file type from its content rather than its name
+    header = await file.read(SNIFF_LENGTH)
+    await file.seek(0)
+    content_type = sniff_image_type(header)
     
-    if file_ext not in valid_extensions:
+    if content_type is None:
         raise HTTPException(
             status_code=400, 
-            detail=f"Invalid file type. Supported types: {', '.join(valid_extensions)}"
+            detail="Invalid file type. Supported types: JPEG, PNG, GIF, WebP"
+        )
+    
+    if StorageManager.upload_size(file) > settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File is too large (max {settings.MAX_UPLOAD_SIZE_MB} MB)"
         )
     
+    file.filename = image_filename(file.filename, content_type)
+    
     try:
         success, path, error = await StorageManager.save_file(
             file=file, 
             folder="uploads/images",
-            public=True
+            public=True,
+            content_type=content_type
         )
         
         if not success:
@@ -87,4 +177,110 @@ async def process_image_upload(file: UploadFile):
         return {"url": file_url, "success": True}
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+
+@router.post("/presign")
+async def presign_image_upload(
+    body: PresignRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get a presigned URL to upload an image straight to R2, with token authentication.
+    Send the file as the response describes, then call /upload/complete.
+    """
+    if not current_user or not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Not enough permissions"
+        )
+    
+    return await process_presign(body)
+
+@router.post("/presign/web")
+async def presign_image_upload_web(
+    request: Request,
+    body: PresignRequest,
+    db: Session = Depends(get_db)
+):
+    """Get a presigned URL to upload an image straight to R2, with cookie authentication."""
+    user = await get_user_from_cookie(request, db)
+    if not user or not user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Not enough permissions"
+        )
+    
+    return await process_presign(body)
+
+@router.post("/complete")
+async def complete_image_upload(
+    body: CompleteUploadRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Check and register an image uploaded with a presigned URL, and return its URL."""
+    if not current_user or not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Not enough permissions"
+        )
+    
+    return await process_complete(body)
+
+@router.post("/complete/web")
+async def complete_image_upload_web(
+    request: Request,
+    body: CompleteUploadRequest,
+    db: Session = Depends(get_db)
+):
+    """Check and register an image uploaded with a presigned URL, with cookie authentication."""
+    user = await get_user_from_cookie(request, db)
+    if not user or not user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Not enough permissions"
+        )
+    
+    return await process_complete(body)
+
+async def process_presign(body: PresignRequest):
+    """Validate a direct upload request and return its presigned URL."""
+    if not settings.USE_CLOUD_STORAGE:
+        raise HTTPException(status_code=400, detail="Direct uploads require cloud storage")
+    
+    if body.content_type not in IMAGE_EXTENSIONS:
+        raise HTTPException(
+            status_code=400, 
+            detail="Invalid file type. Supported types: JPEG, PNG, GIF, WebP"
+        )
+    
+    if body.size <= 0:
+        raise HTTPException(status_code=400, detail="File is empty")
+    if body.size > settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File is too large (max {settings.MAX_UPLOAD_SIZE_MB} MB)"
+        )
+    
+    try:
+        return await run_in_threadpool(
+            presign_upload,
+            body.filename,
+            body.content_type,
+            body.size,
+            body.method
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not create upload URL: {str(e)}")
+
+async def process_complete(body: CompleteUploadRequest):
+    """Register a direct upload and return the file URL."""
+    if not settings.USE_CLOUD_STORAGE:
+        raise HTTPException(status_code=400, detail="Direct uploads require cloud storage")
+    
+    # boto3 blocks, so the checks run in a worker thread
+    success, file_url, error = await run_in_threadpool(complete_upload, body.upload_token)
+    if not success:
+        raise HTTPException(status_code=400, detail=f"Upload failed: {error}")
+    
+    return {"url": file_url, "success": True}
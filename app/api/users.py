@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, delete
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+from typing import Any, List
+from uuid import UUID
 
+from app.config import settings
 from app.database import get_db
-from app.models import User, UserCreate, UserRead, UserUpdate
+from app.models import JobRead, User, UserCreate, UserImportResult, UserRead, UserUpdate
 from app.auth.deps import get_current_active_user, get_current_active_superuser
-from app.auth.utils import get_password_hash
+from app.auth.hashing import hash_password
+from app.auth.cache import principal_cache
+from app.utils.cascade import schedule_deletion
+from app.utils.user_import import import_users
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -14,7 +20,7 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
     user_obj = User(
         username=user.username,
         email=user.email,
-        password=get_password_hash(user.password),
+        password=await hash_password(user.password),
         is_active=user.is_active,
         is_superuser=user.is_superuser,
         first_name=user.first_name,
@@ -25,6 +31,27 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
     db.refresh(user_obj)
     return user_obj
 
+@router.post("/import", response_model=UserImportResult)
+async def import_users_endpoint(
+    # Rows are validated one by one, so a malformed row is reported instead of failing the request
+    users: List[Any] = Body(..., description="Users with the fields of UserImport"),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """
+    Create many users at once.
+
+    Each user has either a plain `password` or a `password_hash` (bcrypt) from
+    another system. Users whose username or email already exists are skipped,
+    and invalid rows are listed in the response.
+    For imports larger than USER_IMPORT_MAX_ROWS use scripts/import_users.py.
+    """
+    if len(users) > settings.USER_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many users (max {settings.USER_IMPORT_MAX_ROWS}); use scripts/import_users.py"
+        )
+    return await run_in_threadpool(import_users, users)
+
 @router.get("/", response_model=List[UserRead])
 async def get_users(
     db: Session = Depends(get_db),
@@ -39,7 +66,7 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
 
 @router.get("/{user_id}", response_model=UserRead)
 async def get_user(
-    user_id: int, 
+    user_id: UUID,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_superuser)
 ):
@@ -50,7 +77,7 @@ async def get_user(
 
 @router.put("/{user_id}", response_model=UserRead)
 async def update_user(
-    user_id: int,
+    user_id: UUID,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -64,110 +91,56 @@ async def update_user(
         raise HTTPException(status_code=404, detail="User not found")
     
     user_data = user_update.dict(exclude_unset=True)
+    old_username = user.username
     
     # Hash the password if it's being updated
     if "password" in user_data:
-        user_data["password"] = get_password_hash(user_data["password"])
+        user_data["password"] = await hash_password(user_data["password"])
     
     for key, value in user_data.items():
         setattr(user, key, value)
     
     db.add(user)
     db.commit()
+    principal_cache.invalidate(old_username, user.username)
     db.refresh(user)
     return user
 
-@router.delete("/{user_id}", status_code=204)
+@router.delete("/{user_id}", status_code=202, response_model=JobRead)
 async def delete_user(
-    user_id: int,
+    user_id: UUID,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_superuser)
 ):
-    try:
-        user = db.get(User, user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Cannot delete yourself
-        if user.id == current_user.id:
-            raise HTTPException(status_code=400, detail="You cannot delete your own account")
-        
-        # Import related models here to avoid circular imports
-        from app.models import Article, Comment, SystemLog, ArticleTagLink, ProductArticleLink
-        
-        # First get the IDs of all articles by this user
-        article_query = select(Article.id).where(Article.author_id == user_id)
-        article_ids = [row[0] for row in db.execute(article_query).all()]
-        
-        # If there are articles, delete related data
-        if article_ids:
-            # Delete article-tag links for this user's articles
-            db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id.in_(article_ids)))
-            
-            # Delete article-product links for this user's articles
-            db.execute(delete(ProductArticleLink).where(ProductArticleLink.article_id.in_(article_ids)))
-            
-            # Delete ALL comments on the user's articles (regardless of commenter)
-            db.execute(delete(Comment).where(Comment.article_id.in_(article_ids)))
-        
-        # Delete system logs for this user
-        db.execute(delete(SystemLog).where(SystemLog.user_id == user_id))
-        
-        # Delete all comments made by the user on any article
-        db.execute(delete(Comment).where(Comment.author_id == user_id))
-        
-        # Delete all articles by the user
-        db.execute(delete(Article).where(Article.author_id == user_id))
-        
-        # Now delete the user
-        db.delete(user)
-        db.commit()
-        
-        return None
-    except Exception as e:
-        # Roll back transaction on error
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting user: {str(e)}")
+    """
+    Delete a user with their articles, comments and system logs.
+    
+    The account is deactivated right away and the rows are removed in the
+    background; poll /api/jobs/{job_id} for progress.
+    """
+    user = db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Cannot delete yourself
+    if user.id == current_user.id:
+        raise HTTPException(status_code=400, detail="You cannot delete your own account")
+    
+    # Block the account while its data is being deleted
+    user.is_active = False
+    db.add(user)
+    job = schedule_deletion(db, User, f"Delete user {user.username}", ids=[user.id])
+    db.commit()
+    principal_cache.invalidate(user.username)
+    return job
 
-@router.delete("/", status_code=204)
+@router.delete("/", status_code=202, response_model=JobRead)
 async def delete_all_users(
     current_user: User = Depends(get_current_active_superuser),
     db: Session = Depends(get_db)
 ):
-    try:
-        # Import related models here to avoid circular imports
-        from app.models import Article, Comment, SystemLog, ArticleTagLink, ProductArticleLink
-        
-        # First get the IDs of all articles by users other than the current admin
-        article_ids_query = select(Article.id).join(User).where(User.id != current_user.id)
-        article_ids = [row[0] for row in db.execute(article_ids_query).all()]
-        
-        # If there are articles, delete related data
-        if article_ids:
-            # Delete article-tag links for other users' articles
-            db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id.in_(article_ids)))
-            
-            # Delete article-product links for other users' articles
-            db.execute(delete(ProductArticleLink).where(ProductArticleLink.article_id.in_(article_ids)))
-            
-            # Delete ALL comments on these articles (regardless of commenter)
-            db.execute(delete(Comment).where(Comment.article_id.in_(article_ids)))
-        
-        # Delete system logs for all users except current
-        db.execute(delete(SystemLog).where(SystemLog.user_id != current_user.id))
-        
-        # Delete remaining comments by users other than the current admin
-        db.execute(delete(Comment).where(Comment.author_id != current_user.id))
-        
-        # Delete articles by users other than the current admin
-        db.execute(delete(Article).where(Article.author_id != current_user.id))
-        
-        # Finally delete all users except the current one
-        db.execute(delete(User).where(User.id != current_user.id))
-        
-        db.commit()
-        return None
-    except Exception as e:
-        # Roll back transaction on error
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting all users: {str(e)}") 
\ No newline at end of file
+    """Delete all users except the current one, with their data, in the background."""
+    job = schedule_deletion(db, User, "Delete all users", exclude_ids=[current_user.id])
+    db.commit()
+    principal_cache.clear()
+    return job
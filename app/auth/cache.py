@@ -0,0 +1,165 @@
+"""
+In-process caches for authentication.
+
+Authenticated requests verify the JWT and resolve its subject (the username)
+to a User on every call. The token cache keeps the verified claims of recently
+seen tokens until they expire, keyed by a SHA-256 digest so raw tokens are not
+kept in memory. The principal cache keeps a detached copy of recently resolved
+users for a short TTL, so a hit needs no database round trip. Principal
+entries are invalidated explicitly when users are changed or deleted; the TTL
+bounds how long other processes (which keep their own cache) can see stale data.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.config import settings
+from app.models import User
+
+
+def _snapshot(user: User) -> User:
+    """Copy the column values of a user into a new, detached instance."""
+    copy = User(**{column.name: getattr(user, column.name) for column in User.__table__.columns})
+    make_transient_to_detached(copy)
+    return copy
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, User]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, username: str) -> Optional[User]:
+        """Return the cached copy of a user, or None if missing or expired."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user: User) -> User:
+        """Cache a copy of a user, evicting the least recently used entries; returns the copy."""
+        copy = _snapshot(user)
+        if not self.enabled:
+            return copy
+
+        with self._lock:
+            self._entries[user.username] = (time.monotonic() + self.ttl, copy)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return copy
+
+    def invalidate(self, *usernames: str):
+        """Forget users by username."""
+        with self._lock:
+            for username in usernames:
+                self._entries.pop(username, None)
+
+    def invalidate_ids(self, user_ids: Iterable[UUID]):
+        """Forget users by id."""
+        user_ids = set(user_ids)
+        with self._lock:
+            stale = [username for username, (_, user) in self._entries.items() if user.id in user_ids]
+            for username in stale:
+                del self._entries[username]
+
+    def clear(self):
+        """Forget all users."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class TokenCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # Time spent verifying tokens on misses, to estimate what hits save
+        self.verifications = 0
+        self.verify_seconds = 0.0
+        self._entries: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return the verified claims of a token, or None if unknown or expired."""
+        if self.max_size <= 0:
+            return None
+
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, token: str, claims: dict, verify_seconds: float = 0.0):
+        """Cache verified claims until the token's exp claim."""
+        with self._lock:
+            self.verifications += 1
+            self.verify_seconds += verify_seconds
+
+        expires_at = claims.get("exp")
+        # Tokens without an expiry are never cached
+        if self.max_size <= 0 or not isinstance(expires_at, (int, float)):
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (float(expires_at), claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            average_ms = self.verify_seconds * 1000 / (self.verifications or 1)
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "average_verify_ms": round(average_ms, 3),
+                "estimated_saved_ms": round(average_ms * self.hits, 1)
+            }
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+principal_cache = PrincipalCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_SIZE)
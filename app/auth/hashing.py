@@ -0,0 +1,152 @@
+"""
+Password hashing off the event loop.
+
+bcrypt is deliberately slow (about 250ms at cost 12), so running it inline in
+an async handler freezes every other request in the worker. The async helpers
+here run it in a dedicated, bounded thread pool; bcrypt releases the GIL, so
+the threads hash in parallel. When more than PASSWORD_HASH_MAX_PENDING hashes
+are queued or running, new requests fail fast with 503 instead of piling up.
+
+Bulk imports hash thousands of passwords at once; hash_passwords spreads them
+over a separate process pool sized to the CPU count, started on first use.
+"""
+import asyncio
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import List, Optional, Sequence
+
+import bcrypt
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+_workers = max(settings.PASSWORD_HASH_WORKERS, 1)
+_executor = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix="password-hash")
+_pending = 0
+_pending_lock = threading.Lock()
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+# $2b$12$ followed by the 22 character salt and 31 character digest
+_BCRYPT_HASH = re.compile(r"^\$2[abxy]\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+
+def _to_bytes(value) -> bytes:
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def hash_password_sync(password: str, rounds: Optional[int] = None) -> str:
+    """Hash a password with bcrypt at the configured cost."""
+    salt = bcrypt.gensalt(rounds=rounds or settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_to_bytes(password), salt).decode("utf-8")
+
+
+def check_password_sync(password: str, hashed_password: str) -> bool:
+    """Check a password against a bcrypt hash; malformed hashes never match."""
+    try:
+        return bcrypt.checkpw(_to_bytes(password), _to_bytes(hashed_password))
+    except (ValueError, TypeError) as e:
+        print(f"Password verification error: {str(e)}")
+        return False
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Return the cost factor of a bcrypt hash such as $2b$12$..., if it has one."""
+    parts = (hashed_password or "").split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Return True if a hash was made with a different cost than BCRYPT_ROUNDS."""
+    return hash_rounds(hashed_password) != settings.BCRYPT_ROUNDS
+
+
+def is_bcrypt_hash(value: str) -> bool:
+    """Return True if a value looks like a bcrypt hash, e.g. one exported from another system."""
+    return bool(_BCRYPT_HASH.match(value or ""))
+
+
+def process_pool_size() -> int:
+    return settings.PASSWORD_HASH_PROCESSES or os.cpu_count() or 1
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Fresh interpreters rather than forks of a threaded server process
+            _process_pool = ProcessPoolExecutor(
+                max_workers=process_pool_size(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+
+def hash_passwords(passwords: Sequence[str], rounds: Optional[int] = None) -> List[str]:
+    """
+    Hash many passwords in parallel across all cores, preserving their order.
+
+    Blocks until every password is hashed; run it in a thread from async code.
+    """
+    if not passwords:
+        return []
+    pool = _get_process_pool()
+    # Enough chunks to keep every process busy without a round trip per password
+    chunksize = max(1, len(passwords) // (process_pool_size() * 4))
+    func = partial(hash_password_sync, rounds=rounds or settings.BCRYPT_ROUNDS)
+    return list(pool.map(func, passwords, chunksize=chunksize))
+
+
+def shutdown_process_pool():
+    """Stop the bulk hashing processes, if they were started."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown()
+            _process_pool = None
+
+
+async def _run(func, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in attempts in progress, please retry shortly",
+                headers={"Retry-After": "1"}
+            )
+        _pending += 1
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password in the hashing pool."""
+    return await _run(hash_password_sync, password)
+
+
+async def check_password(password: str, hashed_password: str) -> bool:
+    """Check a password in the hashing pool."""
+    return await _run(check_password_sync, password, hashed_password)
+
+
+def pool_stats() -> dict:
+    with _pending_lock:
+        pending = _pending
+    return {
+        "workers": _workers,
+        "pending": pending,
+        "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+        "bulk_processes": process_pool_size() if _process_pool is not None else 0
+    }
@@ -0,0 +1,55 @@
+from starlette.requests import HTTPConnection
+from starlette.responses import RedirectResponse
+
+from app.auth.utils import resolve_principal
+
+# Admin pages that must stay reachable without a session
+PUBLIC_ADMIN_PATHS = {"/admin/login", "/admin/logout", "/admin/token"}
+
+# Admin JSON endpoints authenticated with a bearer token by their own dependencies
+BEARER_ADMIN_PREFIXES = ("/admin/storage/", "/admin/auth/")
+
+
+class AdminAuthMiddleware:
+    """
+    Resolve the admin session once per request.
+
+    For every request under /admin the user behind the access_token cookie is
+    resolved through the token and principal caches and stored as
+    request.state.user (None when there is no valid session or the account is
+    inactive). Requests from anyone but an active superuser are redirected to
+    the login page before the route runs, so they never open a database session.
+    Only /admin/storage/ and /admin/auth/ are left to their own bearer-token
+    checks.
+    """
+
+    def __init__(self, app, prefix: str = "/admin", login_url: str = "/admin/login"):
+        self.app = app
+        self.prefix = prefix
+        self.login_url = login_url
+
+    def _is_public(self, connection: HTTPConnection) -> bool:
+        path = connection.url.path.rstrip("/") or "/"
+        if path in PUBLIC_ADMIN_PATHS:
+            return True
+        # Only these check a bearer token themselves; any other admin route
+        # needs the session, whatever headers the request carries
+        return connection.url.path.startswith(BEARER_ADMIN_PREFIXES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        user = await resolve_principal(connection.cookies.get("access_token"))
+        if user is not None and not user.is_active:
+            user = None
+        scope.setdefault("state", {})["user"] = user
+
+        if (user is None or not user.is_superuser) and not self._is_public(connection):
+            response = RedirectResponse(url=self.login_url, status_code=303)
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
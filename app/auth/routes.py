@@ -8,6 +8,10 @@ from datetime import timedelta
 from app.config import settings
 from app.database import get_db
 from app.auth.utils import authenticate_user, create_access_token, get_user_from_cookie
+from app.auth.cache import principal_cache, token_cache
+from app.auth.hashing import pool_stats
+from app.auth.deps import get_current_active_superuser
+from app.utils.logging import LOGIN_ACTION, log_admin_action
 
 router = APIRouter(tags=["auth"])
 
@@ -51,6 +55,9 @@ async def admin_login(
             status_code=403
         )
     
+    log_admin_action(db, user.id, LOGIN_ACTION, "Signed in to the admin site", request)
+    db.commit()
+    
     # Create access token and set cookie
     access_token = create_access_token(
         data={"sub": user.username}
@@ -76,6 +83,7 @@ async def admin_logout(response: Response):
 
 @router.post("/token", response_model=dict)
 async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(), 
     db: Session = Depends(get_db)
 ):
@@ -86,8 +94,19 @@ async def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    log_admin_action(db, user.id, LOGIN_ACTION, "Requested an access token", request)
+    db.commit()
     access_token_expires = timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"} 
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/auth/stats", response_model=dict)
+async def auth_cache_stats(current_user = Depends(get_current_active_superuser)):
+    """Return hit rates of the token and principal caches and the hashing pool load in this process."""
+    return {
+        "token_cache": token_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hashing": pool_stats()
+    }
@@ -1,31 +1,107 @@
-import bcrypt
+import time
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import HTTPException, status, Request, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 
 from app.config import settings
 from app.models import User
-from app.database import get_db
+from app.database import engine, get_db
+from app.auth.cache import principal_cache, token_cache
+from app.auth.hashing import (
+    check_password,
+    check_password_sync,
+    hash_password,
+    hash_password_sync,
+    needs_rehash
+)
+from app.utils.timing import timed
 
 # Helper functions for authentication
+# These block for the duration of a bcrypt round; in request handlers use the
+# async hash_password / check_password from app.auth.hashing instead
 def verify_password(plain_password, hashed_password):
-    try:
-        # Make sure both are in bytes format
-        if isinstance(plain_password, str):
-            plain_password = plain_password.encode('utf-8')
-        if isinstance(hashed_password, str):
-            hashed_password = hashed_password.encode('utf-8')
-            
-        return bcrypt.checkpw(plain_password, hashed_password)
-    except Exception as e:
-        print(f"Password verification error: {str(e)}")
-        return False
+    return check_password_sync(plain_password, hashed_password)
 
 
 def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return hash_password_sync(password)
+
+
+def get_user_by_username(db: Session, username: str) -> Optional[User]:
+    """
+    Resolve a token subject to a user, from the principal cache when possible.
+
+    A cached user is attached to the session without a query, so callers can
+    use (and modify) it like a freshly loaded one.
+    """
+    with timed("principal") as timing:
+        cached = principal_cache.get(username)
+        if cached is not None:
+            timing.description = "hit"
+            return db.merge(cached, load=False)
+
+        timing.description = "miss"
+        user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
+        if user is not None:
+            principal_cache.set(user)
+        return user
+
+
+def _load_principal(username: str) -> Optional[User]:
+    with Session(engine) as db:
+        user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
+        return principal_cache.set(user) if user is not None else None
+
+
+async def resolve_principal(token: Optional[str]) -> Optional[User]:
+    """
+    Return a detached copy of the user a token belongs to, or None.
+
+    Uses the token and principal caches and only queries the database, in a
+    worker thread, on a principal cache miss. The copy is shared between
+    requests and must not be modified; attach it to a session with
+    db.merge(user, load=False) first.
+    """
+    if not token:
+        return None
+    try:
+        username = decode_access_token(token).get("sub")
+    except JWTError:
+        return None
+    if username is None:
+        return None
+
+    with timed("principal") as timing:
+        cached = principal_cache.get(username)
+        if cached is not None:
+            timing.description = "hit"
+            return cached
+
+        timing.description = "miss"
+        return await run_in_threadpool(_load_principal, username)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verify a JWT and return its claims, from the token cache when possible.
+
+    Verified claims are cached until the token's exp claim, keyed by a digest
+    of the token. Raises JWTError if the token is invalid or expired.
+    """
+    with timed("jwt") as timing:
+        claims = token_cache.get(token)
+        if claims is not None:
+            timing.description = "hit"
+            return claims
+
+        timing.description = "miss"
+        start = time.perf_counter()
+        claims = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        token_cache.set(token, claims, time.perf_counter() - start)
+        return claims
 
 
 async def authenticate_user(db: Session, username: str, password: str):
@@ -33,8 +109,17 @@ async def authenticate_user(db: Session, username: str, password: str):
     user = result.scalar_one_or_none()
     if not user:
         return False
-    if not verify_password(password, user.password):
+    if not await check_password(password, user.password):
         return False
+    
+    # Upgrade the hash when BCRYPT_ROUNDS has changed since it was made
+    if needs_rehash(user.password):
+        user.password = await hash_password(password)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        principal_cache.invalidate(user.username)
+    
     return user
 
 
@@ -56,15 +141,14 @@ async def get_current_user(token: str, db: Session):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    result = db.execute(select(User).where(User.username == username))
-    user = result.scalar_one_or_none()
+    user = get_user_by_username(db, username)
     if user is None:
         raise credentials_exception
     
@@ -73,19 +157,22 @@ async def get_current_user(token: str, db: Session):
 
 # Function to get user from cookie token (for web routes)
 async def get_user_from_cookie(request: Request, db: Session):
+    # Admin requests are resolved once by AdminAuthMiddleware
+    if "user" in request.scope.get("state", {}):
+        user = request.state.user
+        return db.merge(user, load=False) if user is not None else None
+    
     token = request.cookies.get("access_token")
     if not token:
         return None
     
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             return None
         
-        result = db.execute(select(User).where(User.username == username))
-        user = result.scalar_one_or_none()
-        return user
+        return get_user_by_username(db, username)
     except Exception as e:
         print(f"Error getting user from cookie: {str(e)}")
         return None
@@ -18,6 +18,29 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 180
+    # Authenticated users are cached per process; 0 disables the cache
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_SIZE: int = 1000
+    # Verified tokens are cached until they expire; 0 disables the cache
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    # Add a Server-Timing header with auth and total request timings
+    SERVER_TIMING: bool = False
+    # bcrypt cost factor; existing hashes are upgraded on the next login
+    BCRYPT_ROUNDS: int = 12
+    # Threads hashing passwords, and hashes allowed to queue before returning 503
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    # Admin dashboard snapshot is recomputed in the background once older than this
+    DASHBOARD_CACHE_SECONDS: int = 60
+    # Stats rollups recount the hours this far before the latest one rolled up,
+    # and dashboard series return at most this many buckets
+    STATS_ROLLUP_LOOKBACK_HOURS: int = 48
+    STATS_SERIES_MAX_BUCKETS: int = 5000
+    # Processes hashing passwords for bulk imports; 0 uses one per CPU
+    PASSWORD_HASH_PROCESSES: int = 0
+    # Users inserted per batch by bulk imports, and rows accepted by the import endpoint
+    USER_IMPORT_BATCH_SIZE: int = 1000
+    USER_IMPORT_MAX_ROWS: int = 10000
     
     # CORS settings
     CORS_ALLOW_ORIGINS_STR: str = '["http://localhost", "http://localhost:8000", "http://127.0.0.1", "http://127.0.0.1:8000", "http://localhost:3000"]'
@@ -31,10 +54,70 @@ class Settings(BaseSettings):
     
     # Database settings
     DATABASE_URL: str = "sqlite:///db.sqlite3"
-    
+    # Rows deleted per transaction by background cascade deletions
+    CASCADE_DELETE_CHUNK_SIZE: int = 500
+
+    # Background job queue
+    JOB_WORKER_IN_PROCESS: bool = True  # Run workers inside the web process
+    JOB_WORKERS: int = 2  # Worker threads per pool
+    JOB_POLL_INTERVAL: float = 1.0  # Seconds between polls when the queue is empty
+    JOB_LEASE_SECONDS: int = 300  # A job whose lease expires is picked up again
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: int = 30  # Doubled after every failed attempt
+    JOB_RETENTION_DAYS: int = 7  # Finished jobs older than this are pruned
+
     # Paths
     STATIC_ROOT: str = "static"
     MEDIA_ROOT: str = "media"
+
+    # Uploads are streamed in chunks; larger files are rejected
+    MAX_UPLOAD_SIZE_MB: int = 20
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    # Multi-file uploads: files per request, and files stored at the same time
+    UPLOAD_BATCH_MAX_FILES: int = 50
+    UPLOAD_BATCH_CONCURRENCY: int = 8
+    # Presigned direct-to-R2 uploads are valid for this many seconds
+    DIRECT_UPLOAD_EXPIRES_SECONDS: int = 600
+    # Store each distinct file once under blobs/, by the SHA-256 of its content
+    MEDIA_DEDUPLICATE: bool = True
+    # Media GC deletes files no article or product references once they are
+    # older than the grace period; scheduled runs only report unless enabled
+    MEDIA_GC_GRACE_HOURS: int = 24
+    MEDIA_GC_SCHEDULED_DELETE: bool = False
+
+    # Resized images: widths rendered on upload and offered in srcset, output
+    # formats in order of preference (the browser's Accept header decides),
+    # encoder quality and processes used for resizing (0 = one per CPU)
+    IMAGE_VARIANT_WIDTHS_STR: str = '[320, 640, 1280]'
+    IMAGE_FORMATS_STR: str = '["avif", "webp", "jpeg"]'
+    IMAGE_QUALITY: int = 80
+    IMAGE_PROCESSES: int = 0
+    # Disk cache for resized images; least recently used files are evicted above the limit
+    RESIZE_CACHE_ROOT: str = "cache/resize"
+    RESIZE_CACHE_MAX_MB: int = 1024
+
+    # Static and media serving: uploads and fingerprinted static files are
+    # cached as immutable, other static files for STATIC_MAX_AGE seconds.
+    # STATIC_SENDFILE_HEADER hands files to the reverse proxy: "X-Accel-Redirect"
+    # (nginx, internal locations under STATIC_ACCEL_REDIRECT_PREFIX) or
+    # "X-Sendfile" (Apache, lighttpd); empty serves them from Python
+    STATIC_MAX_AGE: int = 3600
+    STATIC_SENDFILE_HEADER: str = ""
+    STATIC_ACCEL_REDIRECT_PREFIX: str = "/protected"
+
+    @property
+    def IMAGE_VARIANT_WIDTHS(self) -> List[int]:
+        try:
+            return sorted(int(width) for width in json.loads(self.IMAGE_VARIANT_WIDTHS_STR))
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return [320, 640, 1280]
+
+    @property
+    def IMAGE_FORMATS(self) -> List[str]:
+        try:
+            return [str(name).lower() for name in json.loads(self.IMAGE_FORMATS_STR)]
+        except (json.JSONDecodeError, TypeError):
+            return ["webp", "jpeg"]
     
     # Admin user
     ADMIN_USERNAME: str = "admin"
@@ -57,6 +140,18 @@ class Settings(BaseSettings):
     R2_ENDPOINT_URL: str = ""  # https://{account_id}.r2.cloudflarestorage.com
     R2_PUBLIC_URL: str = ""    # Your public URL for the bucket (e.g., cdn.yourdomain.com)
     R2_REGION_NAME: str = "auto"  # Usually "auto" for Cloudflare R2
+    # Shared R2 client: concurrent connections kept alive, timeouts in seconds
+    # and attempts per call (including retries of throttled or failed requests)
+    R2_MAX_POOL_CONNECTIONS: int = 50
+    R2_CONNECT_TIMEOUT: float = 5.0
+    R2_READ_TIMEOUT: float = 60.0
+    R2_MAX_ATTEMPTS: int = 5
+    # Uploads larger than the threshold go up as multipart uploads, several parts at a time
+    R2_MULTIPART_THRESHOLD_MB: int = 8
+    R2_MULTIPART_CHUNK_SIZE_MB: int = 8
+    R2_MULTIPART_CONCURRENCY: int = 4
+    # delete_objects calls (of up to 1000 keys each) in flight during purges
+    R2_PURGE_CONCURRENCY: int = 16
 
     class Config:
         env_file = ".env"
@@ -71,6 +166,9 @@ if not os.path.isabs(settings.STATIC_ROOT):
 if not os.path.isabs(settings.MEDIA_ROOT):
     settings.MEDIA_ROOT = os.path.join(BASE_DIR, settings.MEDIA_ROOT)
 
+if not os.path.isabs(settings.RESIZE_CACHE_ROOT):
+    settings.RESIZE_CACHE_ROOT = os.path.join(BASE_DIR, settings.RESIZE_CACHE_ROOT)
+
 # Ensure directories exist
 os.makedirs(settings.STATIC_ROOT, exist_ok=True)
 os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
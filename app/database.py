@@ -1,5 +1,6 @@
 import os
 from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy import event, inspect, text, true
 from contextlib import contextmanager
 from typing import Iterator, Generator
 
@@ -13,12 +14,24 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
 )
 
+# SQLite only enforces foreign keys (and ON DELETE CASCADE) when asked to, per connection
+if settings.DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 def create_db_and_tables():
     """Create database tables from SQLModel models."""
     try:
         # Create all tables based on imported models
         SQLModel.metadata.create_all(engine)
-        
+
+        # create_all skips existing tables, so add columns and indexes declared later on
+        ensure_columns()
+        ensure_indexes()
+
         # Identify database type from URL
         # SQLAlchemy officially supports these dialects
         db_url = settings.DATABASE_URL.lower()
@@ -58,6 +71,52 @@ def create_db_and_tables():
         raise
 
 
+# Fill in columns added to existing tables: (table, column) -> UPDATE to run once added
+COLUMN_BACKFILLS = {
+    # Articles published so far count as published when created
+    ("article", "published_at"): lambda table: (
+        table.update().where(table.c.published == true()).values(published_at=table.c.created_at)
+    ),
+}
+
+
+def ensure_columns():
+    """
+    Add nullable model columns that are missing from an existing table, and
+    backfill them. Columns that are NOT NULL need a migration.
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                ))
+                backfill = COLUMN_BACKFILLS.get((table.name, column.name))
+                if backfill is not None:
+                    connection.execute(backfill(table))
+
+
+def ensure_indexes():
+    """Create any model index that is missing from an existing table."""
+    inspector = inspect(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            # Indexes on columns only a migration can add wait for it
+            if all(column.name in existing for column in index.columns):
+                index.create(bind=engine, checkfirst=True)
+
+
 def get_db() -> Iterator[Session]:
     """
     Dependency function that yields database sessions.
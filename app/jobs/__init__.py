@@ -0,0 +1,16 @@
+# Background job queue
+from app.jobs.queue import (
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JobContext,
+    LeaseLost,
+    cancel_job,
+    enqueue,
+    get_job,
+    job_handler,
+    retry_job
+)
+from app.jobs.schedule import periodic
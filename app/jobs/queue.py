@@ -0,0 +1,349 @@
+"""
+Database-backed job queue.
+
+Jobs are rows in the job table. A worker leases a job with a compare-and-set
+UPDATE, so several workers (threads or processes) can poll the same table
+without running a job twice. The lease is renewed while the job runs; if the
+worker dies, the lease expires and another worker picks the job up again.
+Failed jobs are retried with exponential backoff until max_attempts is reached.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, delete, event, or_, select, update
+from sqlmodel import Session
+
+from app.config import settings
+from app.database import engine
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+# Number of due jobs fetched per claim attempt
+_CLAIM_CANDIDATES = 10
+
+_handlers: Dict[str, Callable] = {}
+
+# Set whenever a job is enqueued from this process, to wake local workers
+job_available = threading.Event()
+
+
+class LeaseLost(Exception):
+    """The job was cancelled or leased by another worker while running."""
+
+
+def job_handler(job_type: str):
+    """
+    Register a function as the handler for a job type.
+
+    The handler is called as handler(ctx, payload) with a JobContext and the
+    job's payload dict. Its return value (a dict or None) is stored as the
+    job's result; raising an exception fails the attempt.
+    """
+    def decorator(func: Callable) -> Callable:
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+def get_handler(job_type: str) -> Optional[Callable]:
+    """Return the handler registered for a job type."""
+    return _handlers.get(job_type)
+
+
+def _wake_workers(session):
+    job_available.set()
+
+
+def enqueue(
+    db: Session,
+    job_type: str,
+    payload: Optional[dict] = None,
+    description: Optional[str] = None,
+    priority: int = 0,
+    run_at: Optional[datetime] = None,
+    max_attempts: Optional[int] = None,
+    total: int = 0,
+    dedupe_key: Optional[str] = None
+) -> Job:
+    """
+    Add a job to the queue.
+
+    The job is added to the session but not committed, so it becomes visible
+    to workers together with the caller's other changes.
+
+    Args:
+        db: Database session
+        job_type: Name of a registered handler
+        payload: JSON-serializable arguments for the handler
+        description: Human readable description shown in the job status
+        priority: Jobs with a higher priority run first
+        run_at: Earliest time to run the job (defaults to now)
+        max_attempts: Attempts before the job fails (defaults to JOB_MAX_ATTEMPTS)
+        total: Amount of work expected, for progress reporting
+        dedupe_key: Optional unique key; a second job with the same key fails to insert
+
+    Returns:
+        The queued job
+    """
+    job = Job(
+        type=job_type,
+        payload=payload or {},
+        description=description,
+        priority=priority,
+        run_at=run_at or datetime.utcnow(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        total=total,
+        dedupe_key=dedupe_key
+    )
+    db.add(job)
+    db.flush()
+
+    if not event.contains(db, "after_commit", _wake_workers):
+        event.listen(db, "after_commit", _wake_workers)
+
+    return job
+
+
+def get_job(db: Session, job_id: UUID) -> Optional[Job]:
+    """Return a job by id."""
+    return db.execute(select(Job).where(Job.id == job_id)).scalar_one_or_none()
+
+
+def cancel_job(db: Session, job_id: UUID) -> bool:
+    """
+    Cancel a queued or running job.
+
+    A running job stops at its next progress report. Returns False if the job
+    had already finished.
+    """
+    now = datetime.utcnow()
+    result = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status.in_((JOB_QUEUED, JOB_RUNNING)))
+        .values(status=JOB_CANCELLED, locked_by=None, lease_expires_at=None, finished_at=now)
+    )
+    db.commit()
+    return bool(result.rowcount)
+
+
+def retry_job(db: Session, job_id: UUID) -> bool:
+    """Queue a failed or cancelled job again with a fresh set of attempts."""
+    result = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status.in_((JOB_FAILED, JOB_CANCELLED)))
+        .values(
+            status=JOB_QUEUED,
+            attempts=0,
+            run_at=datetime.utcnow(),
+            error=None,
+            finished_at=None
+        )
+    )
+    db.commit()
+    if result.rowcount:
+        job_available.set()
+    return bool(result.rowcount)
+
+
+class JobContext:
+    """Handle given to a job handler for reporting progress."""
+
+    def __init__(self, job: Job, worker_id: str):
+        self.job_id = job.id
+        self.job_type = job.type
+        self.worker_id = worker_id
+        self.attempt = job.attempts
+        self.processed = job.processed
+        self.total = job.total
+        # Result saved by the last progress report, for resuming where a failed attempt stopped
+        self.result = dict(job.result or {})
+
+    def _leased(self):
+        return and_(
+            Job.id == self.job_id,
+            Job.status == JOB_RUNNING,
+            Job.locked_by == self.worker_id
+        )
+
+    def progress(self, processed: int, total: Optional[int] = None, result: Optional[dict] = None):
+        """
+        Record progress and renew the lease.
+
+        Raises LeaseLost if the job was cancelled or taken over by another
+        worker, so the handler stops at a safe point.
+        """
+        values = {
+            "processed": processed,
+            "lease_expires_at": datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        }
+        if total is not None:
+            values["total"] = total
+        if result is not None:
+            values["result"] = result
+
+        with Session(engine) as db:
+            updated = db.execute(update(Job).where(self._leased()).values(**values)).rowcount
+            db.commit()
+
+        if not updated:
+            raise LeaseLost(f"Job {self.job_id} is no longer leased by {self.worker_id}")
+
+        self.processed = processed
+        if total is not None:
+            self.total = total
+        if result is not None:
+            self.result = result
+
+    def heartbeat(self) -> bool:
+        """Renew the lease without changing progress; returns False if it was lost."""
+        with Session(engine) as db:
+            updated = db.execute(
+                update(Job).where(self._leased()).values(
+                    lease_expires_at=datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+                )
+            ).rowcount
+            db.commit()
+        return bool(updated)
+
+    def complete(self, result: Optional[dict] = None):
+        """Mark the job as completed."""
+        values = {
+            "status": JOB_COMPLETED,
+            "locked_by": None,
+            "lease_expires_at": None,
+            "finished_at": datetime.utcnow(),
+            "error": None
+        }
+        if result is not None:
+            values["result"] = result
+
+        with Session(engine) as db:
+            db.execute(update(Job).where(self._leased()).values(**values))
+            db.commit()
+
+    def fail(self, error: str, max_attempts: int):
+        """Schedule another attempt with backoff, or mark the job as failed."""
+        now = datetime.utcnow()
+        values = {"locked_by": None, "lease_expires_at": None, "error": error}
+        if self.attempt < max_attempts:
+            delay = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (self.attempt - 1)
+            values.update(status=JOB_QUEUED, run_at=now + timedelta(seconds=delay))
+        else:
+            values.update(status=JOB_FAILED, finished_at=now)
+
+        with Session(engine) as db:
+            db.execute(update(Job).where(self._leased()).values(**values))
+            db.commit()
+
+
+def _claimable(now: datetime):
+    """Jobs that are due, or whose worker stopped renewing the lease."""
+    return or_(
+        and_(Job.status == JOB_QUEUED, Job.run_at <= now),
+        and_(Job.status == JOB_RUNNING, Job.lease_expires_at < now)
+    )
+
+
+def claim_job(worker_id: str, job_types: Optional[Iterable[str]] = None) -> Optional[Job]:
+    """
+    Lease the next due job for a worker.
+
+    Candidates are read without locks and then claimed with an UPDATE that
+    only matches if the row is still claimable and unchanged (same attempt
+    count), so concurrent workers never lease the same job.
+
+    Args:
+        worker_id: Identifier stored in locked_by
+        job_types: Only claim jobs of these types (defaults to all registered)
+
+    Returns:
+        The leased job, or None if nothing is due
+    """
+    job_types = list(job_types) if job_types is not None else list(_handlers)
+    if not job_types:
+        return None
+
+    now = datetime.utcnow()
+    with Session(engine) as db:
+        candidates = db.execute(
+            select(Job.id, Job.status, Job.attempts, Job.max_attempts)
+            .where(_claimable(now), Job.type.in_(job_types))
+            .order_by(Job.priority.desc(), Job.run_at)
+            .limit(_CLAIM_CANDIDATES)
+        ).all()
+
+        for job_id, status, attempts, max_attempts in candidates:
+            unchanged = and_(Job.id == job_id, Job.attempts == attempts, _claimable(now))
+
+            if status == JOB_RUNNING and attempts >= max_attempts:
+                # The last attempt's worker died; give up instead of retrying
+                db.execute(update(Job).where(unchanged).values(
+                    status=JOB_FAILED,
+                    locked_by=None,
+                    lease_expires_at=None,
+                    finished_at=now,
+                    error="Lease expired on the last attempt"
+                ))
+                db.commit()
+                continue
+
+            claimed = db.execute(update(Job).where(unchanged).values(
+                status=JOB_RUNNING,
+                locked_by=worker_id,
+                lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                attempts=Job.attempts + 1,
+                started_at=now
+            )).rowcount
+            db.commit()
+
+            if claimed:
+                job = db.get(Job, job_id)
+                db.expunge(job)
+                return job
+
+    return None
+
+
+def run_job(job: Job, worker_id: str, on_start: Optional[Callable] = None, on_finish: Optional[Callable] = None):
+    """Run a leased job's handler and record the outcome."""
+    ctx = JobContext(job, worker_id)
+    handler = get_handler(job.type)
+    if handler is None:
+        ctx.fail(f"No handler registered for job type '{job.type}'", max_attempts=0)
+        return
+
+    if on_start:
+        on_start(ctx)
+    try:
+        result = handler(ctx, dict(job.payload or {}))
+        ctx.complete(result)
+    except LeaseLost as e:
+        logger.warning("%s", e)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed on attempt %s", job.id, job.type, job.attempts)
+        ctx.fail(str(e) or e.__class__.__name__, job.max_attempts)
+    finally:
+        if on_finish:
+            on_finish(ctx)
+
+
+def prune_jobs(older_than: datetime) -> int:
+    """Delete finished jobs that finished before older_than."""
+    with Session(engine) as db:
+        result = db.execute(
+            delete(Job).where(Job.status.in_(FINISHED_STATUSES), Job.finished_at < older_than)
+        )
+        db.commit()
+        return result.rowcount or 0
@@ -0,0 +1,173 @@
+"""
+Cron-style schedules for recurring jobs.
+
+A schedule enqueues a job whenever the current minute matches its cron
+expression. Each run gets a dedupe key built from the schedule name and the
+minute, so any number of worker pools can run the scheduler and every slot is
+still enqueued exactly once.
+"""
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.config import settings
+from app.database import engine
+from app.models import Job
+from app.utils.query import insert_ignore
+
+logger = logging.getLogger(__name__)
+
+# (name, lowest value, highest value) for the five cron fields
+_CRON_FIELDS = [
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),  # Sunday is 0 or 7
+]
+
+_schedules: Dict[str, "Schedule"] = {}
+
+
+def _parse_field(expression: str, low: int, high: int) -> Set[int]:
+    """Expand one cron field ("*", "*/15", "1-5", "0,30") into the values it matches."""
+    values = set()
+    for part in expression.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid cron step: {step_text}")
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron value out of range {low}-{high}: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """A standard five-field cron expression: minute hour day month weekday."""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: {expression}")
+
+        self.expression = expression
+        parsed = []
+        for text, (name, low, high) in zip(fields, _CRON_FIELDS):
+            parsed.append(_parse_field(text, low, high))
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+
+        # Like cron, when both day fields are restricted either one may match
+        self._day_restricted = fields[2] != "*"
+        self._weekday_restricted = fields[4] != "*"
+
+    def matches(self, moment: datetime) -> bool:
+        """Return True if the expression fires at the minute of moment."""
+        if moment.minute not in self.minutes or moment.hour not in self.hours:
+            return False
+        if moment.month not in self.months:
+            return False
+
+        # Python counts weekdays from Monday, cron from Sunday
+        day_match = moment.day in self.days
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+
+class Schedule:
+    def __init__(self, name: str, cron: str, job_type: str, payload: Optional[dict] = None, **options):
+        self.name = name
+        self.cron = CronExpression(cron)
+        self.job_type = job_type
+        self.payload = payload or {}
+        self.options = options
+
+    def dedupe_key(self, moment: datetime) -> str:
+        return f"schedule:{self.name}:{moment:%Y%m%d%H%M}"
+
+
+def periodic(name: str, cron: str, job_type: str, payload: Optional[dict] = None, **options) -> Schedule:
+    """
+    Register a recurring job.
+
+    Args:
+        name: Unique name of the schedule
+        cron: Cron expression evaluated in UTC, e.g. "*/5 * * * *"
+        job_type: Handler to run
+        payload: Payload for every run
+        **options: description, priority or max_attempts for the queued jobs
+
+    Returns:
+        The schedule
+    """
+    schedule = Schedule(name, cron, job_type, payload, **options)
+    _schedules[name] = schedule
+    return schedule
+
+
+def get_schedules() -> List[Schedule]:
+    """Return all registered schedules."""
+    return list(_schedules.values())
+
+
+def enqueue_due(now: Optional[datetime] = None) -> int:
+    """
+    Enqueue a job for every schedule that fires in the current minute.
+
+    Safe to call repeatedly and from several processes; slots that were
+    already enqueued are skipped. Returns the number of jobs enqueued.
+    """
+    now = now or datetime.utcnow()
+    moment = now.replace(second=0, microsecond=0)
+    due = [schedule for schedule in _schedules.values() if schedule.cron.matches(moment)]
+    if not due:
+        return 0
+
+    enqueued = 0
+    with Session(engine) as db:
+        stmt = insert_ignore(Job, db.get_bind().dialect.name)
+        for schedule in due:
+            row = {
+                "id": uuid.uuid4(),
+                "type": schedule.job_type,
+                "payload": schedule.payload,
+                "description": schedule.options.get("description") or f"Scheduled: {schedule.name}",
+                "priority": schedule.options.get("priority", 0),
+                "max_attempts": schedule.options.get("max_attempts", settings.JOB_MAX_ATTEMPTS),
+                "status": "queued",
+                "run_at": moment,
+                "dedupe_key": schedule.dedupe_key(moment),
+                "created_at": now,
+                "updated_at": now,
+            }
+            try:
+                result = db.connection().execute(stmt if stmt is not None else insert(Job), row)
+                db.commit()
+                enqueued += max(result.rowcount or 0, 0)
+            except IntegrityError:
+                # Dialects without INSERT IGNORE report the duplicate slot instead
+                db.rollback()
+
+    if enqueued:
+        logger.info("Enqueued %s scheduled job(s) for %s", enqueued, moment)
+    return enqueued
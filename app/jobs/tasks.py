@@ -0,0 +1,131 @@
+"""
+Job handlers and recurring schedules.
+
+Import this module to register them; the worker pool does so on start.
+"""
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from app.auth.cache import principal_cache
+from app.config import settings
+from app.jobs.queue import JobContext, job_handler, prune_jobs
+from app.jobs.schedule import periodic
+from app.utils.cascade import CASCADE_DELETE_JOB, cascade_delete, get_table
+
+R2_PURGE_JOB = "r2_purge"
+MEDIA_INVENTORY_JOB = "media_inventory"
+MEDIA_GC_JOB = "media_gc"
+PRUNE_JOBS_JOB = "prune_jobs"
+STATS_ROLLUP_JOB = "stats_rollup"
+
+
+@job_handler(CASCADE_DELETE_JOB)
+def run_cascade_delete(ctx: JobContext, payload: dict) -> dict:
+    """Delete rows of a table and everything that depends on them."""
+    table = get_table(payload["table"])
+    ids = payload.get("ids")
+    exclude_ids = payload.get("exclude_ids")
+
+    # A retried attempt continues counting from where the last one stopped
+    already_processed = ctx.processed
+
+    def report(processed, deleted):
+        ctx.progress(already_processed + processed, result={"deleted": deleted})
+
+    deleted = cascade_delete(
+        table,
+        ids=[UUID(item_id) for item_id in ids] if ids is not None else None,
+        exclude_ids=[UUID(item_id) for item_id in exclude_ids] if exclude_ids else None,
+        on_progress=report
+    )
+
+    # Deleted accounts must stop authenticating in this process right away
+    if table.name == "user":
+        if ids is not None:
+            principal_cache.invalidate_ids(UUID(item_id) for item_id in ids)
+        else:
+            principal_cache.clear()
+
+    return {"deleted": deleted}
+
+
+@job_handler(R2_PURGE_JOB)
+def run_r2_purge(ctx: JobContext, payload: dict) -> dict:
+    """Delete every R2 object, or every object under a prefix."""
+    from app.utils.r2_storage import purge_objects
+
+    prefix = payload.get("prefix")
+
+    # A retried attempt resumes after the last key the previous one finished
+    previous = ctx.result if ctx.result.get("checkpoint") else {}
+
+    def report(progress):
+        ctx.progress(progress["deleted"], result={**progress, "prefix": prefix})
+
+    result = purge_objects(
+        prefix=prefix,
+        start_after=previous.get("checkpoint"),
+        previous=previous,
+        on_progress=report
+    )
+    return {**result, "deleted_count": result["deleted"], "prefix": prefix}
+
+
+@job_handler(MEDIA_INVENTORY_JOB)
+def run_media_inventory(ctx: JobContext, payload: dict) -> dict:
+    """Reconcile the media inventory with the R2 bucket."""
+    if not settings.USE_CLOUD_STORAGE:
+        return {"skipped": "Cloud storage is not enabled"}
+
+    from app.utils.media_inventory import reconcile_inventory
+
+    # A retried attempt resumes after the last page the previous one finished
+    checkpoint = ctx.result if ctx.result.get("after") else {}
+
+    def report(after, counts):
+        ctx.progress(counts["listed"], result={"after": after, "counts": counts})
+
+    counts = reconcile_inventory(
+        start_after=checkpoint.get("after"),
+        counts=checkpoint.get("counts"),
+        on_page=report
+    )
+    return {"counts": counts}
+
+
+@job_handler(MEDIA_GC_JOB)
+def run_media_gc(ctx: JobContext, payload: dict) -> dict:
+    """Find, and unless dry_run is set delete, media no article or product references."""
+    from app.utils.media_gc import collect_garbage
+
+    dry_run = payload.get("dry_run", not settings.MEDIA_GC_SCHEDULED_DELETE)
+
+    def report(progress):
+        ctx.progress(progress["listed"], result=progress)
+
+    return collect_garbage(dry_run=dry_run, grace_hours=payload.get("grace_hours"), on_progress=report)
+
+
+@job_handler(PRUNE_JOBS_JOB)
+def run_prune_jobs(ctx: JobContext, payload: dict) -> dict:
+    """Delete finished jobs older than JOB_RETENTION_DAYS."""
+    days = payload.get("days", settings.JOB_RETENTION_DAYS)
+    return {"pruned": prune_jobs(datetime.utcnow() - timedelta(days=days))}
+
+
+@job_handler(STATS_ROLLUP_JOB)
+def run_stats_rollup(ctx: JobContext, payload: dict) -> dict:
+    """Bring the hourly and daily stats rollups up to date."""
+    from app.utils.stats_rollups import METRICS, roll_up
+
+    def report(done, progress):
+        ctx.progress(done, total=len(METRICS), result=progress)
+
+    return roll_up(on_progress=report)
+
+
+periodic("prune-jobs", "17 3 * * *", PRUNE_JOBS_JOB, description="Prune finished jobs")
+periodic("media-gc", "29 4 * * 0", MEDIA_GC_JOB, description="Collect unreferenced media")
+periodic("stats-rollup", "*/10 * * * *", STATS_ROLLUP_JOB, description="Roll up content and engagement stats")
+if settings.USE_CLOUD_STORAGE:
+    periodic("media-inventory", "43 2 * * *", MEDIA_INVENTORY_JOB, description="Reconcile the R2 media inventory")
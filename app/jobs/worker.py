@@ -0,0 +1,168 @@
+"""
+Worker pool for the job queue.
+
+A pool runs a number of worker threads that lease and run jobs, plus one
+maintenance thread that renews the leases of running jobs and enqueues
+scheduled jobs. Pools can run inside the web process (JOB_WORKER_IN_PROCESS)
+or on their own with `python -m app.jobs`; start several processes to scale out.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID, uuid4
+
+from app.config import settings
+from app.jobs import tasks  # noqa: F401  (registers the job handlers and schedules)
+from app.jobs.queue import JobContext, claim_job, job_available, run_job
+from app.jobs.schedule import enqueue_due
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        job_types: Optional[Iterable[str]] = None,
+        run_scheduler: bool = True
+    ):
+        self.concurrency = max(concurrency or settings.JOB_WORKERS, 1)
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.job_types = list(job_types) if job_types else None
+        self.run_scheduler = run_scheduler
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[UUID, JobContext] = {}
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads and the maintenance thread."""
+        self._stopping.clear()
+        for index in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._work, args=(f"{self.name}/{index}",), name=f"job-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        thread = threading.Thread(target=self._maintain, name="job-maintenance", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+        logger.info("Job worker pool %s started with %s worker(s)", self.name, self.concurrency)
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Ask the threads to stop and wait for running jobs to finish.
+
+        Jobs still running after the timeout keep their lease until it expires
+        and are then picked up by another worker.
+        """
+        self.request_stop()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        self._threads = []
+        logger.info("Job worker pool %s stopped", self.name)
+
+    def request_stop(self):
+        """Signal the pool to stop without waiting; used from signal handlers."""
+        self._stopping.set()
+        job_available.set()
+
+    def wait(self):
+        """Block until the pool is stopped."""
+        while not self._stopping.wait(1.0):
+            pass
+
+    def _track(self, ctx: JobContext):
+        with self._running_lock:
+            self._running[ctx.job_id] = ctx
+
+    def _untrack(self, ctx: JobContext):
+        with self._running_lock:
+            self._running.pop(ctx.job_id, None)
+
+    def _work(self, worker_id: str):
+        while not self._stopping.is_set():
+            try:
+                job = claim_job(worker_id, self.job_types)
+            except Exception:
+                logger.exception("Worker %s could not claim a job", worker_id)
+                job = None
+
+            if job is None:
+                # Sleep until the next poll, or until a job is enqueued locally
+                job_available.wait(self.poll_interval)
+                job_available.clear()
+                continue
+
+            logger.info("Worker %s running job %s (%s)", worker_id, job.id, job.type)
+            run_job(job, worker_id, on_start=self._track, on_finish=self._untrack)
+
+    def _maintain(self):
+        # Renew leases well before they expire
+        heartbeat_interval = max(settings.JOB_LEASE_SECONDS / 3, 1)
+        last_heartbeat = time.monotonic()
+        last_minute = None
+
+        while not self._stopping.wait(min(self.poll_interval, 5.0)):
+            if time.monotonic() - last_heartbeat >= heartbeat_interval:
+                last_heartbeat = time.monotonic()
+                with self._running_lock:
+                    running = list(self._running.values())
+                for ctx in running:
+                    try:
+                        if not ctx.heartbeat():
+                            logger.warning("Job %s lost its lease", ctx.job_id)
+                    except Exception:
+                        logger.exception("Could not renew the lease of job %s", ctx.job_id)
+
+            minute = datetime.utcnow().replace(second=0, microsecond=0)
+            if self.run_scheduler and minute != last_minute:
+                last_minute = minute
+                try:
+                    if enqueue_due(minute):
+                        job_available.set()
+                except Exception:
+                    logger.exception("Could not enqueue scheduled jobs")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run a standalone worker pool until interrupted."""
+    import argparse
+    import signal
+
+    from app.database import create_db_and_tables
+
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKERS, help="Number of worker threads")
+    parser.add_argument("--type", action="append", dest="job_types", help="Only run jobs of this type (repeatable)")
+    parser.add_argument("--no-scheduler", action="store_true", help="Do not enqueue scheduled jobs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    create_db_and_tables()
+
+    pool = WorkerPool(
+        concurrency=args.concurrency,
+        job_types=args.job_types,
+        run_scheduler=not args.no_scheduler
+    )
+
+    def shutdown(signum, frame):
+        pool.request_stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    pool.start()
+    pool.wait()
+    pool.stop()
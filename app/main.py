@@ -1,11 +1,10 @@
 import logging
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session, select
-import boto3
 from botocore.exceptions import ClientError
 from contextlib import asynccontextmanager
 
@@ -16,22 +15,24 @@ from app.config import settings
 from app.database import engine, create_db_and_tables, get_db
 from app.models import User
 from app.auth.utils import get_password_hash
+from app.auth.hashing import shutdown_process_pool
 from app.api import api_router
 from app.routers import admin_router
 from app.auth.routes import router as auth_router
+from app.auth.middleware import AdminAuthMiddleware
 from app.utils.storage import StorageManager
+from app.utils.r2_storage import get_r2_client
+from app.utils.images import media_srcset, shutdown_pool as shutdown_image_pool
+from app.utils.static_files import CachedStaticFiles, static_url
+from app.routers.media import router as media_router
+from app.jobs.worker import WorkerPool
+from app.utils.timing import ServerTimingMiddleware
 
 # Function to verify R2 connection
 def verify_r2_connection():
     try:
-        # Create S3 client for R2
-        s3 = boto3.client(
-            service_name='s3',
-            endpoint_url=settings.R2_ENDPOINT_URL,
-            aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-            region_name=settings.R2_REGION_NAME
-        )
+        # Shared S3 client for R2; verifying also warms up its connection pool
+        s3 = get_r2_client()
         
         # Check if bucket exists by listing its contents
         s3.head_bucket(Bucket=settings.R2_BUCKET_NAME)
@@ -96,10 +97,16 @@ async def lifespan(app: FastAPI):
     
     # Verify R2 connection if cloud storage is enabled
     if settings.USE_CLOUD_STORAGE:
-        r2_connected = verify_r2_connection()
+        r2_connected = await run_in_threadpool(verify_r2_connection)
         if not r2_connected:
             print("\n⚠️ WARNING: Failed to connect to Cloudflare R2")
             print("   File uploads will fail. Please check your R2 configuration in .env file.")
+    
+    # Run background jobs in this process unless dedicated workers are used
+    worker_pool = None
+    if settings.JOB_WORKER_IN_PROCESS:
+        worker_pool = WorkerPool()
+        worker_pool.start()
         
     print("\n*********************************************")
     print("* FastAPI CMS is now running with modular   *")
@@ -112,6 +119,10 @@ async def lifespan(app: FastAPI):
     
     # Shutdown: Cleanup code can go here
     print("\nShutting down FastAPI CMS...")
+    if worker_pool:
+        worker_pool.stop()
+    shutdown_process_pool()
+    shutdown_image_pool()
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(
@@ -130,18 +141,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Resolve the admin session once per request and redirect anonymous visitors
+app.add_middleware(AdminAuthMiddleware)
+
+# Report per-request timings (e.g. token verification) to the client
+if settings.SERVER_TIMING:
+    app.add_middleware(ServerTimingMiddleware)
+
 # Set up templates
 templates = Jinja2Templates(directory="templates")
 
 # Add the filter to Jinja2 environment
 templates.env.filters["media_url"] = StorageManager.get_file_url
 
+templates.env.filters["media_srcset"] = media_srcset
+
+templates.env.globals["static_url"] = static_url
+
+# Resized images; registered before the /media mount so it takes precedence
+app.include_router(media_router)
+
 # Mount static files
-app.mount("/static", StaticFiles(directory=settings.STATIC_ROOT), name="static")
+app.mount("/static", CachedStaticFiles(directory=settings.STATIC_ROOT), name="static")
 
-# Only mount media directory locally if not using cloud storage
+# Only mount media directory locally if not using cloud storage; uploaded
+# files never change, so they are all cached as immutable
 if not settings.USE_CLOUD_STORAGE:
-    app.mount("/media", StaticFiles(directory=settings.MEDIA_ROOT), name="media")
+    app.mount("/media", CachedStaticFiles(directory=settings.MEDIA_ROOT, immutable=True), name="media")
 
 # Include routers
 app.include_router(api_router)
@@ -1,6 +1,8 @@
-from sqlmodel import SQLModel, Field, Relationship
-from pydantic import EmailStr
-from typing import Optional, List
+from sqlmodel import SQLModel, Field, Relationship, Column, JSON
+from sqlalchemy import BigInteger, Index, event
+from sqlalchemy.dialects.postgresql import JSONB
+from pydantic import EmailStr, computed_field, field_validator, model_validator
+from typing import Optional, List, Dict
 from datetime import datetime
 import json
 import uuid
@@ -53,6 +55,30 @@ class UserUpdate(SQLModel):
     last_name: Optional[str] = None
 
 
+class UserImport(UserBase):
+    """A user to import: either a plain password or a bcrypt hash from another system."""
+    password: Optional[str] = None
+    password_hash: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_password(self):
+        if (self.password is None) == (self.password_hash is None):
+            raise ValueError("Provide either password or password_hash")
+        return self
+
+
+class UserImportError(SQLModel):
+    row: int
+    username: Optional[str] = None
+    detail: str
+
+
+class UserImportResult(SQLModel):
+    created: int = 0
+    skipped: int = 0
+    errors: List[UserImportError] = []
+
+
 class CategoryBase(SQLModel):
     name: str = Field(max_length=100, index=True, unique=True)
     description: Optional[str] = None
@@ -93,34 +119,36 @@ class ArticleBase(SQLModel):
     featured_image: Optional[str] = Field(default=None, max_length=500)
     excerpt: Optional[str] = None
     footer_content: Optional[str] = None
-    views: int = Field(default=0)
-    category_id: UUID = Field(foreign_key="category.id")
-    author_id: UUID = Field(foreign_key="user.id")
+    views: int = Field(default=0, index=True)
+    category_id: UUID = Field(foreign_key="category.id", ondelete="CASCADE", index=True)
+    author_id: UUID = Field(foreign_key="user.id", ondelete="CASCADE", index=True)
     slug: Optional[str] = Field(default=None, max_length=200, index=True, unique=True)
 
 
 class ArticleTagLink(SQLModel, table=True):
     article_id: Optional[UUID] = Field(
-        default=None, foreign_key="article.id", primary_key=True
+        default=None, foreign_key="article.id", primary_key=True, ondelete="CASCADE"
     )
     tag_id: Optional[UUID] = Field(
-        default=None, foreign_key="tag.id", primary_key=True
+        default=None, foreign_key="tag.id", primary_key=True, ondelete="CASCADE", index=True
     )
 
 
 class ProductArticleLink(SQLModel, table=True):
     product_id: Optional[UUID] = Field(
-        default=None, foreign_key="product.id", primary_key=True
+        default=None, foreign_key="product.id", primary_key=True, ondelete="CASCADE"
     )
     article_id: Optional[UUID] = Field(
-        default=None, foreign_key="article.id", primary_key=True
+        default=None, foreign_key="article.id", primary_key=True, ondelete="CASCADE", index=True
     )
 
 
 class Article(ArticleBase, table=True):
     id: Optional[UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
+    # Set when the article is first published
+    published_at: Optional[datetime] = Field(default=None, index=True)
     
     # Relationships
     category: Category = Relationship(back_populates="articles")
@@ -130,8 +158,17 @@ class Article(ArticleBase, table=True):
     products: List["Product"] = Relationship(back_populates="articles", link_model=ProductArticleLink)
 
 
+@event.listens_for(Article, "before_insert")
+@event.listens_for(Article, "before_update")
+def _stamp_published_at(mapper, connection, target: Article):
+    if target.published and target.published_at is None:
+        target.published_at = datetime.utcnow()
+
+
 class ArticleCreate(ArticleBase):
-    pass
+    # Tags can be given by id or by name; unknown names are created
+    tag_ids: Optional[List[UUID]] = None
+    tag_names: Optional[List[str]] = None
 
 
 class ArticleRead(ArticleBase):
@@ -156,17 +193,20 @@ class ArticleUpdate(SQLModel):
     footer_content: Optional[str] = None
     category_id: Optional[UUID] = None
     slug: Optional[str] = None
+    # When either is set, the article's tags are replaced by the given set
+    tag_ids: Optional[List[UUID]] = None
+    tag_names: Optional[List[str]] = None
 
 
 class CommentBase(SQLModel):
     content: str
-    article_id: UUID = Field(foreign_key="article.id")
-    author_id: UUID = Field(foreign_key="user.id")
+    article_id: UUID = Field(foreign_key="article.id", ondelete="CASCADE", index=True)
+    author_id: UUID = Field(foreign_key="user.id", ondelete="CASCADE", index=True)
 
 
 class Comment(CommentBase, table=True):
     id: Optional[UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
     
     # Relationships
@@ -219,18 +259,46 @@ class TagUpdate(SQLModel):
     name: Optional[str] = None
 
 
+def parse_social_links(value) -> Optional[Dict[str, str]]:
+    """
+    Normalize social links to a dict of {"name": "link"}.
+    
+    Accepts a dict or a JSON object string (as posted by the admin forms).
+    Raises ValueError if the value is not a JSON object.
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            raise ValueError("social_links must be valid JSON")
+    if not isinstance(value, dict):
+        raise ValueError("social_links must be a JSON object")
+    return value
+
+
 class ProductBase(SQLModel):
     name: str = Field(max_length=200, index=True)
-    price: int = Field(default=0)
+    price: int = Field(default=0, index=True)
     slug: str = Field(max_length=200, index=True, unique=True)
     description: Optional[str] = None
     featured_image: Optional[str] = Field(default=None, max_length=500)
-    social_links: Optional[str] = Field(default=None)  # JSON string with format {"name": "link"}
+    # Stored as a native JSON column (JSONB on PostgreSQL and CockroachDB) with format {"name": "link"}
+    social_links: Optional[Dict[str, str]] = Field(
+        default=None,
+        sa_column=Column(JSON().with_variant(JSONB(), "postgresql", "cockroachdb"))
+    )
+
+    @field_validator("social_links", mode="before")
+    @classmethod
+    def validate_social_links(cls, value):
+        return parse_social_links(value)
 
 
 class Product(ProductBase, table=True):
     id: Optional[UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
     
     # Relationships
@@ -248,10 +316,8 @@ class ProductRead(ProductBase):
     
     @property
     def parsed_social_links(self) -> Optional[dict]:
-        """Return social_links as a parsed JSON object if it exists."""
-        if not self.social_links:
-            return None
-        return json.loads(self.social_links)
+        """Return social_links; kept for compatibility now that the column is native JSON."""
+        return self.social_links
 
     class Config:
         json_encoders = {
@@ -265,7 +331,7 @@ class ProductRead(ProductBase):
                 "slug": "product-name",
                 "description": "Product description",
                 "featured_image": "https://example.com/image.jpg",
-                "social_links": '{"facebook": "https://facebook.com/product", "twitter": "https://twitter.com/product"}',
+                "social_links": {"facebook": "https://facebook.com/product", "twitter": "https://twitter.com/product"},
                 "created_at": "2023-01-01T00:00:00",
                 "updated_at": "2023-01-01T00:00:00"
             }
@@ -278,7 +344,12 @@ class ProductUpdate(SQLModel):
     slug: Optional[str] = None
     description: Optional[str] = None
     featured_image: Optional[str] = None
-    social_links: Optional[str] = None
+    social_links: Optional[Dict[str, str]] = None
+
+    @field_validator("social_links", mode="before")
+    @classmethod
+    def validate_social_links(cls, value):
+        return parse_social_links(value)
 
 
 class ProductReadWithParsedLinks(SQLModel):
@@ -288,11 +359,12 @@ class ProductReadWithParsedLinks(SQLModel):
     slug: str
     description: Optional[str] = None
     featured_image: Optional[str] = None
-    social_links: Optional[dict] = None  # This will be filled with parsed links
+    social_links: Optional[dict] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
+        from_attributes = True
         json_encoders = {
             datetime: lambda v: v.isoformat()
         }
@@ -314,11 +386,14 @@ class ProductReadWithParsedLinks(SQLModel):
 class SystemLogBase(SQLModel):
     action: str
     details: Optional[str] = None
-    user_id: UUID = Field(foreign_key="user.id")
+    user_id: UUID = Field(foreign_key="user.id", ondelete="CASCADE", index=True)
     ip_address: Optional[str] = None
 
 
 class SystemLog(SystemLogBase, table=True):
+    # Stats rollups count entries of one action by time
+    __table_args__ = (Index("ix_systemlog_action_created_at", "action", "created_at"),)
+
     id: Optional[UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -359,4 +434,93 @@ class SystemSettingsRead(SystemSettingsBase):
 
 class SystemSettingsUpdate(SQLModel):
     value: Optional[str] = None
-    description: Optional[str] = None 
\ No newline at end of file
+    description: Optional[str] = None
+
+
+class JobBase(SQLModel):
+    type: str = Field(max_length=100, index=True)
+    description: Optional[str] = Field(default=None, max_length=255)
+    status: str = Field(default="queued", max_length=20)  # queued, running, completed, failed, cancelled
+    priority: int = Field(default=0)  # Higher runs first
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    run_at: datetime = Field(default_factory=datetime.utcnow)
+    processed: int = Field(default=0)
+    total: int = Field(default=0)
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class Job(JobBase, table=True):
+    # Workers look for due jobs by status and run_at
+    __table_args__ = (Index("ix_job_status_run_at", "status", "run_at"),)
+
+    id: Optional[UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
+    payload: Dict = Field(
+        default_factory=dict,
+        sa_column=Column(JSON().with_variant(JSONB(), "postgresql", "cockroachdb"), nullable=False)
+    )
+    result: Optional[Dict] = Field(
+        default=None,
+        sa_column=Column(JSON().with_variant(JSONB(), "postgresql", "cockroachdb"))
+    )
+    locked_by: Optional[str] = Field(default=None, max_length=100)
+    lease_expires_at: Optional[datetime] = None
+    # Scheduled runs use a key per schedule slot so each slot is enqueued once
+    dedupe_key: Optional[str] = Field(default=None, max_length=200, unique=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
+
+
+class JobRead(JobBase):
+    id: UUID
+    result: Optional[Dict] = None
+    created_at: datetime
+    updated_at: datetime
+
+    @computed_field
+    @property
+    def progress(self) -> float:
+        """Fraction of the work done, between 0 and 1."""
+        if self.status == "completed":
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.processed / self.total, 1.0)
+
+    class Config:
+        from_attributes = True
+
+
+class MediaBlob(SQLModel, table=True):
+    """An uploaded file, stored once under the SHA-256 of its content."""
+    digest: str = Field(max_length=64, primary_key=True)
+    path: str = Field(max_length=500, unique=True)
+    size: int = Field(default=0)
+    content_type: Optional[str] = Field(default=None, max_length=100)
+    # Article and product rows that reference the file; unreferenced blobs may be deleted
+    ref_count: int = Field(default=0, index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
+
+
+class MediaObject(SQLModel, table=True):
+    """An object in the R2 bucket, kept up to date on upload and delete and by reconcile runs."""
+    # Storage stats group by extension and sum sizes from the index alone
+    __table_args__ = (Index("ix_mediaobject_extension_size", "extension", "size"),)
+
+    key: str = Field(max_length=1024, primary_key=True)
+    size: int = Field(default=0, sa_type=BigInteger)
+    content_type: Optional[str] = Field(default=None, max_length=100)
+    extension: str = Field(max_length=20)
+    last_modified: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class StatsRollup(SQLModel, table=True):
+    """A metric counted over one hour or one day (UTC), maintained by the stats rollup job."""
+    period: str = Field(max_length=10, primary_key=True)
+    metric: str = Field(max_length=50, primary_key=True)
+    bucket_start: datetime = Field(primary_key=True)
+    value: int = Field(default=0, sa_type=BigInteger)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
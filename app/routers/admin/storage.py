@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from sqlmodel import Session
 from typing import List, Dict, Any, Optional
@@ -7,13 +8,11 @@ from app.database import get_db
 from app.models import User
 from app.auth.deps import get_current_active_superuser
 from app.config import settings
-from app.utils.r2_storage import (
-    list_all_objects, 
-    delete_all_objects, 
-    delete_objects_by_prefix,
-    delete_specific_objects
-)
+from app.utils.r2_storage import purge_objects
+from app.utils.media_inventory import inventory_stats
 from app.utils.logging import log_admin_action
+from app.jobs import enqueue
+from app.jobs.tasks import MEDIA_GC_JOB, MEDIA_INVENTORY_JOB, R2_PURGE_JOB
 
 router = APIRouter(prefix="/storage", tags=["admin", "storage"])
 
@@ -35,61 +34,92 @@ async def get_r2_storage_stats(
             db=db,
             user_id=current_user.id,
             action="view_r2_stats",
-            resource_type="storage",
-            resource_id=None,
-            description="Viewed R2 storage statistics"
+            details="Viewed R2 storage statistics"
         )
+        db.commit()
         
-        # Get all objects
-        objects = list_all_objects()
-        
-        # Calculate statistics
-        total_objects = len(objects)
-        total_size = sum(obj.get('Size', 0) for obj in objects)
-        
-        # Categorize by file type
-        file_types = {}
-        for obj in objects:
-            key = obj.get('Key', '')
-            extension = key.split('.')[-1].lower() if '.' in key else 'unknown'
-            
-            if extension not in file_types:
-                file_types[extension] = {
-                    'count': 0,
-                    'size': 0
-                }
-            
-            file_types[extension]['count'] += 1
-            file_types[extension]['size'] += obj.get('Size', 0)
+        # Totals, file types and recent files come from the media inventory,
+        # not from listing the bucket
+        return await run_in_threadpool(inventory_stats, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving R2 stats: {str(e)}")
+
+
+@router.post("/r2/inventory/reconcile", response_model=Dict[str, Any])
+async def reconcile_r2_inventory(
+    current_user: User = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db)
+):
+    """
+    Compare the media inventory with the bucket and fix any differences.
+    Runs as a background job; poll /api/jobs/{job_id} for progress.
+    Requires superuser access.
+    """
+    if not settings.USE_CLOUD_STORAGE:
+        raise HTTPException(status_code=400, detail="Cloud storage is not enabled")
+    
+    try:
+        job = enqueue(db, MEDIA_INVENTORY_JOB, {}, description="Reconcile the R2 media inventory")
+        log_admin_action(
+            db=db,
+            user_id=current_user.id,
+            action="reconcile_r2_inventory",
+            details=f"Reconcile the R2 media inventory (job: {job.id})"
+        )
+        db.commit()
         
-        # Get most recent files
-        most_recent = sorted(
-            objects, 
-            key=lambda x: x.get('LastModified', 0), 
-            reverse=True
-        )[:10]
+        return {
+            "status": "queued",
+            "message": "R2 media inventory reconcile has been queued",
+            "background": True,
+            "job_id": str(job.id)
+        }
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error starting inventory reconcile: {str(e)}")
+
+
+@router.post("/media/gc", response_model=Dict[str, Any])
+async def collect_media_garbage(
+    dry_run: bool = True,
+    grace_hours: Optional[int] = None,
+    current_user: User = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db)
+):
+    """
+    Find uploaded files that no article or product references.
+    With dry_run=false they are deleted, except files younger than
+    grace_hours (MEDIA_GC_GRACE_HOURS by default).
+    Runs as a background job; the report is the job's result at /api/jobs/{job_id}.
+    Requires superuser access.
+    """
+    if grace_hours is not None and grace_hours < 0:
+        raise HTTPException(status_code=400, detail="grace_hours must not be negative")
+    
+    try:
+        description = "Report unreferenced media" if dry_run else "Delete unreferenced media"
+        job = enqueue(db, MEDIA_GC_JOB, {"dry_run": dry_run, "grace_hours": grace_hours}, description=description)
+        log_admin_action(
+            db=db,
+            user_id=current_user.id,
+            action="collect_media_garbage",
+            details=f"{description} (job: {job.id})"
+        )
+        db.commit()
         
         return {
-            "total_objects": total_objects,
-            "total_size_bytes": total_size,
-            "total_size_mb": round(total_size / (1024 * 1024), 2),
-            "file_types": file_types,
-            "most_recent_files": [
-                {
-                    "key": obj.get('Key'),
-                    "size": obj.get('Size'),
-                    "last_modified": obj.get('LastModified')
-                }
-                for obj in most_recent
-            ]
+            "status": "queued",
+            "message": f"Media garbage collection{' (dry run)' if dry_run else ''} has been queued",
+            "background": True,
+            "job_id": str(job.id)
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving R2 stats: {str(e)}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error starting media garbage collection: {str(e)}")
 
 
 @router.post("/r2/purge", response_model=Dict[str, Any])
 async def purge_r2_storage(
-    background_tasks: BackgroundTasks,
     prefix: Optional[str] = None,
     current_user: User = Depends(get_current_active_superuser),
     db: Session = Depends(get_db)
@@ -97,43 +127,40 @@ async def purge_r2_storage(
     """
     Delete all files in the R2 storage.
     Optionally limit to a specific prefix.
+    The purge runs as a background job; poll /api/jobs/{job_id} for progress.
     Requires superuser access.
     """
     if not settings.USE_CLOUD_STORAGE:
         raise HTTPException(status_code=400, detail="Cloud storage is not enabled")
     
     try:
-        # Log the action
-        log_description = "Purged all R2 storage files"
+        description = "Purge all R2 storage files"
         if prefix:
-            log_description = f"Purged R2 storage files with prefix '{prefix}'"
-            
+            description = f"Purge R2 storage files with prefix '{prefix}'"
+        
+        # Queue the purge so it survives restarts and reports progress
+        job = enqueue(db, R2_PURGE_JOB, {"prefix": prefix}, description=description)
+        
+        # Log the action
         log_admin_action(
             db=db,
             user_id=current_user.id,
             action="purge_r2_storage",
-            resource_type="storage",
-            resource_id=None,
-            description=log_description
+            details=f"{description} (job: {job.id})"
         )
         
-        # Start the deletion in a background task
-        def delete_files():
-            if prefix:
-                return delete_objects_by_prefix(prefix, force=True)
-            else:
-                return delete_all_objects(force=True)
-        
-        background_tasks.add_task(delete_files)
+        db.commit()
         
         # Return immediate success response
         return {
-            "status": "started",
-            "message": f"R2 storage purge {'for prefix ' + prefix if prefix else ''} has been started",
-            "background": True
+            "status": "queued",
+            "message": f"R2 storage purge {'for prefix ' + prefix if prefix else ''} has been queued",
+            "background": True,
+            "job_id": str(job.id)
         }
         
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=f"Error starting R2 purge: {str(e)}")
 
 
@@ -159,22 +186,20 @@ async def delete_r2_objects(
             db=db,
             user_id=current_user.id,
             action="delete_r2_objects",
-            resource_type="storage",
-            resource_id=None,
-            description=f"Deleted {len(keys)} objects from R2 storage"
+            details=f"Deleted {len(keys)} objects from R2 storage"
         )
+        db.commit()
         
-        # Delete the objects
-        success, count, error = delete_specific_objects(keys)
+        # Delete the objects, several batches at a time
+        result = await run_in_threadpool(purge_objects, keys=keys)
         
-        if success:
-            return {
-                "status": "success",
-                "deleted_count": count,
-                "message": f"Successfully deleted {count} objects"
-            }
-        else:
-            raise HTTPException(status_code=500, detail=f"Error deleting objects: {error}")
+        return {
+            "status": "success" if not result["failed"] else "partial",
+            "deleted_count": result["deleted"],
+            "failed_count": result["failed"],
+            "errors": result["errors"],
+            "message": f"Deleted {result['deleted']} objects, {result['failed']} failed"
+        }
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting R2 objects: {str(e)}") 
\ No newline at end of file
@@ -4,6 +4,7 @@ from fastapi.templating import Jinja2Templates
 from sqlmodel import Session, select, desc, delete, func
 from sqlalchemy.orm import selectinload
 from typing import Optional, List
+from uuid import UUID
 
 from app.database import get_db
 from app.models import Article, Category, Comment, Tag, ArticleTagLink
@@ -11,12 +12,27 @@ from app.auth.utils import get_user_from_cookie
 from app.utils.text import generate_unique_slug
 from app.utils.media import save_upload
 from app.utils.logging import log_admin_action
+from app.utils.cascade import schedule_deletion
+from app.utils.tags import resolve_tags, sync_article_tags
+from app.utils.bulk import (
+    parse_ids,
+    summarize_ids,
+    set_articles_published,
+    set_articles_category,
+    delete_articles
+)
 
 router = APIRouter(prefix="/articles")
 
 # Set up templates
 templates = Jinja2Templates(directory="templates")
 
+def _parse_tag_names(new_tags: Optional[str]) -> List[str]:
+    """Split the comma-separated new tags field into names."""
+    if not new_tags:
+        return []
+    return [name.strip() for name in new_tags.split(",") if name.strip()]
+
 @router.get("/", response_class=HTMLResponse)
 async def admin_articles(
     request: Request, 
@@ -188,6 +204,7 @@ async def admin_add_article(
     featured_image_file: Optional[UploadFile] = None,
     published: bool = Form(False),
     tag_ids: List[str] = Form([]),
+    new_tags: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
     # Verify user is logged in and is an admin
@@ -239,13 +256,11 @@ async def admin_add_article(
             footer_content=footer_content if footer_content and footer_content.strip() else None
         )
         db.add(article)
+        db.flush()
         
-        # Add tags
-        for tag_id in tag_ids:
-            tag = db.get(Tag, tag_id)
-            if tag:
-                article_tag = ArticleTagLink(article_id=article.id, tag_id=tag_id)
-                db.add(article_tag)
+        # Add selected tags and create any new ones in bulk
+        resolved_tag_ids, _ = resolve_tags(db, parse_ids(tag_ids), _parse_tag_names(new_tags))
+        sync_article_tags(db, article.id, resolved_tag_ids)
         
         # Log the action
         log_admin_action(
@@ -325,6 +340,7 @@ async def admin_edit_article(
     featured_image_file: Optional[UploadFile] = None,
     published: bool = Form(False),
     tag_ids: List[str] = Form([]),
+    new_tags: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
     # Verify user is logged in and is an admin
@@ -379,16 +395,9 @@ async def admin_edit_article(
         article.excerpt = excerpt if excerpt and excerpt.strip() else None
         article.footer_content = footer_content if footer_content and footer_content.strip() else None
         
-        # Update tags
-        # First, remove all existing tags
-        db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id == article_id))
-        
-        # Then add new tags
-        for tag_id in tag_ids:
-            tag = db.get(Tag, tag_id)
-            if tag:
-                article_tag = ArticleTagLink(article_id=article_id, tag_id=tag_id)
-                db.add(article_tag)
+        # Update tags, only inserting and deleting the links that changed
+        resolved_tag_ids, _ = resolve_tags(db, parse_ids(tag_ids), _parse_tag_names(new_tags))
+        sync_article_tags(db, article.id, resolved_tag_ids)
         
         # Log the action
         log_admin_action(
@@ -485,35 +494,93 @@ async def admin_delete_all_articles_confirm(request: Request, db: Session = Depe
     )
 
 @router.get("/delete-all-confirm")
-async def admin_delete_all_articles(request: Request, db: Session = Depends(get_db)):
+async def admin_delete_all_articles(
+    request: Request,
+    db: Session = Depends(get_db)
+):
     # Verify user is logged in and is an admin
     user = await get_user_from_cookie(request, db)
     if not user or not user.is_superuser:
         return RedirectResponse(url="/admin/login", status_code=303)
     
     try:
-        # Count articles before deletion
-        article_count = db.execute(select(func.count()).select_from(Article)).scalar() or 0
-        
-        # Delete all articles and related entries
-        db.execute(delete(ArticleTagLink))
-        db.execute(delete(Comment))
-        db.execute(delete(Article))
+        # Delete in chunks in the background instead of one long transaction
+        job = schedule_deletion(db, Article, "Delete all articles")
         
         # Log the action
         log_admin_action(
             db=db,
             user_id=user.id,
             action="Delete All Articles",
-            details=f"Deleted all articles (total: {article_count})",
+            details=f"Started deleting all articles and their comments (total: {job.total}, job: {job.id})",
             request=request
         )
         
         db.commit()
         
         return RedirectResponse(
-            url="/admin/articles?message=All articles and their comments have been deleted successfully",
+            url=f"/admin/articles?message=Deleting {job.total} articles in the background (job {job.id})",
             status_code=303
         )
     except Exception as e:
-        return HTMLResponse(f"Error deleting all articles: {str(e)}. <a href='/admin/articles'>Go back</a>", status_code=500) 
\ No newline at end of file
+        db.rollback()
+        return HTMLResponse(f"Error deleting all articles: {str(e)}. <a href='/admin/articles'>Go back</a>", status_code=500)
+
+@router.post("/bulk")
+async def admin_bulk_articles(
+    request: Request,
+    action: str = Form(...),
+    ids: List[str] = Form([]),
+    category_id: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """Publish, unpublish, recategorize or delete the selected articles in one statement."""
+    # Verify user is logged in and is an admin
+    user = await get_user_from_cookie(request, db)
+    if not user or not user.is_superuser:
+        return RedirectResponse(url="/admin/login", status_code=303)
+    
+    try:
+        article_ids = parse_ids(ids)
+        if not article_ids:
+            return RedirectResponse(url="/admin/articles?message=No articles selected", status_code=303)
+        
+        if action == "publish":
+            count = set_articles_published(db, article_ids, True)
+            summary = f"Published {count} articles"
+            log_action = "Bulk Publish Articles"
+        elif action == "unpublish":
+            count = set_articles_published(db, article_ids, False)
+            summary = f"Unpublished {count} articles"
+            log_action = "Bulk Unpublish Articles"
+        elif action == "recategorize":
+            category = None
+            if category_id:
+                category = db.execute(select(Category).where(Category.id == UUID(category_id))).scalar_one_or_none()
+            if not category:
+                return RedirectResponse(url="/admin/articles?message=Invalid category selected", status_code=303)
+            count = set_articles_category(db, article_ids, category.id)
+            summary = f"Moved {count} articles to category '{category.name}'"
+            log_action = "Bulk Recategorize Articles"
+        elif action == "delete":
+            count = delete_articles(db, article_ids)
+            summary = f"Deleted {count} articles"
+            log_action = "Bulk Delete Articles"
+        else:
+            return RedirectResponse(url=f"/admin/articles?message=Unknown bulk action: {action}", status_code=303)
+        
+        # One audit log entry for the whole batch
+        log_admin_action(
+            db=db,
+            user_id=user.id,
+            action=log_action,
+            details=f"{summary} (selected {len(article_ids)}: {summarize_ids(article_ids)})",
+            request=request
+        )
+        
+        db.commit()
+        
+        return RedirectResponse(url=f"/admin/articles?message={summary}", status_code=303)
+    except Exception as e:
+        db.rollback()
+        return RedirectResponse(url=f"/admin/articles?message=Error: {str(e)}", status_code=303)
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select, func, delete, or_
+from sqlmodel import Session, select, func, or_
 
+from uuid import UUID
 from app.database import get_db
-from app.models import Category, Article, Comment
+from app.models import Category, Article
 from app.auth.utils import get_user_from_cookie
 from app.utils.logging import log_admin_action
+from app.utils.cascade import schedule_deletion
 from app.utils.text import slugify
 
 router = APIRouter(prefix="/categories")
@@ -288,7 +290,11 @@ async def admin_edit_category(
         )
 
 @router.get("/{category_id}/delete")
-async def admin_delete_category(request: Request, category_id: str, db: Session = Depends(get_db)):
+async def admin_delete_category(
+    request: Request,
+    category_id: str,
+    db: Session = Depends(get_db)
+):
     # Verify user is logged in and is an admin
     user = await get_user_from_cookie(request, db)
     if not user or not user.is_superuser:
@@ -296,46 +302,21 @@ async def admin_delete_category(request: Request, category_id: str, db: Session
     
     try:
         # Get category
-        category = db.get(Category, category_id)
+        category = db.execute(
+            select(Category.id, Category.name).where(Category.id == UUID(category_id))
+        ).first()
         if not category:
             return RedirectResponse(
                 url="/admin/categories?message=Category not found",
                 status_code=303
             )
         
-        # Get category name for logging
-        category_name = category.name
-        
-        # Find all articles in this category
-        article_query = select(Article.id).where(Article.category_id == category_id)
-        article_ids = [row[0] for row in db.execute(article_query).all()]
-        
-        # If there are articles, delete related data
-        if article_ids:
-            # Import these models here to avoid circular imports
-            from app.models import ArticleTagLink, ProductArticleLink, SystemLog
-            
-            # Delete article-tag links for these articles
-            db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id.in_(article_ids)))
-            
-            # Delete article-product links for these articles
-            db.execute(delete(ProductArticleLink).where(ProductArticleLink.article_id.in_(article_ids)))
-            
-            # Delete comments on these articles
-            db.execute(delete(Comment).where(Comment.article_id.in_(article_ids)))
-            
-            # Delete all articles in this category
-            db.execute(delete(Article).where(Article.category_id == category_id))
-        
-        # Delete category
-        db.delete(category)
+        # Articles in the category and their data are deleted in chunks in the background
+        job = schedule_deletion(db, Category, f"Delete category {category.name}", ids=[category.id])
         
         # Log the action
-        article_count = len(article_ids)
-        log_details = f"Deleted category: {category_name}"
-        if article_count > 0:
-            log_details += f" and {article_count} related articles with all their data"
-            
+        log_details = f"Started deleting category: {category.name} (job: {job.id})"
+        
         log_admin_action(
             db=db,
             user_id=user.id,
@@ -347,7 +328,7 @@ async def admin_delete_category(request: Request, category_id: str, db: Session
         db.commit()
         
         return RedirectResponse(
-            url=f"/admin/categories?message=Category '{category_name}' and all related data deleted successfully",
+            url=f"/admin/categories?message=Category '{category.name}' and all related data are being deleted (job {job.id})",
             status_code=303
         )
     except Exception as e:
@@ -391,65 +372,34 @@ async def admin_delete_all_categories_confirm(request: Request, db: Session = De
     )
 
 @router.get("/delete-all-confirm")
-async def admin_delete_all_categories(request: Request, db: Session = Depends(get_db)):
+async def admin_delete_all_categories(
+    request: Request,
+    db: Session = Depends(get_db)
+):
     # Verify user is logged in and is an admin
     user = await get_user_from_cookie(request, db)
     if not user or not user.is_superuser:
         return RedirectResponse(url="/admin/login", status_code=303)
     
     try:
-        # Count categories before deletion
-        categories_count = db.execute(select(func.count()).select_from(Category)).scalar() or 0
-        
-        # Find all articles to be deleted
-        article_ids = [row[0] for row in db.execute(select(Article.id)).all()]
-        articles_count = len(article_ids)
-        
-        # Import models to avoid circular imports
-        from app.models import ArticleTagLink, ProductArticleLink, SystemLog
-        
-        # If articles exist, delete all related data first
-        if article_ids:
-            # Delete article-tag links
-            db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id.in_(article_ids)))
-            
-            # Delete article-product links
-            db.execute(delete(ProductArticleLink).where(ProductArticleLink.article_id.in_(article_ids)))
-            
-            # Delete all comments on these articles
-            db.execute(delete(Comment).where(Comment.article_id.in_(article_ids)))
-        
-        # Delete all articles
-        db.execute(delete(Article))
-        
-        # Delete all categories
-        db.execute(delete(Category))
+        # Delete in chunks in the background instead of one long transaction
+        job = schedule_deletion(db, Category, "Delete all categories")
         
         # Log the action
-        log_details = f"Deleted all categories (total: {categories_count})"
-        if articles_count > 0:
-            log_details += f" and all related articles (total: {articles_count}) with their data"
-            
         log_admin_action(
             db=db,
             user_id=user.id,
             action="Delete All Categories",
-            details=log_details,
+            details=f"Started deleting all categories and their articles (total: {job.total}, job: {job.id})",
             request=request
         )
         
         db.commit()
         
         return RedirectResponse(
-            url="/admin/categories?message=All categories and related data have been deleted successfully",
+            url=f"/admin/categories?message=Deleting {job.total} categories in the background (job {job.id})",
             status_code=303
         )
     except Exception as e:
-        # Roll back transaction on error
         db.rollback()
-        print(f"Error deleting all categories: {str(e)}")
-        
-        return RedirectResponse(
-            url=f"/admin/categories?message=Error deleting all categories: {str(e)}",
-            status_code=303
-        ) 
\ No newline at end of file
+        return HTMLResponse(f"Error deleting all categories: {str(e)}. <a href='/admin/categories'>Go back</a>", status_code=500)
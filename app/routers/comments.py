@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select, desc, delete, func
+from sqlmodel import Session, select, desc, func
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime
@@ -10,6 +10,8 @@ from app.database import get_db
 from app.models import Comment, Article, User
 from app.auth.utils import get_user_from_cookie
 from app.utils.logging import log_admin_action
+from app.utils.cascade import schedule_deletion
+from app.utils.bulk import parse_ids, summarize_ids, delete_comments
 
 router = APIRouter(prefix="/comments")
 
@@ -218,33 +220,75 @@ async def admin_delete_all_comments_confirm(request: Request, db: Session = Depe
     )
 
 @router.get("/delete-all-confirm")
-async def admin_delete_all_comments(request: Request, db: Session = Depends(get_db)):
+async def admin_delete_all_comments(
+    request: Request,
+    db: Session = Depends(get_db)
+):
     # Verify user is logged in and is an admin
     user = await get_user_from_cookie(request, db)
     if not user or not user.is_superuser:
         return RedirectResponse(url="/admin/login", status_code=303)
     
     try:
-        # Count comments before deleting
-        comment_count = db.execute(select(func.count()).select_from(Comment)).scalar_one_or_none() or 0
-        
-        # Delete all comments
-        db.execute(delete(Comment))
+        # Delete in chunks in the background instead of one long transaction
+        job = schedule_deletion(db, Comment, "Delete all comments")
         
         # Log the action
         log_admin_action(
             db=db,
             user_id=user.id,
             action="Delete All Comments",
-            details=f"Deleted all comments ({comment_count} total)",
+            details=f"Started deleting all comments (total: {job.total}, job: {job.id})",
             request=request
         )
         
         db.commit()
         
         return RedirectResponse(
-            url="/admin/comments?message=All comments have been deleted successfully",
+            url=f"/admin/comments?message=Deleting {job.total} comments in the background (job {job.id})",
             status_code=303
         )
     except Exception as e:
-        return HTMLResponse(f"Error deleting all comments: {str(e)}. <a href='/admin/comments'>Go back</a>", status_code=500) 
\ No newline at end of file
+        db.rollback()
+        return HTMLResponse(f"Error deleting all comments: {str(e)}. <a href='/admin/comments'>Go back</a>", status_code=500)
+
+@router.post("/bulk")
+async def admin_bulk_comments(
+    request: Request,
+    action: str = Form(...),
+    ids: List[str] = Form([]),
+    db: Session = Depends(get_db)
+):
+    """Delete the selected comments in one statement."""
+    # Verify user is logged in and is an admin
+    user = await get_user_from_cookie(request, db)
+    if not user or not user.is_superuser:
+        return RedirectResponse(url="/admin/login", status_code=303)
+    
+    try:
+        comment_ids = parse_ids(ids)
+        if not comment_ids:
+            return RedirectResponse(url="/admin/comments?message=No comments selected", status_code=303)
+        
+        if action == "delete":
+            count = delete_comments(db, comment_ids)
+            summary = f"Deleted {count} comments"
+            log_action = "Bulk Delete Comments"
+        else:
+            return RedirectResponse(url=f"/admin/comments?message=Unknown bulk action: {action}", status_code=303)
+        
+        # One audit log entry for the whole batch
+        log_admin_action(
+            db=db,
+            user_id=user.id,
+            action=log_action,
+            details=f"{summary} (selected {len(comment_ids)}: {summarize_ids(comment_ids)})",
+            request=request
+        )
+        
+        db.commit()
+        
+        return RedirectResponse(url=f"/admin/comments?message={summary}", status_code=303)
+    except Exception as e:
+        db.rollback()
+        return RedirectResponse(url=f"/admin/comments?message=Error: {str(e)}", status_code=303)
@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, Request
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select, func, desc, or_
+from sqlmodel import Session, select, or_
 from sqlalchemy.orm import selectinload
 
 from app.database import get_db
 from app.models import User, Category, Article, Comment, Tag, Product
 from app.auth.utils import get_user_from_cookie
+from app.utils.dashboard import dashboard_cache
+from app.utils.images import media_srcset
+from app.utils.stats_rollups import METRICS, get_series
+from app.utils.static_files import static_url
 
 router = APIRouter(prefix="/dashboard")
 
 # Set up templates
 templates = Jinja2Templates(directory="templates")
+templates.env.filters["media_srcset"] = media_srcset
+templates.env.globals["static_url"] = static_url
 
 @router.get("/", response_class=HTMLResponse)
 async def admin_dashboard(request: Request, db: Session = Depends(get_db)):
@@ -20,67 +30,41 @@ async def admin_dashboard(request: Request, db: Session = Depends(get_db)):
     if not user or not user.is_superuser:
         return RedirectResponse(url="/admin/login", status_code=303)
     
-    # Get counts for dashboard
-    users_count = db.execute(select(func.count()).select_from(User)).scalar() or 0
-    categories_count = db.execute(select(func.count()).select_from(Category)).scalar() or 0
-    articles_count = db.execute(select(func.count()).select_from(Article)).scalar() or 0
-    comments_count = db.execute(select(func.count()).select_from(Comment)).scalar() or 0
-    tags_count = db.execute(select(func.count()).select_from(Tag)).scalar() or 0
-    products_count = db.execute(select(func.count()).select_from(Product)).scalar() or 0
-    
-    # Get recent articles and comments
-    recent_articles = db.execute(
-        select(Article).options(
-            selectinload(Article.author),
-            selectinload(Article.category)
-        ).order_by(desc(Article.created_at)).limit(5)
-    ).unique().scalars().all()
-    
-    recent_comments = db.execute(
-        select(Comment).options(
-            selectinload(Comment.author),
-            selectinload(Comment.article).selectinload(Article.author)
-        ).order_by(desc(Comment.created_at)).limit(5)
-    ).unique().scalars().all()
-    
-    # Get recent products
-    recent_products = db.execute(
-        select(Product).order_by(desc(Product.created_at)).limit(8)
-    ).scalars().all()
-    
-    # Get top 10 articles by views for the chart
-    top_articles_by_views = db.execute(
-        select(Article).options(
-            selectinload(Article.category)
-        ).order_by(desc(Article.views)).limit(10)
-    ).unique().scalars().all()
-    
-    # Prepare data for the chart
-    article_chart_data = {
-        'labels': [article.title[:20] + '...' if len(article.title) > 20 else article.title for article in top_articles_by_views],
-        'views': [article.views for article in top_articles_by_views],
-        'categories': [article.category.name for article in top_articles_by_views],
-        'ids': [str(article.id) for article in top_articles_by_views]
-    }
+    # Counts and recent lists come from the in-memory snapshot; it is only
+    # computed when missing or after a change
+    snapshot = dashboard_cache.get()
+    if snapshot is None:
+        snapshot = await run_in_threadpool(dashboard_cache.refresh)
     
     return templates.TemplateResponse(
         "admin/dashboard.html",
         {
             "request": request,
             "user": user,
-            "users_count": users_count,
-            "categories_count": categories_count,
-            "articles_count": articles_count,
-            "comments_count": comments_count,
-            "tags_count": tags_count,
-            "products_count": products_count,
-            "recent_articles": recent_articles,
-            "recent_comments": recent_comments,
-            "recent_products": recent_products,
-            "article_chart_data": article_chart_data
+            **snapshot
         }
     )
 
+@router.get("/series")
+async def dashboard_series(
+    request: Request,
+    metric: Optional[List[str]] = Query(None, description=f"Metrics to return: {', '.join(METRICS)} (default: all)"),
+    period: str = Query("day", description="Bucket size: hour or day"),
+    start: Optional[datetime] = Query(None, description="First bucket (UTC unless a timezone is given)"),
+    end: Optional[datetime] = Query(None, description="End of the range, exclusive; rounded up to a whole bucket (default: now)"),
+    db: Session = Depends(get_db)
+):
+    # Verify user is logged in and is an admin
+    user = await get_user_from_cookie(request, db)
+    if not user or not user.is_superuser:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    
+    # Charts read the rollup tables only, so long ranges stay cheap
+    try:
+        return get_series(db, metric or list(METRICS), period, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/search", response_class=HTMLResponse)
 async def admin_search(request: Request, q: str = "", db: Session = Depends(get_db)):
     # Verify user is logged in and is an admin
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse
+
+from app.utils.images import IMAGE_FORMATS, NotResizable, get_variant, negotiate_format, parse_size
+from app.utils.storage import StorageManager
+
+# Public media routes, mounted ahead of the /media static files
+router = APIRouter(prefix="/media", include_in_schema=False)
+
+
+@router.get("/resize/{size}/{path:path}")
+async def resize_image(size: str, path: str, request: Request):
+    """
+    Serve an image resized to {width}x{height} (0 keeps the aspect ratio) in
+    the best format the browser accepts, rendering it on first request.
+    """
+    dimensions = parse_size(size)
+    if dimensions is None:
+        raise HTTPException(status_code=404, detail="Unsupported size")
+
+    output_format = negotiate_format(request.headers.get("accept", ""))
+    try:
+        target = await get_variant(path, *dimensions, output_format)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image not found")
+    except NotResizable:
+        # Animated or unreadable images are served as they are
+        return RedirectResponse(url=StorageManager.get_file_url(path), status_code=307)
+
+    return FileResponse(
+        target,
+        media_type=IMAGE_FORMATS[output_format][0],
+        headers={
+            # Uploaded files never change, so variants can be cached for long
+            "Cache-Control": "public, max-age=604800",
+            "Vary": "Accept"
+        }
+    )
@@ -5,16 +5,22 @@ from sqlmodel import Session, select, func, or_, delete
 import os
 from datetime import datetime
 import shutil
-import json
-from typing import Optional
+from typing import Optional, List
+from uuid import UUID
 
 from app.database import get_db
-from app.models import Product, Article, ProductArticleLink
+from app.models import Product, Article, ProductArticleLink, parse_social_links
 from app.auth.utils import get_user_from_cookie
 from app.utils.text import generate_unique_slug
 from app.config import settings
 from app.utils.storage import StorageManager
+from app.utils.blobs import is_blob_path
 from app.utils.logging import log_admin_action
+from app.utils.cascade import schedule_deletion
+from app.utils.links import link_articles_to_product, unlink_articles_from_product, get_product_article_ids
+from app.utils.bulk import parse_ids, summarize_ids, delete_products
+from app.utils.images import media_srcset
+from app.utils.static_files import static_url
 
 router = APIRouter(prefix="/products")
 
@@ -41,8 +47,10 @@ def media_url_filter(path: str) -> str:
     # Otherwise, it's a local file
     return f"/media/{path}"
 
-# Add custom filter to Jinja2 environment
+# Add custom filters to Jinja2 environment
 templates.env.filters["media_url"] = media_url_filter
+templates.env.filters["media_srcset"] = media_srcset
+templates.env.globals["static_url"] = static_url
 
 @router.get("/", response_class=HTMLResponse)
 async def admin_products(
@@ -230,20 +238,19 @@ async def admin_add_product(
         return RedirectResponse(url="/admin/login", status_code=303)
     
     try:
-        # Validate social_links as valid JSON if provided
-        if social_links:
-            try:
-                json.loads(social_links)
-            except json.JSONDecodeError:
-                return templates.TemplateResponse(
-                    "admin/products/add.html", 
-                    {
-                        "request": request,
-                        "user": user,
-                        "error": "Social links must be valid JSON."
-                    },
-                    status_code=400
-                )
+        # Validate and parse social_links once, before storing it as JSON
+        try:
+            parsed_social_links = parse_social_links(social_links)
+        except ValueError:
+            return templates.TemplateResponse(
+                "admin/products/add.html", 
+                {
+                    "request": request,
+                    "user": user,
+                    "error": "Social links must be valid JSON."
+                },
+                status_code=400
+            )
         
         # Generate slug if not provided
         if not slug:
@@ -286,7 +293,7 @@ async def admin_add_product(
             slug=slug,
             description=description,
             featured_image=featured_image_path,
-            social_links=social_links
+            social_links=parsed_social_links
         )
         db.add(product)
         
@@ -376,23 +383,22 @@ async def admin_edit_product(
         old_name = product.name
         old_price = product.price
         
-        # Validate social_links as valid JSON if provided
-        if social_links:
-            try:
-                json.loads(social_links)
-            except json.JSONDecodeError:
-                return templates.TemplateResponse(
-                    "admin/products/edit.html",
-                    {
-                        "request": request,
-                        "user": user,
-                        "product": product,
-                        "error": "Social links must be valid JSON.",
-                        "applied_filters": 0,
-                        "categories": []
-                    },
-                    status_code=400
-                )
+        # Validate and parse social_links once, before storing it as JSON
+        try:
+            parsed_social_links = parse_social_links(social_links)
+        except ValueError:
+            return templates.TemplateResponse(
+                "admin/products/edit.html",
+                {
+                    "request": request,
+                    "user": user,
+                    "product": product,
+                    "error": "Social links must be valid JSON.",
+                    "applied_filters": 0,
+                    "categories": []
+                },
+                status_code=400
+            )
         
         # Generate slug if not provided
         if not slug:
@@ -429,8 +435,9 @@ async def admin_edit_product(
             if not success:
                 raise Exception(f"Failed to upload image: {error}")
             
-            # Remove old image if it exists
-            if product.featured_image:
+            # Remove old image if it exists; blobs may be shared with other
+            # rows and are left to their reference count
+            if product.featured_image and not is_blob_path(product.featured_image):
                 old_file_path = os.path.join("media", product.featured_image)
                 if os.path.exists(old_file_path):
                     os.remove(old_file_path)
@@ -444,7 +451,7 @@ async def admin_edit_product(
         product.slug = slug
         product.description = description
         product.featured_image = featured_image_path
-        product.social_links = social_links
+        product.social_links = parsed_social_links
         
         # Update product
         db.add(product)
@@ -466,29 +473,17 @@ async def admin_edit_product(
         
         db.commit()
         
-        # Update article associations
-        current_article_ids = [article.id for article in product.articles]
-        
-        # Remove associations that are not in the new list
-        for article_id in current_article_ids:
-            if article_id not in article_ids:
-                link = db.execute(
-                    select(ProductArticleLink).where(
-                        (ProductArticleLink.product_id == product.id) & 
-                        (ProductArticleLink.article_id == article_id)
-                    )
-                ).scalar_one_or_none()
-                if link:
-                    db.delete(link)
-        
-        # Add new associations
+        # Update article associations by applying only the difference
+        current_article_ids = set(get_product_article_ids(db, product.id))
+        selected_article_ids = set()
         for article_id in article_ids:
-            if article_id not in current_article_ids:
-                # Check if article exists
-                article = db.get(Article, article_id)
-                if article:
-                    link = ProductArticleLink(product_id=product.id, article_id=article_id)
-                    db.add(link)
+            try:
+                selected_article_ids.add(UUID(article_id))
+            except ValueError:
+                continue
+        
+        unlink_articles_from_product(db, product.id, current_article_ids - selected_article_ids)
+        link_articles_to_product(db, product.id, selected_article_ids - current_article_ids)
         
         db.commit()
         db.refresh(product)
@@ -576,36 +571,36 @@ async def admin_delete_all_products_confirm(request: Request, db: Session = Depe
     )
 
 @router.get("/delete-all-confirm")
-async def admin_delete_all_products(request: Request, db: Session = Depends(get_db)):
+async def admin_delete_all_products(
+    request: Request,
+    db: Session = Depends(get_db)
+):
     # Verify user is logged in and is an admin
     user = await get_user_from_cookie(request, db)
     if not user or not user.is_superuser:
         return RedirectResponse(url="/admin/login", status_code=303)
     
     try:
-        # Count products before deletion
-        products_count = db.execute(select(func.count()).select_from(Product)).scalar() or 0
-        
-        # Delete all product-article links and products
-        db.execute(delete(ProductArticleLink))
-        db.execute(delete(Product))
+        # Delete in chunks in the background instead of one long transaction
+        job = schedule_deletion(db, Product, "Delete all products")
         
         # Log the action
         log_admin_action(
             db=db,
             user_id=user.id,
             action="Delete All Products",
-            details=f"Deleted all products (total: {products_count})",
+            details=f"Started deleting all products (total: {job.total}, job: {job.id})",
             request=request
         )
         
         db.commit()
         
         return RedirectResponse(
-            url="/admin/products?message=All products have been deleted successfully",
+            url=f"/admin/products?message=Deleting {job.total} products in the background (job {job.id})",
             status_code=303
         )
     except Exception as e:
+        db.rollback()
         return HTMLResponse(f"Error deleting all products: {str(e)}. <a href='/admin/products'>Go back</a>", status_code=500)
 
 @router.get("/{product_id}/articles", response_class=HTMLResponse)
@@ -664,4 +659,45 @@ async def admin_product_articles(
                 "applied_filters": 0,
                 "categories": []
             }
-        ) 
\ No newline at end of file
+        )
+
+@router.post("/bulk")
+async def admin_bulk_products(
+    request: Request,
+    action: str = Form(...),
+    ids: List[str] = Form([]),
+    db: Session = Depends(get_db)
+):
+    """Delete the selected products and their article links in one request."""
+    # Verify user is logged in and is an admin
+    user = await get_user_from_cookie(request, db)
+    if not user or not user.is_superuser:
+        return RedirectResponse(url="/admin/login", status_code=303)
+    
+    try:
+        product_ids = parse_ids(ids)
+        if not product_ids:
+            return RedirectResponse(url="/admin/products?message=No products selected", status_code=303)
+        
+        if action == "delete":
+            count = delete_products(db, product_ids)
+            summary = f"Deleted {count} products"
+            log_action = "Bulk Delete Products"
+        else:
+            return RedirectResponse(url=f"/admin/products?message=Unknown bulk action: {action}", status_code=303)
+        
+        # One audit log entry for the whole batch
+        log_admin_action(
+            db=db,
+            user_id=user.id,
+            action=log_action,
+            details=f"{summary} (selected {len(product_ids)}: {summarize_ids(product_ids)})",
+            request=request
+        )
+        
+        db.commit()
+        
+        return RedirectResponse(url=f"/admin/products?message={summary}", status_code=303)
+    except Exception as e:
+        db.rollback()
+        return RedirectResponse(url=f"/admin/products?message=Error: {str(e)}", status_code=303)
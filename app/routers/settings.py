@@ -15,6 +15,7 @@ from app.models import (
     SystemLog, SystemLogCreate, SystemSettings
 )
 from app.auth.utils import get_user_from_cookie, get_client_ip
+from app.auth.cache import principal_cache
 from app.config import settings as app_settings
 
 router = APIRouter()
@@ -199,6 +200,7 @@ async def reset_database(request: Request, db: Session = Depends(get_db)):
         # Reset database by recreating all tables
         SQLModel.metadata.drop_all(engine)
         SQLModel.metadata.create_all(engine)
+        principal_cache.clear()
         
         # Also clear media directory if it exists
         media_dir = os.path.join(os.getcwd(), "media")
@@ -212,11 +214,11 @@ async def reset_database(request: Request, db: Session = Depends(get_db)):
         
         # Create a new admin user
         new_db = next(get_db())
-        from app.auth.utils import get_password_hash
+        from app.auth.hashing import hash_password
         admin = User(
             username="admin",
             email="admin@example.com",
-            password=get_password_hash("admin"),
+            password=await hash_password("admin"),
             is_superuser=True
         )
         new_db.add(admin)
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select, func, delete, or_
+from sqlmodel import Session, select, func, or_
+from typing import List
 
 from app.database import get_db
-from app.models import Tag, Article, ArticleTagLink
+from app.models import Tag
 from app.auth.utils import get_user_from_cookie
 from app.utils.logging import log_admin_action
+from app.utils.cascade import schedule_deletion
+from app.utils.bulk import parse_ids, summarize_ids, delete_tags
 from app.utils.text import slugify
 
 router = APIRouter(prefix="/tags")
@@ -351,42 +354,75 @@ async def admin_delete_all_tags_confirm(request: Request, db: Session = Depends(
     )
 
 @router.get("/delete-all-confirm")
-async def admin_delete_all_tags(request: Request, db: Session = Depends(get_db)):
+async def admin_delete_all_tags(
+    request: Request,
+    db: Session = Depends(get_db)
+):
     # Verify user is logged in and is an admin
     user = await get_user_from_cookie(request, db)
     if not user or not user.is_superuser:
         return RedirectResponse(url="/admin/login", status_code=303)
     
     try:
-        # Count tags before deletion
-        tags_count = db.execute(select(func.count()).select_from(Tag)).scalar() or 0
-        
-        # Delete all tags
-        db.execute(delete(ArticleTagLink))
-        db.execute(delete(Tag))
+        # Delete in chunks in the background instead of one long transaction
+        job = schedule_deletion(db, Tag, "Delete all tags")
         
         # Log the action
         log_admin_action(
             db=db,
             user_id=user.id,
             action="Delete All Tags",
-            details=f"Deleted all tags (total: {tags_count})",
+            details=f"Started deleting all tags (total: {job.total}, job: {job.id})",
             request=request
         )
         
         db.commit()
         
         return RedirectResponse(
-            url="/admin/tags?message=All tags have been deleted",
+            url=f"/admin/tags?message=Deleting {job.total} tags in the background (job {job.id})",
             status_code=303
         )
     except Exception as e:
-        return templates.TemplateResponse(
-            "admin/tags/list.html",
-            {
-                "request": request,
-                "user": user,
-                "tags": db.execute(select(Tag)).scalars().all(),
-                "error": f"Error deleting all tags: {str(e)}"
-            }
-        ) 
\ No newline at end of file
+        db.rollback()
+        return HTMLResponse(f"Error deleting all tags: {str(e)}. <a href='/admin/tags'>Go back</a>", status_code=500)
+
+@router.post("/bulk")
+async def admin_bulk_tags(
+    request: Request,
+    action: str = Form(...),
+    ids: List[str] = Form([]),
+    db: Session = Depends(get_db)
+):
+    """Delete the selected tags and their article links in one request."""
+    # Verify user is logged in and is an admin
+    user = await get_user_from_cookie(request, db)
+    if not user or not user.is_superuser:
+        return RedirectResponse(url="/admin/login", status_code=303)
+    
+    try:
+        tag_ids = parse_ids(ids)
+        if not tag_ids:
+            return RedirectResponse(url="/admin/tags?message=No tags selected", status_code=303)
+        
+        if action == "delete":
+            count = delete_tags(db, tag_ids)
+            summary = f"Deleted {count} tags"
+            log_action = "Bulk Delete Tags"
+        else:
+            return RedirectResponse(url=f"/admin/tags?message=Unknown bulk action: {action}", status_code=303)
+        
+        # One audit log entry for the whole batch
+        log_admin_action(
+            db=db,
+            user_id=user.id,
+            action=log_action,
+            details=f"{summary} (selected {len(tag_ids)}: {summarize_ids(tag_ids)})",
+            request=request
+        )
+        
+        db.commit()
+        
+        return RedirectResponse(url=f"/admin/tags?message={summary}", status_code=303)
+    except Exception as e:
+        db.rollback()
+        return RedirectResponse(url=f"/admin/tags?message=Error: {str(e)}", status_code=303)
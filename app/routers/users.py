@@ -1,14 +1,19 @@
 from fastapi import APIRouter, Depends, Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select, delete, or_, func, desc
-from typing import Optional
+from sqlmodel import Session, select, or_, func, desc
+from typing import Optional, List
 from datetime import datetime
 
+from uuid import UUID
 from app.database import get_db
-from app.models import User, Article, Comment
-from app.auth.utils import get_user_from_cookie, get_password_hash
+from app.models import User
+from app.auth.utils import get_user_from_cookie
+from app.auth.hashing import hash_password
+from app.auth.cache import principal_cache
 from app.utils.logging import log_admin_action
+from app.utils.cascade import schedule_deletion
+from app.utils.bulk import parse_ids, summarize_ids, set_users_active, delete_users
 
 router = APIRouter(prefix="/users")
 
@@ -176,7 +181,7 @@ async def admin_add_user(
     new_user = User(
         username=username,
         email=email,
-        password=get_password_hash(password),
+        password=await hash_password(password),
         first_name=first_name,
         last_name=last_name,
         is_active=is_active,
@@ -289,7 +294,7 @@ async def admin_edit_user(
     
     # Update password if provided
     if password:
-        user_to_edit.password = get_password_hash(password)
+        user_to_edit.password = await hash_password(password)
     
     # Log the action
     changes = []
@@ -314,6 +319,7 @@ async def admin_edit_user(
     
     db.add(user_to_edit)
     db.commit()
+    principal_cache.invalidate(old_username, username)
     
     # Redirect to users list with success message
     return RedirectResponse(
@@ -322,7 +328,11 @@ async def admin_edit_user(
     )
 
 @router.get("/{user_id}/delete")
-async def admin_delete_user(request: Request, user_id: str, db: Session = Depends(get_db)):
+async def admin_delete_user(
+    request: Request,
+    user_id: str,
+    db: Session = Depends(get_db)
+):
     # Verify user is logged in and is an admin
     user = await get_user_from_cookie(request, db)
     if not user or not user.is_superuser:
@@ -330,7 +340,7 @@ async def admin_delete_user(request: Request, user_id: str, db: Session = Depend
     
     try:
         # Get the user to delete
-        user_to_delete = db.get(User, user_id)
+        user_to_delete = db.execute(select(User).where(User.id == UUID(user_id))).scalar_one_or_none()
         if not user_to_delete:
             return RedirectResponse(url="/admin/users?message=User not found", status_code=303)
         
@@ -341,48 +351,26 @@ async def admin_delete_user(request: Request, user_id: str, db: Session = Depend
         # Store info for logging
         username = user_to_delete.username
         
-        # First get the IDs of all articles by this user
-        article_ids_query = select(Article.id).where(Article.author_id == user_id)
-        article_ids = [row[0] for row in db.execute(article_ids_query).all()]
-        
-        # Import relationship models to avoid circular imports
-        from app.models import SystemLog, ArticleTagLink, ProductArticleLink
-        
-        # Delete article-tag links for this user's articles
-        if article_ids:
-            db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id.in_(article_ids)))
-            
-            # Delete article-product links for this user's articles
-            db.execute(delete(ProductArticleLink).where(ProductArticleLink.article_id.in_(article_ids)))
-            
-            # Delete ALL comments on the user's articles (regardless of commenter)
-            db.execute(delete(Comment).where(Comment.article_id.in_(article_ids)))
-        
-        # Delete system logs for this user
-        db.execute(delete(SystemLog).where(SystemLog.user_id == user_id))
-        
-        # Delete all comments made by the user on any article
-        db.execute(delete(Comment).where(Comment.author_id == user_id))
-        
-        # Delete all articles by the user
-        db.execute(delete(Article).where(Article.author_id == user_id))
-        
-        # Now delete the user
-        db.delete(user_to_delete)
+        # Block the account now; its articles, comments and logs are deleted
+        # in chunks in the background
+        user_to_delete.is_active = False
+        db.add(user_to_delete)
+        job = schedule_deletion(db, User, f"Delete user {username}", ids=[user_to_delete.id])
         
         # Log the action for the admin (not the deleted user)
         log_admin_action(
             db=db,
             user_id=user.id,
             action="Delete User",
-            details=f"Deleted user: {username}",
+            details=f"Started deleting user: {username} (job: {job.id})",
             request=request
         )
         
         db.commit()
+        principal_cache.invalidate(username)
         
         return RedirectResponse(
-            url="/admin/users?message=User deleted successfully",
+            url=f"/admin/users?message=User {username} is being deleted (job {job.id})",
             status_code=303
         )
     except Exception as e:
@@ -440,66 +428,87 @@ async def admin_delete_all_users_confirm(request: Request, db: Session = Depends
     )
 
 @router.get("/delete-all-confirm")
-async def admin_delete_all_users(request: Request, db: Session = Depends(get_db)):
+async def admin_delete_all_users(
+    request: Request,
+    db: Session = Depends(get_db)
+):
     # Verify user is logged in and is an admin
     user = await get_user_from_cookie(request, db)
     if not user or not user.is_superuser:
         return RedirectResponse(url="/admin/login", status_code=303)
     
     try:
-        # Count users before deletion
-        users_count = db.execute(select(func.count()).select_from(User).where(User.id != user.id)).scalar() or 0
-        
-        # First get the IDs of all articles by users other than the current admin
-        article_ids_query = select(Article.id).join(User).where(User.id != user.id)
-        article_ids = [row[0] for row in db.execute(article_ids_query).all()]
-        
-        # Import relationship models to avoid circular imports
-        from app.models import SystemLog, ArticleTagLink, ProductArticleLink
-        
-        # Delete article-tag links for other users' articles
-        if article_ids:
-            db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id.in_(article_ids)))
-            
-            # Delete article-product links for other users' articles
-            db.execute(delete(ProductArticleLink).where(ProductArticleLink.article_id.in_(article_ids)))
-            
-            # Delete ALL comments on these articles (regardless of commenter)
-            db.execute(delete(Comment).where(Comment.article_id.in_(article_ids)))
-        
-        # Delete system logs for all users except current
-        db.execute(delete(SystemLog).where(SystemLog.user_id != user.id))
-        
-        # Delete remaining comments by users other than the current admin
-        db.execute(delete(Comment).where(Comment.author_id != user.id))
-        
-        # Delete articles by users other than the current admin
-        db.execute(delete(Article).where(Article.author_id != user.id))
-        
-        # Finally delete all users except the current one
-        db.execute(delete(User).where(User.id != user.id))
+        # Delete in chunks in the background instead of one long transaction
+        job = schedule_deletion(db, User, "Delete all users", exclude_ids=[user.id])
         
         # Log the action
         log_admin_action(
             db=db,
             user_id=user.id,
             action="Delete All Users",
-            details=f"Deleted all users except current admin (total deleted: {users_count})",
+            details=f"Started deleting all users except the current admin (total: {job.total}, job: {job.id})",
             request=request
         )
         
         db.commit()
+        principal_cache.clear()
         
         return RedirectResponse(
-            url="/admin/users?message=All users (except you) have been deleted",
+            url=f"/admin/users?message=Deleting {job.total} users in the background (job {job.id})",
             status_code=303
         )
     except Exception as e:
-        # Roll back the transaction on error
         db.rollback()
-        print(f"Error deleting all users: {str(e)}")  # Log the error for debugging
+        return HTMLResponse(f"Error deleting all users: {str(e)}. <a href='/admin/users'>Go back</a>", status_code=500)
+
+@router.post("/bulk")
+async def admin_bulk_users(
+    request: Request,
+    action: str = Form(...),
+    ids: List[str] = Form([]),
+    db: Session = Depends(get_db)
+):
+    """Activate, deactivate or delete the selected users in one request."""
+    # Verify user is logged in and is an admin
+    user = await get_user_from_cookie(request, db)
+    if not user or not user.is_superuser:
+        return RedirectResponse(url="/admin/login", status_code=303)
+    
+    try:
+        user_ids = parse_ids(ids)
+        # Never deactivate or delete the current account
+        user_ids = [user_id for user_id in user_ids if user_id != user.id]
+        if not user_ids:
+            return RedirectResponse(url="/admin/users?message=No users selected", status_code=303)
         
-        return RedirectResponse(
-            url=f"/admin/users?message=Error deleting all users: {str(e)}",
-            status_code=303
-        ) 
\ No newline at end of file
+        if action == "activate":
+            count = set_users_active(db, user_ids, True)
+            summary = f"Activated {count} users"
+            log_action = "Bulk Activate Users"
+        elif action == "deactivate":
+            count = set_users_active(db, user_ids, False)
+            summary = f"Deactivated {count} users"
+            log_action = "Bulk Deactivate Users"
+        elif action == "delete":
+            count = delete_users(db, user_ids)
+            summary = f"Deleted {count} users"
+            log_action = "Bulk Delete Users"
+        else:
+            return RedirectResponse(url=f"/admin/users?message=Unknown bulk action: {action}", status_code=303)
+        
+        # One audit log entry for the whole batch
+        log_admin_action(
+            db=db,
+            user_id=user.id,
+            action=log_action,
+            details=f"{summary} (selected {len(user_ids)}: {summarize_ids(user_ids)})",
+            request=request
+        )
+        
+        db.commit()
+        principal_cache.invalidate_ids(user_ids)
+        
+        return RedirectResponse(url=f"/admin/users?message={summary}", status_code=303)
+    except Exception as e:
+        db.rollback()
+        return RedirectResponse(url=f"/admin/users?message=Error: {str(e)}", status_code=303)
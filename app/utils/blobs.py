@@ -0,0 +1,207 @@
+"""
+Content-addressed media blobs.
+
+Uploads are stored once per distinct content, at blobs/ab/cd/<sha256><ext>,
+and recorded in the MediaBlob table. Uploading a file that is already stored
+returns the existing path without transferring anything.
+
+Each blob counts the article and product rows that reference it, through a
+featured image or a media URL in their text. ORM changes are counted by a
+before_flush hook; bulk deletions that bypass the ORM call
+release_references before deleting rows.
+"""
+import hashlib
+import re
+from collections import Counter
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import case, event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import MediaBlob
+from app.utils.images import media_path
+from app.utils.query import insert_ignore
+
+BLOB_FOLDER = "blobs"
+
+# Columns that may reference uploaded files, per table: the first holds a
+# bare path or URL, the others text with media URLs in it
+REFERENCE_COLUMNS = {
+    "article": ("featured_image", "content", "excerpt", "footer_content"),
+    "product": ("featured_image", "description"),
+}
+
+_url_pattern: Optional[re.Pattern] = None
+
+
+def hash_file(file: BinaryIO) -> Tuple[str, int]:
+    """Return the SHA-256 hex digest and size of a file, reading it in chunks from the start."""
+    sha256 = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    while chunk := file.read(settings.UPLOAD_CHUNK_SIZE):
+        sha256.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+    return sha256.hexdigest(), size
+
+
+def is_blob_path(path: Optional[str]) -> bool:
+    """Return True if a stored image reference points at a blob."""
+    path = media_path(path)
+    return bool(path) and path.startswith(f"{BLOB_FOLDER}/")
+
+
+def find_blob(db: Session, digest: str) -> Optional[MediaBlob]:
+    return db.get(MediaBlob, digest)
+
+
+def register_blob(db: Session, digest: str, path: str, size: int, content_type: Optional[str]):
+    """Record a stored blob; a blob stored concurrently by another upload is kept as it is."""
+    connection = db.connection()
+    now = datetime.utcnow()
+    values = {
+        "digest": digest,
+        "path": path,
+        "size": size,
+        "content_type": content_type,
+        "ref_count": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    stmt = insert_ignore(MediaBlob, connection.dialect.name)
+    if stmt is None:
+        if find_blob(db, digest) is not None:
+            return
+        stmt = MediaBlob.__table__.insert()
+    connection.execute(stmt, values)
+
+
+def _media_url_pattern() -> re.Pattern:
+    global _url_pattern
+    if _url_pattern is None:
+        prefixes = ["/media/"]
+        if settings.R2_PUBLIC_URL:
+            prefixes.append(f"{settings.R2_PUBLIC_URL.rstrip('/')}/")
+        prefixes.append(f"{settings.R2_ENDPOINT_URL.rstrip('/')}/{settings.R2_BUCKET_NAME}/")
+        alternatives = "|".join(re.escape(prefix) for prefix in prefixes)
+        _url_pattern = re.compile(rf"(?:{alternatives})([^\s\"'<>()?#]+)")
+    return _url_pattern
+
+
+def _media_paths(value: Optional[str], is_text: bool) -> Set[str]:
+    """Return the media paths a column value references."""
+    if not value:
+        return set()
+    if is_text:
+        paths = {match.group(1) for match in _media_url_pattern().finditer(value)}
+    else:
+        paths = {media_path(value)}
+    media_paths = set()
+    for path in paths:
+        if path and path.startswith("resize/"):
+            # /media/resize/640x0/<path> shows a resized copy of <path>
+            path = path.split("/", 2)[-1]
+        if path:
+            media_paths.add(path)
+    return media_paths
+
+
+def referenced_paths(table_name: str, values: Dict[str, Optional[str]]) -> Set[str]:
+    """Return the media paths referenced by one row, given its reference column values."""
+    columns = REFERENCE_COLUMNS[table_name]
+    paths = set()
+    for index, column in enumerate(columns):
+        paths |= _media_paths(values.get(column), is_text=index > 0)
+    return paths
+
+
+def referenced_blobs(table_name: str, values: Dict[str, Optional[str]]) -> Set[str]:
+    """Return the blob paths referenced by one row, given its reference column values."""
+    return {path for path in referenced_paths(table_name, values) if path.startswith(f"{BLOB_FOLDER}/")}
+
+
+def change_references(connection, deltas: Dict[str, int]):
+    """Add to (or subtract from) the reference counts of blobs, by path."""
+    by_delta: Dict[int, list] = {}
+    for path, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(path)
+
+    table = MediaBlob.__table__
+    for delta, paths in by_delta.items():
+        new_count = table.c.ref_count + delta
+        connection.execute(
+            update(table)
+            .where(table.c.path.in_(paths))
+            .values(ref_count=case((new_count < 0, 0), else_=new_count))
+        )
+
+
+def release_references(db: Session, table, whereclause):
+    """
+    Drop the references held by the rows of table matching whereclause.
+
+    Call it before deleting those rows with a bulk DELETE.
+    """
+    table = getattr(table, "__table__", table)
+    columns = REFERENCE_COLUMNS.get(table.name)
+    if not columns:
+        return
+
+    deltas: Counter = Counter()
+    rows = db.execute(select(*(table.c[column] for column in columns)).where(whereclause))
+    for row in rows:
+        for path in referenced_blobs(table.name, dict(zip(columns, row))):
+            deltas[path] -= 1
+    if deltas:
+        change_references(db.connection(), deltas)
+
+
+def _object_blobs(obj, table_name: str, as_loaded: bool, load: bool) -> Set[str]:
+    """
+    Return the blob paths an object references, as loaded from the database
+    or as it is now. Columns that were never loaded count as empty unless
+    load is set.
+    """
+    state = inspect(obj)
+    values = {}
+    for column in REFERENCE_COLUMNS[table_name]:
+        history = state.attrs[column].history
+        if history.has_changes():
+            values[column] = ((history.deleted if as_loaded else history.added) or [None])[0]
+        elif column in state.unloaded and not load:
+            values[column] = None
+        else:
+            values[column] = getattr(obj, column)
+    return referenced_blobs(table_name, values)
+
+
+@event.listens_for(Session, "before_flush")
+def _count_references(session: Session, flush_context, instances):
+    deltas: Counter = Counter()
+
+    def tracked(objects: Iterable):
+        for obj in objects:
+            table = getattr(type(obj), "__table__", None)
+            if table is not None and table.name in REFERENCE_COLUMNS:
+                yield obj, table.name
+
+    for obj, table_name in tracked(session.new):
+        for path in _object_blobs(obj, table_name, as_loaded=False, load=False):
+            deltas[path] += 1
+    for obj, table_name in tracked(session.dirty):
+        before = _object_blobs(obj, table_name, as_loaded=True, load=False)
+        after = _object_blobs(obj, table_name, as_loaded=False, load=False)
+        for path in before - after:
+            deltas[path] -= 1
+        for path in after - before:
+            deltas[path] += 1
+    for obj, table_name in tracked(session.deleted):
+        for path in _object_blobs(obj, table_name, as_loaded=True, load=True):
+            deltas[path] -= 1
+
+    if deltas:
+        change_references(session.connection(), deltas)
@@ -0,0 +1,137 @@
+from datetime import datetime
+from sqlmodel import Session, func, select, update, delete
+from typing import Iterable, List
+from uuid import UUID
+
+from app.models import (
+    Article,
+    ArticleTagLink,
+    Comment,
+    Product,
+    ProductArticleLink,
+    SystemLog,
+    Tag,
+    User
+)
+from app.utils.blobs import release_references
+
+# Maximum number of ids accepted by a single bulk action
+BULK_MAX_IDS = 10000
+
+# Number of ids spelled out in the aggregated audit log entry
+_LOG_MAX_IDS = 50
+
+
+def parse_ids(ids: Iterable[str]) -> List[UUID]:
+    """
+    Convert ids posted by a form to unique UUIDs, skipping invalid values.
+
+    Raises ValueError if more than BULK_MAX_IDS ids are given.
+    """
+    parsed = {}
+    for value in ids or []:
+        try:
+            parsed.setdefault(UUID(str(value)), None)
+        except ValueError:
+            continue
+    if len(parsed) > BULK_MAX_IDS:
+        raise ValueError(f"Too many items selected (max {BULK_MAX_IDS})")
+    return list(parsed)
+
+
+def summarize_ids(ids: List[UUID]) -> str:
+    """Format ids for an audit log entry, truncating long lists."""
+    shown = ", ".join(str(item_id) for item_id in ids[:_LOG_MAX_IDS])
+    if len(ids) > _LOG_MAX_IDS:
+        shown += f" and {len(ids) - _LOG_MAX_IDS} more"
+    return shown
+
+
+def _delete_articles_where(db: Session, article_ids) -> int:
+    """
+    Delete articles and everything that depends on them.
+
+    article_ids may be a list or a SELECT of article ids, so callers can
+    cascade without loading the ids first.
+    """
+    db.execute(delete(ArticleTagLink).where(ArticleTagLink.article_id.in_(article_ids)))
+    db.execute(delete(ProductArticleLink).where(ProductArticleLink.article_id.in_(article_ids)))
+    db.execute(delete(Comment).where(Comment.article_id.in_(article_ids)))
+    release_references(db, Article, Article.id.in_(article_ids))
+    result = db.execute(delete(Article).where(Article.id.in_(article_ids)))
+    return result.rowcount or 0
+
+
+def set_articles_published(db: Session, article_ids: List[UUID], published: bool) -> int:
+    """Publish or unpublish many articles and return the number of rows changed."""
+    values = {"published": published}
+    if published:
+        # Articles published before keep their first publication time
+        values["published_at"] = func.coalesce(Article.published_at, datetime.utcnow())
+    result = db.execute(
+        update(Article)
+        .where(Article.id.in_(article_ids), Article.published != published)
+        .values(**values)
+    )
+    return result.rowcount or 0
+
+
+def set_articles_category(db: Session, article_ids: List[UUID], category_id: UUID) -> int:
+    """Move many articles to a category and return the number of rows changed."""
+    result = db.execute(
+        update(Article)
+        .where(Article.id.in_(article_ids), Article.category_id != category_id)
+        .values(category_id=category_id)
+    )
+    return result.rowcount or 0
+
+
+def delete_articles(db: Session, article_ids: List[UUID]) -> int:
+    """Delete many articles with their tag links, product links and comments."""
+    return _delete_articles_where(db, article_ids)
+
+
+def delete_comments(db: Session, comment_ids: List[UUID]) -> int:
+    """Delete many comments and return the number of rows deleted."""
+    result = db.execute(delete(Comment).where(Comment.id.in_(comment_ids)))
+    return result.rowcount or 0
+
+
+def delete_products(db: Session, product_ids: List[UUID]) -> int:
+    """Delete many products with their article links."""
+    db.execute(delete(ProductArticleLink).where(ProductArticleLink.product_id.in_(product_ids)))
+    release_references(db, Product, Product.id.in_(product_ids))
+    result = db.execute(delete(Product).where(Product.id.in_(product_ids)))
+    return result.rowcount or 0
+
+
+def delete_tags(db: Session, tag_ids: List[UUID]) -> int:
+    """Delete many tags with their article links."""
+    db.execute(delete(ArticleTagLink).where(ArticleTagLink.tag_id.in_(tag_ids)))
+    result = db.execute(delete(Tag).where(Tag.id.in_(tag_ids)))
+    return result.rowcount or 0
+
+
+def set_users_active(db: Session, user_ids: List[UUID], is_active: bool) -> int:
+    """Activate or deactivate many users and return the number of rows changed."""
+    result = db.execute(
+        update(User)
+        .where(User.id.in_(user_ids), User.is_active != is_active)
+        .values(is_active=is_active)
+    )
+    return result.rowcount or 0
+
+
+def delete_users(db: Session, user_ids: List[UUID]) -> int:
+    """
+    Delete many users with their articles, comments and system logs.
+
+    Comments left by other users on the deleted users' articles are removed too.
+    """
+    authored_articles = select(Article.id).where(Article.author_id.in_(user_ids))
+    _delete_articles_where(db, authored_articles)
+
+    db.execute(delete(Comment).where(Comment.author_id.in_(user_ids)))
+    db.execute(delete(SystemLog).where(SystemLog.user_id.in_(user_ids)))
+    result = db.execute(delete(User).where(User.id.in_(user_ids)))
+    return result.rowcount or 0
@@ -0,0 +1,266 @@
+"""
+Chunked cascade deletion.
+
+Rows are deleted children-first in bounded chunks, each chunk in its own
+transaction, so large deletions never build huge IN lists or hold locks for
+the whole operation. Child tables whose foreign key is declared with
+ON DELETE CASCADE in the live database are left to the database.
+
+Deletions started from requests run as "cascade_delete" jobs on the job
+queue, so they survive restarts and report progress.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Table, delete, func, inspect, select, text, tuple_
+from sqlmodel import SQLModel, Session
+
+from app.config import settings
+from app.database import engine
+from app.jobs.queue import enqueue
+from app.models import Job
+from app.utils.blobs import release_references
+
+CASCADE_DELETE_JOB = "cascade_delete"
+
+_cascading_columns: Optional[Set[Tuple[str, str]]] = None
+
+
+def _dependents(table: Table) -> List[Tuple[Table, object]]:
+    """Return (child table, foreign key column) pairs that reference table."""
+    return [
+        (child, fk.parent)
+        for child in SQLModel.metadata.sorted_tables
+        for fk in child.foreign_keys
+        if fk.column.table is table
+    ]
+
+
+def database_cascades() -> Set[Tuple[str, str]]:
+    """
+    Return the (table, column) foreign keys that the live database cascades on delete.
+
+    Tables created before the foreign keys were declared with ON DELETE CASCADE
+    keep their old constraints, so this inspects the actual schema rather than
+    the models. The result is cached for the lifetime of the process.
+    """
+    global _cascading_columns
+    if _cascading_columns is not None:
+        return _cascading_columns
+
+    cascading = set()
+    with engine.connect() as connection:
+        # SQLite ignores foreign keys unless the pragma is on for the connection
+        if connection.dialect.name == "sqlite":
+            if not connection.execute(text("PRAGMA foreign_keys")).scalar():
+                _cascading_columns = cascading
+                return cascading
+
+        inspector = inspect(connection)
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            for fk in inspector.get_foreign_keys(table.name):
+                ondelete = (fk.get("options") or {}).get("ondelete") or ""
+                if ondelete.upper() == "CASCADE":
+                    for column in fk["constrained_columns"]:
+                        cascading.add((table.name, column))
+
+    _cascading_columns = cascading
+    return cascading
+
+
+def _count(deleted: Dict[str, int], table: Table, rowcount: int):
+    if rowcount and rowcount > 0:
+        deleted[table.name] = deleted.get(table.name, 0) + rowcount
+
+
+def _delete_children(db: Session, deleted: Dict[str, int], table: Table, ids: List, chunk_size: int):
+    """Delete every row that references one of ids in table, children first."""
+    cascading = database_cascades()
+
+    for child, fk_column in _dependents(table):
+        grandchildren = _dependents(child)
+
+        if grandchildren:
+            # Rows with dependents of their own are deleted in chunks so a
+            # single parent with many children stays bounded too
+            child_pk = list(child.primary_key.columns)[0]
+            while True:
+                child_ids = db.execute(
+                    select(child_pk).where(fk_column.in_(ids)).limit(chunk_size)
+                ).scalars().all()
+                if not child_ids:
+                    break
+                _delete_children(db, deleted, child, child_ids, chunk_size)
+                release_references(db, child, child_pk.in_(child_ids))
+                result = db.execute(delete(child).where(child_pk.in_(child_ids)))
+                _count(deleted, child, result.rowcount)
+                db.commit()
+        elif (child.name, fk_column.name) in cascading:
+            # Rows the database deletes itself still release their media
+            release_references(db, child, fk_column.in_(ids))
+        else:
+            # Leaf rows are deleted in chunks of their primary keys as well;
+            # link tables have composite keys, matched as tuples
+            child_pk = list(child.primary_key.columns)
+            while True:
+                keys = db.execute(
+                    select(*child_pk).where(fk_column.in_(ids)).limit(chunk_size)
+                ).all()
+                if not keys:
+                    break
+                if len(child_pk) == 1:
+                    condition = child_pk[0].in_([key[0] for key in keys])
+                else:
+                    condition = tuple_(*child_pk).in_([tuple(key) for key in keys])
+                release_references(db, child, condition)
+                result = db.execute(delete(child).where(condition))
+                _count(deleted, child, result.rowcount)
+                db.commit()
+
+
+def _root_condition(table: Table, exclude_ids: Optional[List]):
+    """Return the primary key column of a root table and the conditions on it."""
+    pk = list(table.primary_key.columns)[0]
+    conditions = []
+    if exclude_ids:
+        conditions.append(pk.not_in(exclude_ids))
+    return pk, conditions
+
+
+def _root_batches(db: Session, pk, ids: Optional[List], conditions: List, chunk_size: int):
+    """Yield chunks of root primary keys that still exist and match conditions."""
+    if ids is not None:
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            yield db.execute(select(pk).where(pk.in_(chunk), *conditions)).scalars().all()
+        return
+
+    # Without explicit ids, keep taking the first chunk until nothing matches;
+    # each chunk is deleted before the next one is selected
+    while True:
+        batch = db.execute(select(pk).where(*conditions).limit(chunk_size)).scalars().all()
+        if not batch:
+            return
+        yield batch
+
+
+def get_table(name: str) -> Table:
+    """Return the model table with the given name."""
+    table = SQLModel.metadata.tables.get(name)
+    if table is None:
+        raise ValueError(f"Unknown table: {name}")
+    return table
+
+
+def cascade_delete(
+    model,
+    ids: Optional[Iterable] = None,
+    exclude_ids: Optional[Iterable] = None,
+    chunk_size: Optional[int] = None,
+    on_progress: Optional[Callable[[int, Dict[str, int]], None]] = None
+) -> Dict[str, int]:
+    """
+    Delete rows of a model and everything that depends on them, in chunks.
+
+    Every chunk is committed on its own, so an interrupted deletion can simply
+    be run again; rows that are already gone are skipped.
+
+    Args:
+        model: The model class (or Table) to delete from
+        ids: Primary keys to delete; all rows when None
+        exclude_ids: Primary keys to keep
+        chunk_size: Rows per transaction (defaults to CASCADE_DELETE_CHUNK_SIZE)
+        on_progress: Called after every chunk with the number of root rows
+            deleted so far and the per-table counts
+
+    Returns:
+        Rows deleted explicitly, per table
+    """
+    table = getattr(model, "__table__", model)
+    chunk_size = chunk_size or settings.CASCADE_DELETE_CHUNK_SIZE
+    ids = list(ids) if ids is not None else None
+    exclude_ids = list(exclude_ids) if exclude_ids else None
+    pk, conditions = _root_condition(table, exclude_ids)
+
+    deleted: Dict[str, int] = {}
+    processed = 0
+    with Session(engine) as db:
+        for batch in _root_batches(db, pk, ids, conditions, chunk_size):
+            if not batch:
+                continue
+            _delete_children(db, deleted, table, batch, chunk_size)
+            release_references(db, table, pk.in_(batch))
+            result = db.execute(delete(table).where(pk.in_(batch)))
+            _count(deleted, table, result.rowcount)
+            db.commit()
+            processed += len(batch)
+            if on_progress:
+                on_progress(processed, deleted)
+
+    return deleted
+
+
+def count_rows(
+    db: Session,
+    model,
+    ids: Optional[Iterable] = None,
+    exclude_ids: Optional[Iterable] = None
+) -> int:
+    """Count the root rows a cascade deletion would delete."""
+    table = getattr(model, "__table__", model)
+    pk, conditions = _root_condition(table, list(exclude_ids) if exclude_ids else None)
+
+    if ids is None:
+        return db.execute(select(func.count()).select_from(table).where(*conditions)).scalar() or 0
+
+    # Count in chunks to keep the IN lists bounded
+    ids = list(ids)
+    chunk_size = settings.CASCADE_DELETE_CHUNK_SIZE
+    total = 0
+    for start in range(0, len(ids), chunk_size):
+        total += db.execute(
+            select(func.count()).select_from(table)
+            .where(pk.in_(ids[start:start + chunk_size]), *conditions)
+        ).scalar() or 0
+    return total
+
+
+def schedule_deletion(
+    db: Session,
+    model,
+    description: str,
+    ids: Optional[Iterable] = None,
+    exclude_ids: Optional[Iterable] = None
+) -> Job:
+    """
+    Queue a cascade deletion job.
+
+    The job is added to db but not committed; it runs once the caller commits.
+
+    Args:
+        db: Database session
+        model: The model class to delete from
+        description: Human readable description shown in the job status
+        ids: Primary keys to delete; all rows when None
+        exclude_ids: Primary keys to keep
+
+    Returns:
+        The queued job
+    """
+    table = getattr(model, "__table__", model)
+    ids = list(ids) if ids is not None else None
+    exclude_ids = list(exclude_ids) if exclude_ids else None
+
+    payload = {
+        "table": table.name,
+        "ids": [str(item_id) for item_id in ids] if ids is not None else None,
+        "exclude_ids": [str(item_id) for item_id in exclude_ids] if exclude_ids else None,
+    }
+    return enqueue(
+        db,
+        CASCADE_DELETE_JOB,
+        payload,
+        description=description,
+        total=count_rows(db, table, ids=ids, exclude_ids=exclude_ids)
+    )
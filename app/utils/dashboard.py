@@ -0,0 +1,208 @@
+"""
+Cached snapshot of the admin dashboard.
+
+compute_snapshot gathers everything the dashboard shows: the six counts in
+one SELECT of scalar subqueries, and each recent list in one joined query.
+The snapshot is plain data, kept in memory by dashboard_cache and shared by
+all requests of the process:
+
+- Younger than DASHBOARD_CACHE_SECONDS, it is served as is
+- Older, it is still served while a background thread computes a new one
+- Commits that change users, categories, articles, comments, tags or
+  products in this process mark it stale, so the next page load computes a
+  new one first; other processes see such changes within the cache lifetime
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import engine
+from app.models import Article, Category, Comment, Product, Tag, User
+
+logger = logging.getLogger(__name__)
+
+# Dashboard counts: name in the snapshot and model counted
+COUNTED_MODELS = {
+    "users_count": User,
+    "categories_count": Category,
+    "articles_count": Article,
+    "comments_count": Comment,
+    "tags_count": Tag,
+    "products_count": Product,
+}
+
+# Tables whose changes show on the dashboard
+_WATCHED_TABLES = {model.__tablename__ for model in COUNTED_MODELS.values()}
+
+
+def _chart_label(title: str) -> str:
+    return title[:20] + '...' if len(title) > 20 else title
+
+
+def compute_snapshot(db: Session) -> Dict[str, Any]:
+    """Query the dashboard counts, recent articles, comments and products, and the top articles by views."""
+    counts = db.execute(
+        select(*(
+            select(func.count()).select_from(model).scalar_subquery().label(name)
+            for name, model in COUNTED_MODELS.items()
+        ))
+    ).one()._asdict()
+
+    # Rows become dicts shaped like the models, so templates read them the same way
+    recent_articles = [
+        {
+            "id": row.id,
+            "title": row.title,
+            "created_at": row.created_at,
+            "author": {"username": row.username},
+            "category": {"name": row.category_name},
+        }
+        for row in db.execute(
+            select(Article.id, Article.title, Article.created_at, User.username, Category.name.label("category_name"))
+            .join(User, Article.author_id == User.id)
+            .join(Category, Article.category_id == Category.id)
+            .order_by(Article.created_at.desc())
+            .limit(5)
+        )
+    ]
+
+    recent_comments = [
+        {
+            "id": row.id,
+            "content": row.content,
+            "created_at": row.created_at,
+            "article": {"title": row.title},
+            "author": {"username": row.username},
+        }
+        for row in db.execute(
+            select(Comment.id, Comment.content, Comment.created_at, Article.title, User.username)
+            .join(Article, Comment.article_id == Article.id)
+            .join(User, Comment.author_id == User.id)
+            .order_by(Comment.created_at.desc())
+            .limit(5)
+        )
+    ]
+
+    recent_products = [
+        row._asdict()
+        for row in db.execute(
+            select(Product.id, Product.name, Product.price, Product.featured_image, Product.created_at)
+            .order_by(Product.created_at.desc())
+            .limit(8)
+        )
+    ]
+
+    top_articles = db.execute(
+        select(Article.id, Article.title, Article.views, Category.name.label("category_name"))
+        .join(Category, Article.category_id == Category.id)
+        .order_by(Article.views.desc())
+        .limit(10)
+    ).all()
+
+    return {
+        **counts,
+        "recent_articles": recent_articles,
+        "recent_comments": recent_comments,
+        "recent_products": recent_products,
+        "article_chart_data": {
+            'labels': [_chart_label(row.title) for row in top_articles],
+            'views': [row.views for row in top_articles],
+            'categories': [row.category_name for row in top_articles],
+            'ids': [str(row.id) for row in top_articles]
+        },
+    }
+
+
+class DashboardCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._computed_at = 0.0
+        # Bumped by every invalidation, so a refresh that started before a
+        # change does not mark its result as current
+        self._generation = 0
+        self._current_generation = -1
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the snapshot without querying, or None if there is none or it
+        was invalidated; call refresh then.
+
+        An expired snapshot is returned while a background thread refreshes it.
+        """
+        with self._lock:
+            if self._snapshot is None or self._current_generation != self._generation:
+                return None
+            if time.monotonic() - self._computed_at >= self.ttl and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_in_background, daemon=True).start()
+            return self._snapshot
+
+    def refresh(self) -> Dict[str, Any]:
+        """Compute a new snapshot and keep it."""
+        with self._lock:
+            generation = self._generation
+        with Session(engine) as db:
+            snapshot = compute_snapshot(db)
+        with self._lock:
+            self._snapshot = snapshot
+            self._computed_at = time.monotonic()
+            self._current_generation = generation
+        return snapshot
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Could not refresh the dashboard snapshot")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def invalidate(self):
+        """Mark the snapshot stale; the next get returns None."""
+        with self._lock:
+            self._generation += 1
+
+
+dashboard_cache = DashboardCache(settings.DASHBOARD_CACHE_SECONDS)
+
+
+def _statement_table(statement) -> Optional[str]:
+    table = getattr(statement, "table", None)
+    return getattr(table, "name", None)
+
+
+@event.listens_for(Session, "before_flush")
+def _note_flushed_changes(session: Session, flush_context, instances):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(type(obj), "__table__", None)
+        if table is not None and table.name in _WATCHED_TABLES:
+            session.info["dashboard_changed"] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_changes(orm_execute_state):
+    # Bulk UPDATE and DELETE statements bypass the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        if _statement_table(orm_execute_state.statement) in _WATCHED_TABLES:
+            orm_execute_state.session.info["dashboard_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session):
+    if session.info.pop("dashboard_changed", False):
+        dashboard_cache.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_changes(session: Session, previous_transaction):
+    session.info.pop("dashboard_changed", None)
@@ -0,0 +1,155 @@
+"""
+Uploads sent by the browser straight to R2.
+
+presign_upload issues a presigned PUT URL or POST form for a new key,
+limited to one image type and MAX_UPLOAD_SIZE_MB, together with an upload
+token: a short-lived JWT naming that key. After uploading, the browser
+passes the token to complete_upload, which checks the stored object (its
+size, and its first bytes against the declared type) and records it like
+any other upload. Objects that fail the checks are deleted.
+
+The file never passes through the application, so the bucket must allow
+PUT and POST from the site's origin (CORS).
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from jose import JWTError, jwt
+
+from app.config import settings
+from app.utils.media import SNIFF_LENGTH, image_filename, sniff_image_type
+from app.utils.media_inventory import record_object
+from app.utils.r2_storage import get_r2_client
+from app.utils.storage import StorageManager, shard_path, unique_filename
+
+# Type claim of upload tokens, so access tokens are never accepted in their place
+UPLOAD_TOKEN_TYPE = "upload"
+
+
+def _max_size() -> int:
+    return settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+
+def presign_upload(
+    filename: str,
+    content_type: str,
+    size: int,
+    method: str = "put",
+    folder: str = "uploads/images"
+) -> Dict[str, Any]:
+    """
+    Issue a presigned upload of one image to a new key.
+
+    Args:
+        filename: Name of the file on the client; the key keeps its base name
+        content_type: Image type the file must have
+        size: Size of the file in bytes
+        method: "put" for a presigned PUT URL, "post" for a presigned POST form
+        folder: Folder of the new key
+
+    Returns:
+        method, url and the headers (PUT) or form fields (POST) to send, the
+        key, the upload token for complete_upload and the seconds the URL is valid
+    """
+    key = shard_path(folder, unique_filename(image_filename(filename, content_type)))
+    expires_in = settings.DIRECT_UPLOAD_EXPIRES_SECONDS
+    s3 = get_r2_client()
+
+    if method == "post":
+        # The policy enforces the type and size limit on the storage side
+        presigned = s3.generate_presigned_post(
+            Bucket=settings.R2_BUCKET_NAME,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, _max_size()],
+            ],
+            ExpiresIn=expires_in
+        )
+        upload = {"method": "POST", "url": presigned["url"], "fields": presigned["fields"]}
+    else:
+        # Content-Type and Content-Length are signed, so the PUT must match them
+        url = s3.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": settings.R2_BUCKET_NAME,
+                "Key": key,
+                "ContentType": content_type,
+                "ContentLength": size,
+            },
+            ExpiresIn=expires_in
+        )
+        upload = {"method": "PUT", "url": url, "headers": {"Content-Type": content_type}}
+
+    claims = {
+        "typ": UPLOAD_TOKEN_TYPE,
+        "key": key,
+        "content_type": content_type,
+        # Completing is allowed for a while after the URL expires
+        "exp": datetime.utcnow() + timedelta(seconds=expires_in * 2),
+    }
+    if method != "post":
+        claims["size"] = size
+    token = jwt.encode(claims, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    return {**upload, "key": key, "upload_token": token, "expires_in": expires_in}
+
+
+def _delete_object(s3, key: str):
+    try:
+        s3.delete_object(Bucket=settings.R2_BUCKET_NAME, Key=key)
+    except ClientError:
+        pass
+
+
+def complete_upload(upload_token: str) -> Tuple[bool, str, Optional[str]]:
+    """
+    Check and record an object uploaded with a presigned URL.
+
+    Args:
+        upload_token: The token presign_upload issued with the URL
+
+    Returns:
+        Tuple containing:
+        - success (bool): Whether the object was accepted
+        - url (str): The URL of the file
+        - error_message (Optional[str]): Why the object was rejected
+    """
+    try:
+        claims = jwt.decode(upload_token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        return False, "", "Invalid or expired upload token"
+    if claims.get("typ") != UPLOAD_TOKEN_TYPE or not claims.get("key"):
+        return False, "", "Invalid or expired upload token"
+
+    key = claims["key"]
+    content_type = claims["content_type"]
+    s3 = get_r2_client()
+    try:
+        head = s3.head_object(Bucket=settings.R2_BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False, "", "The file has not been uploaded"
+        return False, "", f"Error checking upload: {str(e)}"
+
+    size = head["ContentLength"]
+    if size > _max_size() or ("size" in claims and size != claims["size"]):
+        _delete_object(s3, key)
+        return False, "", f"File is too large or incomplete (max {settings.MAX_UPLOAD_SIZE_MB} MB)"
+
+    # The declared type is only a claim; check the content like a regular upload
+    try:
+        header = s3.get_object(
+            Bucket=settings.R2_BUCKET_NAME,
+            Key=key,
+            Range=f"bytes=0-{SNIFF_LENGTH - 1}"
+        )["Body"].read()
+    except ClientError as e:
+        return False, "", f"Error checking upload: {str(e)}"
+    if sniff_image_type(header) != content_type:
+        _delete_object(s3, key)
+        return False, "", "Invalid file type. Supported types: JPEG, PNG, GIF, WebP"
+
+    record_object(key, size, content_type, head.get("LastModified"))
+    return True, StorageManager.get_file_url(key), None
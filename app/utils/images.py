@@ -0,0 +1,388 @@
+"""
+Resized image variants.
+
+Images are served at /media/resize/{width}x{height}/{path} in the best format
+the browser accepts (AVIF, WebP or JPEG). A height or width of 0 keeps the
+aspect ratio; with both set the image is cropped to fill the box. Rendered
+variants are kept in a disk cache under RESIZE_CACHE_ROOT, and the least
+recently used ones are evicted once it grows past RESIZE_CACHE_MAX_MB.
+
+Pillow holds the GIL while resizing and encoding, so rendering runs in a
+separate process pool. Uploaded images are rendered at IMAGE_VARIANT_WIDTHS
+right away, so the first page view is already served from the cache.
+"""
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Output formats: MIME type, Pillow format name and file extension
+IMAGE_FORMATS = {
+    "avif": ("image/avif", "AVIF", ".avif"),
+    "webp": ("image/webp", "WEBP", ".webp"),
+    "jpeg": ("image/jpeg", "JPEG", ".jpg"),
+}
+
+# Largest source image accepted, in pixels, to keep decompression bombs out
+MAX_SOURCE_PIXELS = 50_000_000
+
+
+class NotResizable(Exception):
+    """The source is not an image that can be resized (e.g. an animated GIF)."""
+
+
+def _render(source: Union[str, bytes], variants: List[Tuple[int, int, str, str]], quality: int) -> int:
+    """
+    Render variants of one image and write them atomically; runs in a worker process.
+
+    Args:
+        source: Path of the original, or its content
+        variants: (width, height, format, target path) tuples
+        quality: Encoder quality
+
+    Returns:
+        Total bytes written
+    """
+    import io
+
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_SOURCE_PIXELS
+    try:
+        image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+        image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise NotResizable(str(e))
+    if getattr(image, "is_animated", False):
+        raise NotResizable("Animated images are not resized")
+
+    # Apply the camera orientation before resizing, then drop the metadata
+    image = ImageOps.exif_transpose(image)
+    written = 0
+    for width, height, output_format, target in variants:
+        if width and height:
+            resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            # Never enlarge; a missing dimension follows the aspect ratio
+            width = min(width or image.width, image.width)
+            height = min(height or round(image.height * width / image.width), image.height)
+            resized = image.copy()
+            resized.thumbnail((width, height), Image.LANCZOS)
+
+        _, pillow_format, _ = IMAGE_FORMATS[output_format]
+        if pillow_format == "JPEG" and resized.mode not in ("RGB", "L"):
+            # JPEG has no alpha channel; flatten transparent images onto white
+            background = Image.new("RGB", resized.size, "white")
+            background.paste(resized, mask=resized.convert("RGBA").getchannel("A"))
+            resized = background
+        elif resized.mode not in ("RGB", "RGBA", "L"):
+            resized = resized.convert("RGBA")
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".render-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                resized.save(f, pillow_format, quality=quality)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, target)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        written += os.path.getsize(target)
+    return written
+
+
+def available_formats() -> List[str]:
+    """Return the configured output formats this Pillow build can encode, JPEG always last."""
+    try:
+        from PIL import features
+    except ImportError:
+        return []
+    names = [name for name in settings.IMAGE_FORMATS if name in IMAGE_FORMATS and name != "jpeg"]
+    return [name for name in names if features.check(name)] + ["jpeg"]
+
+
+def negotiate_format(accept: str) -> str:
+    """Pick the preferred output format the browser accepts."""
+    accept = (accept or "").lower()
+    for name in available_formats():
+        mime_type = IMAGE_FORMATS[name][0]
+        if name == "jpeg" or mime_type in accept:
+            return name
+    return "jpeg"
+
+
+def parse_size(size: str) -> Optional[Tuple[int, int]]:
+    """
+    Parse a size such as 640x0 or 320x320.
+
+    Only widths and heights from IMAGE_VARIANT_WIDTHS (or 0) are accepted, so
+    clients cannot fill the cache with arbitrary sizes.
+    """
+    width, _, height = size.partition("x")
+    if not (width.isdigit() and height.isdigit()):
+        return None
+    width, height = int(width), int(height)
+    allowed = set(settings.IMAGE_VARIANT_WIDTHS) | {0}
+    if width not in allowed or height not in allowed or not (width or height):
+        return None
+    return width, height
+
+
+class ResizeCache:
+    """Files rendered by _render, evicted least recently used first when over the size limit."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        self._evicting = False
+
+    def path_for(self, path: str, width: int, height: int, output_format: str) -> str:
+        key = hashlib.sha1(f"{path}|{width}x{height}|{output_format}".encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key[:2], key[2:4], key + IMAGE_FORMATS[output_format][2])
+
+    def lookup(self, target: str) -> bool:
+        """Return True if a rendered file exists, marking it as recently used."""
+        try:
+            os.utime(target)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def added(self, nbytes: int):
+        """Account for newly written files and evict old ones if the cache is too big."""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            else:
+                self._size += nbytes
+            if self._size <= self.max_bytes or self._evicting:
+                return
+            self._evicting = True
+        try:
+            self.evict()
+        finally:
+            with self._lock:
+                self._evicting = False
+
+    def evict(self):
+        """Delete the least recently used files until the cache is below 90% of its limit."""
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._size = total
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size_bytes": self._size or 0, "max_bytes": self.max_bytes}
+
+
+resize_cache = ResizeCache(settings.RESIZE_CACHE_ROOT, settings.RESIZE_CACHE_MAX_MB * 1024 * 1024)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Renders in progress by target path, so concurrent requests share one
+_in_flight: Dict[str, Future] = {}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSES or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the resize processes, if they were started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _submit(source: Union[str, bytes], variants: List[Tuple[int, int, str, str]]) -> Future:
+    future = _get_pool().submit(_render, source, variants, settings.IMAGE_QUALITY)
+
+    def done(finished: Future):
+        for *_, target in variants:
+            _in_flight.pop(target, None)
+        if not finished.cancelled() and finished.exception() is None:
+            # Eviction walks the cache directory, so keep it off the callback thread
+            threading.Thread(target=resize_cache.added, args=(finished.result(),), daemon=True).start()
+
+    for *_, target in variants:
+        _in_flight[target] = future
+    future.add_done_callback(done)
+    return future
+
+
+def _local_source(path: str) -> str:
+    """Return the file behind a media path, refusing paths outside MEDIA_ROOT."""
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    source = os.path.realpath(os.path.join(media_root, path))
+    if not source.startswith(media_root + os.sep) or not os.path.isfile(source):
+        raise FileNotFoundError(path)
+    return source
+
+
+def _r2_source(path: str) -> bytes:
+    from botocore.exceptions import ClientError
+
+    from app.utils.r2_storage import get_r2_client
+
+    try:
+        response = get_r2_client().get_object(Bucket=settings.R2_BUCKET_NAME, Key=path)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            raise FileNotFoundError(path)
+        raise
+    if response["ContentLength"] > settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024:
+        raise NotResizable("Image is too large")
+    return response["Body"].read()
+
+
+async def get_variant(path: str, width: int, height: int, output_format: str) -> str:
+    """
+    Return the cache file of a resized image, rendering it if needed.
+
+    Raises:
+        FileNotFoundError: If the original does not exist
+        NotResizable: If the original cannot be resized
+    """
+    target = resize_cache.path_for(path, width, height, output_format)
+    if resize_cache.lookup(target):
+        return target
+
+    future = _in_flight.get(target)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        if settings.USE_CLOUD_STORAGE:
+            source = await loop.run_in_executor(None, _r2_source, path)
+        else:
+            source = _local_source(path)
+        future = _in_flight.get(target) or _submit(source, [(width, height, output_format, target)])
+
+    await asyncio.wrap_future(future)
+    return target
+
+
+def _copy_to_temp(file: BinaryIO) -> str:
+    """Copy an upload to a temporary file in chunks and return its path."""
+    file.seek(0)
+    fd, temp_path = tempfile.mkstemp(prefix="upload-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            while chunk := file.read(settings.UPLOAD_CHUNK_SIZE):
+                temp_file.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def render_upload_variants(path: str, source: Optional[BinaryIO] = None):
+    """
+    Start rendering the srcset variants of a newly uploaded image in the background.
+
+    Blocks on disk I/O, so call it from a worker thread.
+
+    Args:
+        path: Media path of the upload (its R2 key when cloud storage is used)
+        source: The uploaded file; it is copied to a temporary file in chunks
+            for the render processes, which delete it when done. The file is
+            read from MEDIA_ROOT when omitted
+    """
+    temp_path = None
+    try:
+        if source is None:
+            source_path = _local_source(path)
+        else:
+            temp_path = source_path = _copy_to_temp(source)
+        variants = [
+            (width, 0, output_format, resize_cache.path_for(path, width, 0, output_format))
+            for width in settings.IMAGE_VARIANT_WIDTHS
+            for output_format in available_formats()
+        ]
+        future = _submit(source_path, variants)
+    except Exception as e:
+        logger.warning("Could not render variants of %s: %s", path, e)
+        if temp_path is not None:
+            _remove_quietly(temp_path)
+        return
+
+    def finish(finished: Future):
+        if temp_path is not None:
+            _remove_quietly(temp_path)
+        if not finished.cancelled() and finished.exception() is not None:
+            logger.warning("Could not render variants of %s: %s", path, finished.exception())
+
+    future.add_done_callback(finish)
+
+
+def media_path(value: str) -> Optional[str]:
+    """Return the media path of a stored image reference, or None for external images."""
+    if not value:
+        return None
+    for prefix in ("/media/", settings.R2_PUBLIC_URL, f"{settings.R2_ENDPOINT_URL.rstrip('/')}/{settings.R2_BUCKET_NAME}"):
+        if prefix and value.startswith(prefix):
+            return value[len(prefix):].lstrip("/")
+    if value.startswith(("http://", "https://", "/", "data:")):
+        return None
+    return value
+
+
+def media_srcset(value: str) -> str:
+    """
+    Template filter: a srcset with the resized widths of a media image.
+
+    Usage: <img src="{{ path|media_url }}" srcset="{{ path|media_srcset }}" sizes="64px">
+    External images get an empty srcset, so the browser uses src.
+    """
+    path = media_path(value)
+    if path is None:
+        return ""
+    return ", ".join(f"/media/resize/{width}x0/{path} {width}w" for width in settings.IMAGE_VARIANT_WIDTHS)
@@ -0,0 +1,134 @@
+from sqlmodel import Session, select, delete, insert, literal
+from sqlalchemy import and_
+from typing import Iterable, List, Tuple
+from uuid import UUID
+
+from app.models import Article, Product, ProductArticleLink
+from app.utils.query import insert_ignore
+
+
+def _link(
+    db: Session,
+    owner_column,
+    owner_id: UUID,
+    target_model,
+    target_column,
+    target_ids: Iterable[UUID]
+) -> Tuple[int, List[UUID]]:
+    """
+    Link one owner row to many target rows in ProductArticleLink.
+
+    Existing targets are resolved with one id-only IN query and the links are
+    created with a single INSERT ... SELECT that skips pairs already linked.
+    """
+    target_ids = set(target_ids)
+    if not target_ids:
+        return 0, []
+
+    existing_ids = set(db.execute(
+        select(target_model.id).where(target_model.id.in_(target_ids))
+    ).scalars().all())
+    missing_ids = sorted(target_ids - existing_ids, key=str)
+    if not existing_ids:
+        return 0, missing_ids
+
+    rows = select(
+        literal(owner_id, type_=owner_column.type).label(owner_column.key),
+        target_model.id.label(target_column.key)
+    ).where(target_model.id.in_(existing_ids))
+
+    stmt = insert_ignore(ProductArticleLink, db.get_bind().dialect.name)
+    if stmt is None:
+        # No conflict-skipping syntax: leave out pairs that are already linked
+        already_linked = select(target_column).where(owner_column == owner_id)
+        rows = rows.where(target_model.id.not_in(already_linked))
+        stmt = insert(ProductArticleLink)
+
+    result = db.execute(
+        stmt.from_select([owner_column.key, target_column.key], rows)
+    )
+    return max(result.rowcount or 0, 0), missing_ids
+
+
+def _unlink(db: Session, owner_column, owner_id: UUID, target_column, target_ids: Iterable[UUID]) -> int:
+    """Remove links between one owner row and many target rows in one DELETE."""
+    target_ids = set(target_ids)
+    if not target_ids:
+        return 0
+
+    result = db.execute(
+        delete(ProductArticleLink).where(
+            and_(owner_column == owner_id, target_column.in_(target_ids))
+        )
+    )
+    return result.rowcount or 0
+
+
+def link_articles_to_product(db: Session, product_id: UUID, article_ids: Iterable[UUID]) -> Tuple[int, List[UUID]]:
+    """
+    Link many articles to a product.
+
+    Args:
+        db: Database session (not committed)
+        product_id: ID of the product
+        article_ids: IDs of the articles to link
+
+    Returns:
+        Tuple containing:
+        - linked (int): Number of new links created
+        - missing (List[UUID]): Article IDs that do not exist
+    """
+    return _link(
+        db, ProductArticleLink.product_id, product_id,
+        Article, ProductArticleLink.article_id, article_ids
+    )
+
+
+def unlink_articles_from_product(db: Session, product_id: UUID, article_ids: Iterable[UUID]) -> int:
+    """Unlink many articles from a product and return the number of links removed."""
+    return _unlink(
+        db, ProductArticleLink.product_id, product_id,
+        ProductArticleLink.article_id, article_ids
+    )
+
+
+def link_products_to_article(db: Session, article_id: UUID, product_ids: Iterable[UUID]) -> Tuple[int, List[UUID]]:
+    """
+    Link many products to an article.
+
+    Args:
+        db: Database session (not committed)
+        article_id: ID of the article
+        product_ids: IDs of the products to link
+
+    Returns:
+        Tuple containing:
+        - linked (int): Number of new links created
+        - missing (List[UUID]): Product IDs that do not exist
+    """
+    return _link(
+        db, ProductArticleLink.article_id, article_id,
+        Product, ProductArticleLink.product_id, product_ids
+    )
+
+
+def unlink_products_from_article(db: Session, article_id: UUID, product_ids: Iterable[UUID]) -> int:
+    """Unlink many products from an article and return the number of links removed."""
+    return _unlink(
+        db, ProductArticleLink.article_id, article_id,
+        ProductArticleLink.product_id, product_ids
+    )
+
+
+def get_product_article_ids(db: Session, product_id: UUID) -> List[UUID]:
+    """Return the IDs of the articles linked to a product without loading the articles."""
+    return db.execute(
+        select(ProductArticleLink.article_id).where(ProductArticleLink.product_id == product_id)
+    ).scalars().all()
+
+
+def get_article_product_ids(db: Session, article_id: UUID) -> List[UUID]:
+    """Return the IDs of the products linked to an article without loading the products."""
+    return db.execute(
+        select(ProductArticleLink.product_id).where(ProductArticleLink.article_id == article_id)
+    ).scalars().all()
@@ -3,6 +3,9 @@ from sqlmodel import Session
 from app.models import SystemLog, SystemLogCreate
 from app.auth.utils import get_client_ip
 
+# Action of the entries written on every successful login; stats rollups count them
+LOGIN_ACTION = "login"
+
 def log_admin_action(
     db: Session, 
     user_id: int, 
@@ -3,9 +3,59 @@ import uuid
 from datetime import datetime
 from fastapi import UploadFile
 from pathlib import Path
+from typing import Optional
 
 from app.utils.storage import StorageManager
 
+# Canonical extension of each image type accepted for upload
+IMAGE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+# Extensions that may be kept for each image type
+_ALLOWED_EXTENSIONS = {
+    "image/jpeg": {".jpg", ".jpeg"},
+    "image/png": {".png"},
+    "image/gif": {".gif"},
+    "image/webp": {".webp"},
+}
+
+# Bytes needed to recognise every supported type
+SNIFF_LENGTH = 12
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """
+    Detect an image type from the first bytes of a file.
+    
+    Args:
+        header: At least SNIFF_LENGTH bytes from the start of the file
+    
+    Returns:
+        The MIME type, or None if the bytes are not a supported image
+    """
+    if header.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def image_filename(filename: str, content_type: str) -> str:
+    """Give a filename the extension of its detected image type, if it has another one."""
+    base, ext = os.path.splitext(filename or "image")
+    if ext.lower() in _ALLOWED_EXTENSIONS[content_type]:
+        return filename
+    return f"{base}{IMAGE_EXTENSIONS[content_type]}"
+
+
 async def save_upload(upload_file: UploadFile, folder: str = "uploads") -> str:
     """
     Save an uploaded file to either local media directory or cloud storage.
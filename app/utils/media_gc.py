@@ -0,0 +1,278 @@
+"""
+Mark-and-sweep garbage collection of uploaded media.
+
+Deleted articles and products leave their images behind. collect_garbage
+first marks every media path an article or product still references (its
+featured image and media URLs in its text), then lists the storage backend
+and deletes the files that are not marked. Files changed within the grace
+period are kept, since an upload is stored before the row referencing it.
+
+Marks are kept in a temporary SQLite file and both phases work a batch at a
+time, so memory use does not grow with the number of rows or files.
+"""
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlmodel import Session, SQLModel
+
+from app.config import settings
+from app.database import engine
+from app.models import MediaBlob
+from app.utils.blobs import BLOB_FOLDER, REFERENCE_COLUMNS, referenced_paths
+from app.utils.media_inventory import _naive_utc, forget_objects
+
+# Rows read per query while marking, files per batch while sweeping
+MARK_BATCH_SIZE = 500
+SWEEP_BATCH_SIZE = 1000
+
+# Orphaned paths listed in the report
+_MAX_REPORTED_ORPHANS = 100
+
+# Paths per IN list; SQLite allows 999 parameters
+_LOOKUP_CHUNK_SIZE = 500
+
+# (media path, size, last modified in UTC)
+StoredFile = Tuple[str, int, datetime]
+
+
+class MarkSet:
+    """A set of media paths kept in a temporary SQLite file."""
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="media-gc-", suffix=".sqlite3")
+        os.close(fd)
+        self._db = sqlite3.connect(self.path)
+        # Throwaway data: no journal, no fsync
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.execute("CREATE TABLE marks (path TEXT PRIMARY KEY) WITHOUT ROWID")
+
+    def add(self, paths: Iterable[str]):
+        self._db.executemany("INSERT OR IGNORE INTO marks (path) VALUES (?)", ((path,) for path in paths))
+        self._db.commit()
+
+    def unmarked(self, paths: List[str]) -> List[str]:
+        """Return the paths that are not in the set, in their original order."""
+        marked = set()
+        for start in range(0, len(paths), _LOOKUP_CHUNK_SIZE):
+            chunk = paths[start:start + _LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            marked.update(
+                row[0] for row in self._db.execute(f"SELECT path FROM marks WHERE path IN ({placeholders})", chunk)
+            )
+        return [path for path in paths if path not in marked]
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT count(*) FROM marks").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "MarkSet":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def mark_references(marks: MarkSet) -> int:
+    """
+    Mark every media path referenced by an article or product.
+
+    Rows are read in primary key order, MARK_BATCH_SIZE at a time, each
+    batch in its own short session.
+
+    Returns:
+        Number of rows read
+    """
+    rows_read = 0
+    for table_name, columns in REFERENCE_COLUMNS.items():
+        table = SQLModel.metadata.tables[table_name]
+        query = select(table.c.id, *(table.c[column] for column in columns)).order_by(table.c.id)
+        last_id = None
+        while True:
+            with Session(engine) as db:
+                page = query if last_id is None else query.where(table.c.id > last_id)
+                rows = db.execute(page.limit(MARK_BATCH_SIZE)).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            rows_read += len(rows)
+
+            paths = set()
+            for row in rows:
+                paths |= referenced_paths(table_name, dict(zip(columns, row[1:])))
+            marks.add(paths)
+    return rows_read
+
+
+def _local_files() -> Iterator[List[StoredFile]]:
+    """List MEDIA_ROOT a batch at a time."""
+    media_root = settings.MEDIA_ROOT
+    batch = []
+    for dirpath, dirnames, filenames in os.walk(media_root):
+        # Skip hidden directories such as caches
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+        if dirpath == media_root:
+            # Files directly in MEDIA_ROOT were not uploaded through StorageManager
+            continue
+        for filename in filenames:
+            if filename.startswith("."):
+                continue
+            full_path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(full_path)
+            except FileNotFoundError:
+                continue
+            relative_path = os.path.relpath(full_path, media_root).replace(os.sep, "/")
+            batch.append((relative_path, stat.st_size, datetime.utcfromtimestamp(stat.st_mtime)))
+            if len(batch) >= SWEEP_BATCH_SIZE:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _r2_files() -> Iterator[List[StoredFile]]:
+    """List the R2 bucket a page at a time."""
+    from app.utils.r2_storage import get_r2_client
+
+    paginator = get_r2_client().get_paginator("list_objects_v2")
+    pages = paginator.paginate(
+        Bucket=settings.R2_BUCKET_NAME,
+        PaginationConfig={"PageSize": SWEEP_BATCH_SIZE}
+    )
+    for page in pages:
+        batch = [
+            (obj["Key"], obj.get("Size", 0), _naive_utc(obj.get("LastModified")))
+            for obj in page.get("Contents", [])
+            # Keys outside a folder were not uploaded through StorageManager
+            if "/" in obj["Key"]
+        ]
+        if batch:
+            yield batch
+
+
+def _recently_used_blobs(paths: List[str], cutoff: datetime) -> set:
+    """
+    Return the blob paths that are counted as referenced or were reused
+    after cutoff; a reused blob may be referenced by a row not saved yet.
+    """
+    blob_paths = [path for path in paths if path.startswith(f"{BLOB_FOLDER}/")]
+    in_use = set()
+    with Session(engine) as db:
+        for start in range(0, len(blob_paths), _LOOKUP_CHUNK_SIZE):
+            chunk = blob_paths[start:start + _LOOKUP_CHUNK_SIZE]
+            in_use.update(db.execute(
+                select(MediaBlob.path)
+                .where(MediaBlob.path.in_(chunk))
+                .where(or_(MediaBlob.ref_count > 0, MediaBlob.updated_at >= cutoff))
+            ).scalars())
+    return in_use
+
+
+def _delete_local_files(paths: Iterable[str], report: Dict[str, Any]):
+    deleted = []
+    for path in paths:
+        try:
+            os.remove(os.path.join(settings.MEDIA_ROOT, path))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            report["failed"] += 1
+            if len(report["errors"]) < _MAX_REPORTED_ORPHANS:
+                report["errors"].append({"key": path, "code": type(e).__name__, "message": str(e)})
+            continue
+        deleted.append(path)
+        if len(deleted) >= SWEEP_BATCH_SIZE:
+            forget_objects(deleted)
+            report["deleted"] += len(deleted)
+            deleted = []
+    if deleted:
+        forget_objects(deleted)
+        report["deleted"] += len(deleted)
+
+
+def collect_garbage(
+    dry_run: bool = True,
+    grace_hours: Optional[int] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Delete stored media that no article or product references.
+
+    Args:
+        dry_run: Only report the orphans, delete nothing
+        grace_hours: Keep files changed more recently than this (defaults to MEDIA_GC_GRACE_HOURS)
+        on_progress: Called with the report so far after every listed batch
+
+    Returns:
+        A report: rows read and paths marked, files listed, orphans found
+        with their total size and the first 100 of them, files kept for the
+        grace period, and files deleted and failed (with the first errors)
+    """
+    grace_hours = settings.MEDIA_GC_GRACE_HOURS if grace_hours is None else grace_hours
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    report: Dict[str, Any] = {
+        "dry_run": dry_run,
+        "grace_hours": grace_hours,
+        "backend": "r2" if settings.USE_CLOUD_STORAGE else "local",
+        "rows_read": 0,
+        "marked": 0,
+        "listed": 0,
+        "orphans": 0,
+        "orphan_bytes": 0,
+        "within_grace": 0,
+        "sample": [],
+        "deleted": 0,
+        "failed": 0,
+        "errors": [],
+    }
+
+    with MarkSet() as marks:
+        report["rows_read"] = mark_references(marks)
+        report["marked"] = len(marks)
+
+        def orphans() -> Iterator[str]:
+            for batch in (_r2_files() if settings.USE_CLOUD_STORAGE else _local_files()):
+                report["listed"] += len(batch)
+                sizes = {path: (size, modified) for path, size, modified in batch}
+                candidates = marks.unmarked([path for path, _, _ in batch])
+                in_use = _recently_used_blobs(candidates, cutoff)
+                for path in candidates:
+                    size, modified = sizes[path]
+                    if modified >= cutoff or path in in_use:
+                        report["within_grace"] += 1
+                        continue
+                    report["orphans"] += 1
+                    report["orphan_bytes"] += size
+                    if len(report["sample"]) < _MAX_REPORTED_ORPHANS:
+                        report["sample"].append(path)
+                    yield path
+                if on_progress:
+                    on_progress(dict(report))
+
+        if dry_run:
+            for _ in orphans():
+                pass
+        elif settings.USE_CLOUD_STORAGE:
+            from app.utils.r2_storage import purge_objects
+
+            # Orphans are deleted as they are found, several batches in flight
+            result = purge_objects(keys=orphans())
+            report["deleted"] = result["deleted"]
+            report["failed"] = result["failed"]
+            report["errors"] = result["errors"]
+        else:
+            _delete_local_files(orphans(), report)
+
+    report["orphan_mb"] = round(report["orphan_bytes"] / (1024 * 1024), 2)
+    return report
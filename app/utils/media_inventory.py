@@ -0,0 +1,227 @@
+"""
+Inventory of the objects in the R2 bucket.
+
+The MediaObject table holds one row per object, so storage statistics are
+indexed queries instead of a listing of the whole bucket. Uploads add rows
+and deletions remove them; reconcile_inventory picks up changes made
+outside the application, one listing page at a time.
+"""
+import os
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.config import settings
+from app.database import engine
+from app.models import MediaBlob, MediaObject
+
+# Keys per IN list when deleting rows
+_DELETE_CHUNK_SIZE = 500
+
+
+def object_extension(key: str) -> str:
+    """Return the lower-case extension of an object key, or "unknown"."""
+    extension = os.path.splitext(key.rsplit("/", 1)[-1])[1].lstrip(".").lower()
+    return extension[:20] or "unknown"
+
+
+def _naive_utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime.utcnow()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _binary(column, dialect_name: str):
+    """Compare keys byte by byte, the order S3 lists them in."""
+    if dialect_name in ("postgresql", "cockroachdb"):
+        return column.collate("C")
+    if dialect_name in ("mysql", "mariadb"):
+        return column.collate("utf8mb4_bin")
+    return column
+
+
+def record_object(key: str, size: int, content_type: Optional[str] = None, last_modified: Optional[datetime] = None):
+    """Add or update the inventory row of an uploaded object."""
+    values = {
+        "size": size,
+        "content_type": content_type,
+        "extension": object_extension(key),
+        "last_modified": _naive_utc(last_modified),
+    }
+    with Session(engine) as db:
+        row = db.get(MediaObject, key)
+        if row is None:
+            db.add(MediaObject(key=key, **values))
+        else:
+            for name, value in values.items():
+                setattr(row, name, value)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Recorded by a concurrent upload of the same key
+            db.rollback()
+
+
+def forget_objects(keys: Iterable[str]):
+    """
+    Remove deleted objects from the inventory.
+
+    Blobs stored at those keys are forgotten too, so the next upload of the
+    same content is transferred again.
+    """
+    keys = list(keys)
+    with Session(engine) as db:
+        connection = db.connection()
+        for start in range(0, len(keys), _DELETE_CHUNK_SIZE):
+            chunk = keys[start:start + _DELETE_CHUNK_SIZE]
+            connection.execute(delete(MediaObject).where(MediaObject.key.in_(chunk)))
+            connection.execute(delete(MediaBlob).where(MediaBlob.path.in_(chunk)))
+        db.commit()
+
+
+def inventory_stats(db: Session, recent: int = 10) -> Dict:
+    """Return object totals, counts and sizes per extension, and the most recent objects."""
+    total_objects, total_size = db.execute(
+        select(func.count(), func.coalesce(func.sum(MediaObject.size), 0))
+    ).one()
+
+    file_types = {
+        extension: {"count": count, "size": int(size or 0)}
+        for extension, count, size in db.execute(
+            select(MediaObject.extension, func.count(), func.sum(MediaObject.size))
+            .group_by(MediaObject.extension)
+        )
+    }
+
+    most_recent = db.execute(
+        select(MediaObject, MediaBlob.ref_count)
+        .outerjoin(MediaBlob, MediaBlob.path == MediaObject.key)
+        .order_by(MediaObject.last_modified.desc())
+        .limit(recent)
+    ).all()
+
+    return {
+        "total_objects": total_objects,
+        "total_size_bytes": int(total_size),
+        "total_size_mb": round(int(total_size) / (1024 * 1024), 2),
+        "file_types": file_types,
+        "most_recent_files": [
+            {
+                "key": obj.key,
+                "size": obj.size,
+                "content_type": obj.content_type,
+                "last_modified": obj.last_modified,
+                # Rows referencing the object, for deduplicated uploads
+                "ref_count": ref_count
+            }
+            for obj, ref_count in most_recent
+        ]
+    }
+
+
+def _reconcile_page(
+    lower: Optional[str],
+    upper: Optional[str],
+    contents: List[Dict],
+    counts: Dict[str, int]
+):
+    """Make the inventory rows with keys in (lower, upper] match one listing page."""
+    listed = {obj["Key"]: obj for obj in contents}
+    with Session(engine) as db:
+        connection = db.connection()
+        key = _binary(MediaObject.key, connection.dialect.name)
+
+        existing = {}
+        if listed:
+            existing = {
+                row.key: row
+                for row in connection.execute(
+                    select(MediaObject.key, MediaObject.size, MediaObject.last_modified)
+                    .where(MediaObject.key.in_(list(listed)))
+                )
+            }
+
+        # Rows in the page's key range that the bucket no longer has
+        in_range = [MediaObject.key.not_in(list(listed))]
+        if lower is not None:
+            in_range.append(key > lower)
+        if upper is not None:
+            in_range.append(key <= upper)
+        connection.execute(
+            delete(MediaBlob).where(MediaBlob.path.in_(select(MediaObject.key).where(*in_range)))
+        )
+        counts["removed"] += connection.execute(delete(MediaObject).where(*in_range)).rowcount or 0
+
+        new_rows = []
+        for object_key, obj in listed.items():
+            last_modified = _naive_utc(obj.get("LastModified"))
+            row = existing.get(object_key)
+            if row is None:
+                new_rows.append({
+                    "key": object_key,
+                    "size": obj.get("Size", 0),
+                    "content_type": None,
+                    "extension": object_extension(object_key),
+                    "last_modified": last_modified,
+                })
+            elif row.size != obj.get("Size", 0) or row.last_modified != last_modified:
+                connection.execute(
+                    update(MediaObject)
+                    .where(MediaObject.key == object_key)
+                    .values(size=obj.get("Size", 0), last_modified=last_modified)
+                )
+                counts["updated"] += 1
+        if new_rows:
+            connection.execute(insert(MediaObject), new_rows)
+            counts["added"] += len(new_rows)
+
+        db.commit()
+
+
+def reconcile_inventory(
+    start_after: Optional[str] = None,
+    counts: Optional[Dict[str, int]] = None,
+    on_page: Optional[Callable[[Optional[str], Dict[str, int]], None]] = None
+) -> Dict[str, int]:
+    """
+    Bring the inventory in line with the bucket.
+
+    Each listing page is compared with the inventory rows in the same key
+    range: missing rows are added, changed ones updated and rows of objects
+    that are gone removed. Only one page of keys is held at a time, and
+    every page is committed on its own, so a run can resume after the last
+    key it finished.
+
+    Args:
+        start_after: Resume after this key
+        counts: Counts of an interrupted run to continue from
+        on_page: Called after every page with the last key done (None at the
+            end of the bucket) and the counts so far
+
+    Returns:
+        Numbers of objects listed, and inventory rows added, updated and removed
+    """
+    from app.utils.r2_storage import get_r2_client
+
+    counts = dict(counts or {"listed": 0, "added": 0, "updated": 0, "removed": 0})
+    params = {"Bucket": settings.R2_BUCKET_NAME}
+    if start_after:
+        params["StartAfter"] = start_after
+
+    lower = start_after
+    paginator = get_r2_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(**params):
+        contents = page.get("Contents", [])
+        # The last page covers every key after the previous one
+        upper = contents[-1]["Key"] if page.get("IsTruncated") and contents else None
+        _reconcile_page(lower, upper, contents, counts)
+        counts["listed"] += len(contents)
+        lower = upper
+        if on_page:
+            on_page(upper, counts)
+    return counts
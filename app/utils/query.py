@@ -0,0 +1,90 @@
+from sqlalchemy import String, cast, func
+from sqlalchemy.sql.elements import ColumnElement
+
+# Label formats for each supported bucket interval, per dialect family
+_SQLITE_FORMATS = {
+    "hour": "%Y-%m-%dT%H:00",
+    "day": "%Y-%m-%d",
+    "month": "%Y-%m",
+    "year": "%Y",
+}
+
+_POSTGRES_FORMATS = {
+    "hour": 'YYYY-MM-DD"T"HH24:00',
+    "day": "YYYY-MM-DD",
+    "month": "YYYY-MM",
+    "year": "YYYY",
+}
+
+_MYSQL_FORMATS = {
+    "hour": "%Y-%m-%dT%H:00",
+    "day": "%Y-%m-%d",
+    "month": "%Y-%m",
+    "year": "%Y",
+}
+
+# Length of the ISO-8601 prefix that identifies each bucket
+_ISO_PREFIX_LENGTHS = {
+    "hour": 13,
+    "day": 10,
+    "month": 7,
+    "year": 4,
+}
+
+DATE_BUCKET_INTERVALS = tuple(_ISO_PREFIX_LENGTHS.keys())
+
+
+def date_bucket(column, interval: str, dialect_name: str) -> ColumnElement:
+    """
+    Build a SQL expression that truncates a datetime column to a bucket label.
+
+    The label is a string such as "2024-05" (month) or "2024-05-13" (day), so
+    results from different dialects can be compared and sorted the same way.
+
+    Args:
+        column: The datetime column to bucket
+        interval: One of "hour", "day", "month" or "year"
+        dialect_name: Name of the SQLAlchemy dialect the query will run on
+
+    Returns:
+        A column expression producing the bucket label
+    """
+    if interval not in _ISO_PREFIX_LENGTHS:
+        raise ValueError(f"Unsupported date bucket interval: {interval}")
+
+    if dialect_name == "sqlite":
+        return func.strftime(_SQLITE_FORMATS[interval], column)
+    if dialect_name in ("postgresql", "cockroachdb"):
+        return func.to_char(column, _POSTGRES_FORMATS[interval])
+    if dialect_name in ("mysql", "mariadb"):
+        return func.date_format(column, _MYSQL_FORMATS[interval])
+
+    # Fall back to the ISO string representation for other dialects
+    label = func.substr(cast(column, String), 1, _ISO_PREFIX_LENGTHS[interval])
+    if interval == "hour":
+        label = func.concat(func.replace(label, " ", "T"), ":00")
+    return label
+
+
+def insert_ignore(table, dialect_name: str):
+    """
+    Build an INSERT for a table that silently skips rows whose primary key
+    already exists (ON CONFLICT DO NOTHING / INSERT IGNORE).
+
+    Args:
+        table: The model class or Table to insert into
+        dialect_name: Name of the SQLAlchemy dialect the statement will run on
+
+    Returns:
+        An insert statement, or None if the dialect has no conflict-skipping syntax
+    """
+    if dialect_name in ("postgresql", "cockroachdb"):
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table).on_conflict_do_nothing()
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table).on_conflict_do_nothing()
+    if dialect_name in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        return mysql_insert(table).prefix_with("IGNORE")
+    return None
@@ -2,9 +2,13 @@
 import sys
 import os
 from pathlib import Path
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import boto3
-from botocore.exceptions import ClientError
-from typing import List, Dict, Any, Tuple, Optional
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from typing import List, Dict, Any, Tuple, Optional, Callable, Iterable, Iterator
 
 # Add the parent directory to sys.path
 sys.path.append(str(Path(__file__).parent.parent.parent))
@@ -12,9 +16,18 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 from app.config import settings
 
 
+_client = None
+_client_lock = threading.Lock()
+
+
 def get_r2_client():
     """
-    Creates and returns an S3 client configured for Cloudflare R2.
+    Returns the S3 client configured for Cloudflare R2.
+    
+    The client is created once per process and shared: boto3 clients are
+    thread-safe, and reusing one keeps its connection pool (and TLS sessions)
+    alive between calls instead of paying credential resolution, endpoint
+    setup and a handshake on every upload.
     
     Returns:
         boto3.client: Boto3 S3 client configured for R2
@@ -22,6 +35,10 @@ def get_r2_client():
     Raises:
         ValueError: If R2 is not properly configured
     """
+    global _client
+    if _client is not None:
+        return _client
+
     # Check if R2 is properly configured
     if not settings.USE_CLOUD_STORAGE:
         raise ValueError("Cloud storage is not enabled in settings")
@@ -34,185 +51,220 @@ def get_r2_client():
     ]):
         raise ValueError("R2 storage is not properly configured")
     
-    # Set up S3 client for R2
-    return boto3.client(
-        service_name='s3',
-        endpoint_url=settings.R2_ENDPOINT_URL,
-        aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-        region_name=settings.R2_REGION_NAME
+    with _client_lock:
+        if _client is None:
+            # Sessions are not thread-safe, so the client gets its own
+            session = boto3.session.Session()
+            _client = session.client(
+                service_name='s3',
+                endpoint_url=settings.R2_ENDPOINT_URL,
+                aws_access_key_id=settings.R2_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
+                region_name=settings.R2_REGION_NAME,
+                config=Config(
+                    # R2 only accepts SigV4, which presigned URLs do not default to
+                    signature_version="s3v4",
+                    max_pool_connections=settings.R2_MAX_POOL_CONNECTIONS,
+                    connect_timeout=settings.R2_CONNECT_TIMEOUT,
+                    read_timeout=settings.R2_READ_TIMEOUT,
+                    tcp_keepalive=True,
+                    retries={"max_attempts": settings.R2_MAX_ATTEMPTS, "mode": "standard"}
+                )
+            )
+        return _client
+
+
+def get_transfer_config() -> TransferConfig:
+    """Returns the multipart settings for uploads with upload_fileobj."""
+    return TransferConfig(
+        multipart_threshold=settings.R2_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+        multipart_chunksize=settings.R2_MULTIPART_CHUNK_SIZE_MB * 1024 * 1024,
+        max_concurrency=settings.R2_MULTIPART_CONCURRENCY,
+        use_threads=settings.R2_MULTIPART_CONCURRENCY > 1
     )
 
 
-def list_all_objects() -> List[Dict[str, Any]]:
-    """
-    Lists all objects in the R2 bucket.
-    
-    Returns:
-        List[Dict[str, Any]]: List of object metadata dictionaries
-    """
-    s3 = get_r2_client()
-    
-    objects = []
-    paginator = s3.get_paginator('list_objects_v2')
-    
-    for page in paginator.paginate(Bucket=settings.R2_BUCKET_NAME):
-        if 'Contents' in page:
-            for obj in page['Contents']:
-                objects.append(obj)
-    
-    return objects
+def reset_r2_client():
+    """Drop the shared client so the next call creates one from the current settings."""
+    global _client
+    with _client_lock:
+        _client = None
 
 
-def delete_all_objects(force: bool = False) -> Tuple[bool, int, Optional[str]]:
-    """
-    Deletes all objects in the R2 bucket.
-    
-    Args:
-        force: If True, skips confirmation and deletes all objects
-    
-    Returns:
-        Tuple containing:
-        - success (bool): Whether the operation was successful
-        - count (int): Number of objects deleted
-        - error (Optional[str]): Error message if operation failed
-    """
-    try:
-        s3 = get_r2_client()
-        
-        # List all objects in the bucket
-        paginator = s3.get_paginator('list_objects_v2')
-        total_objects = 0
-        objects_to_delete = []
-        
-        for page in paginator.paginate(Bucket=settings.R2_BUCKET_NAME):
-            if 'Contents' not in page:
-                return True, 0, None  # No objects to delete
-                
-            for obj in page.get('Contents', []):
-                objects_to_delete.append({'Key': obj['Key']})
-                total_objects += 1
-                
-                # Delete in batches of 1000 objects (S3 API limit)
-                if len(objects_to_delete) >= 1000:
-                    s3.delete_objects(
-                        Bucket=settings.R2_BUCKET_NAME,
-                        Delete={'Objects': objects_to_delete}
-                    )
-                    objects_to_delete = []
-        
-        # Delete any remaining objects
-        if objects_to_delete:
-            s3.delete_objects(
-                Bucket=settings.R2_BUCKET_NAME,
-                Delete={'Objects': objects_to_delete}
-            )
-        
-        return True, total_objects, None
-        
-    except ClientError as e:
-        error_code = e.response.get("Error", {}).get("Code", "Unknown")
-        error_message = e.response.get("Error", {}).get("Message", str(e))
-        return False, 0, f"{error_code} - {error_message}"
-        
-    except Exception as e:
-        return False, 0, str(e)
+# Largest number of keys a delete_objects call accepts
+DELETE_BATCH_SIZE = 1000
+
+# Per-key error codes worth retrying within a batch
+_RETRYABLE_DELETE_ERRORS = {"InternalError", "ServiceUnavailable", "SlowDown"}
+
+# Failed keys kept in the purge result; the rest are only counted
+_MAX_REPORTED_ERRORS = 100
 
 
-def delete_objects_by_prefix(prefix: str, force: bool = False) -> Tuple[bool, int, Optional[str]]:
+def _delete_batch(s3, keys: List[str]) -> Tuple[List[str], List[Dict[str, str]]]:
     """
-    Deletes all objects in the R2 bucket with the specified prefix.
-    
-    Args:
-        prefix: Prefix to filter objects by
-        force: If True, skips confirmation and deletes objects
-    
-    Returns:
-        Tuple containing:
-        - success (bool): Whether the operation was successful
-        - count (int): Number of objects deleted
-        - error (Optional[str]): Error message if operation failed
+    Delete up to DELETE_BATCH_SIZE objects and drop them from the media inventory.
+
+    Keys that fail with a transient error are retried twice. Returns the
+    deleted keys and the per-key errors ({"key", "code", "message"}) of the
+    keys that could not be deleted.
     """
-    try:
-        s3 = get_r2_client()
-        
-        # List objects with the given prefix
-        paginator = s3.get_paginator('list_objects_v2')
-        total_objects = 0
-        objects_to_delete = []
-        
-        for page in paginator.paginate(Bucket=settings.R2_BUCKET_NAME, Prefix=prefix):
-            if 'Contents' not in page:
-                return True, 0, None  # No objects to delete
-                
-            for obj in page.get('Contents', []):
-                objects_to_delete.append({'Key': obj['Key']})
-                total_objects += 1
-                
-                # Delete in batches of 1000 objects (S3 API limit)
-                if len(objects_to_delete) >= 1000:
-                    s3.delete_objects(
-                        Bucket=settings.R2_BUCKET_NAME,
-                        Delete={'Objects': objects_to_delete}
-                    )
-                    objects_to_delete = []
-        
-        # Delete any remaining objects
-        if objects_to_delete:
-            s3.delete_objects(
-                Bucket=settings.R2_BUCKET_NAME,
-                Delete={'Objects': objects_to_delete}
-            )
-        
-        return True, total_objects, None
-        
-    except ClientError as e:
-        error_code = e.response.get("Error", {}).get("Code", "Unknown")
-        error_message = e.response.get("Error", {}).get("Message", str(e))
-        return False, 0, f"{error_code} - {error_message}"
-        
-    except Exception as e:
-        return False, 0, str(e)
+    from app.utils.media_inventory import forget_objects
+
+    deleted: List[str] = []
+    errors: List[Dict[str, str]] = []
+    pending = keys
+    for attempt in range(3):
+        response = s3.delete_objects(
+            Bucket=settings.R2_BUCKET_NAME,
+            Delete={'Objects': [{'Key': key} for key in pending]}
+        )
+        deleted.extend(item['Key'] for item in response.get('Deleted', []))
+        pending = []
+        for item in response.get('Errors', []):
+            code = item.get('Code', 'Unknown')
+            if code in _RETRYABLE_DELETE_ERRORS and attempt < 2:
+                pending.append(item.get('Key'))
+            else:
+                errors.append({"key": item.get('Key'), "code": code, "message": item.get('Message', '')})
+        if not pending:
+            break
+        time.sleep(0.5 * 2 ** attempt)
+
+    if deleted:
+        forget_objects(deleted)
+    return deleted, errors
 
 
-def delete_specific_objects(keys: List[str]) -> Tuple[bool, int, Optional[str]]:
+def _list_key_batches(s3, prefix: Optional[str], start_after: Optional[str]) -> Iterator[List[str]]:
+    """Yield the keys of the bucket (or of a prefix) in listing order, a page at a time."""
+    params = {'Bucket': settings.R2_BUCKET_NAME, 'PaginationConfig': {'PageSize': DELETE_BATCH_SIZE}}
+    if prefix:
+        params['Prefix'] = prefix
+    if start_after:
+        params['StartAfter'] = start_after
+    for page in s3.get_paginator('list_objects_v2').paginate(**params):
+        # A page can be empty while later ones are not, so never stop early
+        keys = [obj['Key'] for obj in page.get('Contents', [])]
+        if keys:
+            yield keys
+
+
+def _chunked(keys: Iterable[str]) -> Iterator[List[str]]:
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) >= DELETE_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def purge_objects(
+    prefix: Optional[str] = None,
+    keys: Optional[Iterable[str]] = None,
+    start_after: Optional[str] = None,
+    previous: Optional[Dict[str, Any]] = None,
+    concurrency: Optional[int] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
     """
-    Deletes specific objects from the R2 bucket.
-    
+    Delete objects from the R2 bucket with several delete_objects calls in flight.
+
+    Listing runs ahead of deletion: every page of keys is handed to a pool of
+    R2_PURGE_CONCURRENCY threads, and the next page is listed while earlier
+    ones are being deleted. At most that many batches are pending at a time,
+    so memory stays bounded however large the bucket is.
+
+    The result's "checkpoint" is the last key such that every batch up to it
+    has finished; passing it back as start_after (with the result as
+    previous) resumes an interrupted purge without listing deleted keys again.
+
     Args:
-        keys: List of object keys to delete
-    
+        prefix: Only delete keys with this prefix; all keys when empty
+        keys: Delete exactly these keys instead of listing the bucket
+        start_after: Resume after this key (listing only)
+        previous: Result of the interrupted run, to keep counting from
+        concurrency: delete_objects calls in flight (defaults to R2_PURGE_CONCURRENCY)
+        on_progress: Called with the result so far after every batch
+
     Returns:
-        Tuple containing:
-        - success (bool): Whether the operation was successful
-        - count (int): Number of objects deleted
-        - error (Optional[str]): Error message if operation failed
+        deleted and failed counts, failed keys with their error codes (the
+        first 100), error counts per code, the checkpoint, elapsed seconds
+        and objects deleted per second
+
+    Raises:
+        ClientError: If a delete_objects call fails as a whole
     """
-    if not keys:
-        return True, 0, None
-        
+    s3 = get_r2_client()
+    previous = previous or {}
+    result: Dict[str, Any] = {
+        "deleted": previous.get("deleted", 0),
+        "failed": previous.get("failed", 0),
+        "errors": list(previous.get("errors", [])),
+        "error_codes": dict(previous.get("error_codes", {})),
+        "checkpoint": start_after,
+        "elapsed_seconds": previous.get("elapsed_seconds", 0.0),
+        "objects_per_second": 0.0,
+    }
+    already_elapsed = result["elapsed_seconds"]
+    started = time.monotonic()
+
+    if keys is not None:
+        batches = _chunked(keys)
+    else:
+        batches = _list_key_batches(s3, prefix, start_after)
+
+    concurrency = concurrency or settings.R2_PURGE_CONCURRENCY
+    # Batches in listing order and whether each has finished, for the checkpoint
+    order: List[int] = []
+    last_keys: Dict[int, str] = {}
+    finished: set = set()
+
+    def collect(future):
+        sequence = futures.pop(future)
+        deleted, errors = future.result()
+        result["deleted"] += len(deleted)
+        result["failed"] += len(errors)
+        for error in errors:
+            result["error_codes"][error["code"]] = result["error_codes"].get(error["code"], 0) + 1
+            if len(result["errors"]) < _MAX_REPORTED_ERRORS:
+                result["errors"].append(error)
+
+        finished.add(sequence)
+        while order and order[0] in finished:
+            done = order.pop(0)
+            finished.discard(done)
+            if keys is None:
+                result["checkpoint"] = last_keys.pop(done)
+
+        result["elapsed_seconds"] = round(already_elapsed + time.monotonic() - started, 3)
+        if result["elapsed_seconds"]:
+            result["objects_per_second"] = round(result["deleted"] / result["elapsed_seconds"], 1)
+        if on_progress:
+            on_progress(dict(result))
+
+    futures: Dict[Future, int] = {}
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="r2-purge")
     try:
-        s3 = get_r2_client()
-        
-        # Process keys in batches of 1000 (S3 API limit)
-        for i in range(0, len(keys), 1000):
-            batch = keys[i:i+1000]
-            objects_to_delete = [{'Key': key} for key in batch]
-            
-            s3.delete_objects(
-                Bucket=settings.R2_BUCKET_NAME,
-                Delete={'Objects': objects_to_delete}
-            )
-        
-        return True, len(keys), None
-        
-    except ClientError as e:
-        error_code = e.response.get("Error", {}).get("Code", "Unknown")
-        error_message = e.response.get("Error", {}).get("Message", str(e))
-        return False, 0, f"{error_code} - {error_message}"
-        
-    except Exception as e:
-        return False, 0, str(e)
+        for sequence, batch in enumerate(batches):
+            while len(futures) >= concurrency:
+                done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+            order.append(sequence)
+            last_keys[sequence] = batch[-1]
+            futures[executor.submit(_delete_batch, s3, batch)] = sequence
+
+        while futures:
+            done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+            for future in done:
+                collect(future)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return result
 
 
 if __name__ == "__main__":
@@ -221,16 +273,10 @@ if __name__ == "__main__":
     print("It is intended to be imported from other scripts, not run directly.")
     print("\nAvailable functions:")
     print("- get_r2_client()")
-    print("- list_all_objects()")
-    print("- delete_all_objects(force=False)")
-    print("- delete_objects_by_prefix(prefix, force=False)")
-    print("- delete_specific_objects(keys)")
+    print("- purge_objects(prefix=None, keys=None, start_after=None)")
     
     # Show example usage
     print("\nExample usage:")
-    print("from scripts.utils.r2_storage import delete_all_objects")
-    print("success, count, error = delete_all_objects(force=True)")
-    print("if success:")
-    print("    print(f'Successfully deleted {count} objects')")
-    print("else:")
-    print("    print(f'Error: {error}')") 
\ No newline at end of file
+    print("from app.utils.r2_storage import purge_objects")
+    print("result = purge_objects(prefix='products/')")
+    print("print(f\"Deleted {result['deleted']} objects, {result['failed']} failed\")")
@@ -0,0 +1,194 @@
+"""
+Static and media files for production.
+
+CachedStaticFiles extends StaticFiles with:
+
+- Cache-Control: uploads and fingerprinted static files are cached for a
+  year as immutable, other static files for STATIC_MAX_AGE seconds
+- Precompressed siblings: app.css.br or app.css.gz is sent instead of
+  app.css when the browser accepts it (see scripts/precompress_static.py)
+- Optionally, handing the file to the reverse proxy with X-Accel-Redirect
+  (nginx) or X-Sendfile (Apache, lighttpd), so no bytes go through Python
+
+Range requests are answered by FileResponse.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.config import settings
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Content codings of precompressed siblings and their suffixes, preferred first
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+# Types worth compressing; images, video and archives are compressed already
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+
+# Names such as app.3f9a2c1b.css carry a hash of their content
+_FINGERPRINTED = re.compile(r"\.[0-9a-f]{8,}\.[^./]+$")
+
+# Content hashes by file path, with the mtime and size they were computed for
+_fingerprints: Dict[str, Tuple[float, int, str]] = {}
+_fingerprints_lock = threading.Lock()
+
+
+def is_compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def file_fingerprint(full_path: str) -> str:
+    """Return a short hash of a file's content, recomputed when the file changes."""
+    stat_result = os.stat(full_path)
+    with _fingerprints_lock:
+        cached = _fingerprints.get(full_path)
+    if cached and cached[:2] == (stat_result.st_mtime, stat_result.st_size):
+        return cached[2]
+
+    sha256 = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        while chunk := f.read(64 * 1024):
+            sha256.update(chunk)
+    fingerprint = sha256.hexdigest()[:12]
+    with _fingerprints_lock:
+        _fingerprints[full_path] = (stat_result.st_mtime, stat_result.st_size, fingerprint)
+    return fingerprint
+
+
+def static_url(path: str) -> str:
+    """
+    Template global: the URL of a static file with its fingerprint, which
+    browsers may cache for good.
+
+    Usage: <link rel="stylesheet" href="{{ static_url('css/site.css') }}">
+    """
+    path = path.lstrip("/")
+    try:
+        return f"/static/{path}?v={file_fingerprint(os.path.join(settings.STATIC_ROOT, path))}"
+    except OSError:
+        return f"/static/{path}"
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Return the content codings an Accept-Encoding header allows."""
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    return accepted
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with long-lived caching, precompressed siblings and proxy offload.
+
+    Args:
+        immutable: Every file is immutable, as uploads are; otherwise only
+            fingerprinted names and URLs from static_url are
+        **kwargs: Passed to StaticFiles
+    """
+
+    def __init__(self, *, immutable: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.immutable = immutable
+
+    def cache_control(self, full_path: str, scope: Scope) -> str:
+        if self.immutable or _FINGERPRINTED.search(full_path):
+            return IMMUTABLE
+        # Only the current fingerprint is immutable; an outdated one gets the
+        # current content, which must not be cached under the old URL for good
+        version = QueryParams(scope.get("query_string", b"")).get("v")
+        if version and version == file_fingerprint(full_path):
+            return IMMUTABLE
+        return f"public, max-age={settings.STATIC_MAX_AGE}"
+
+    def precompressed(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        request_headers: Headers
+    ) -> Optional[Tuple[str, str, os.stat_result]]:
+        """Return the coding, path and stat of a precompressed sibling the client accepts, if any."""
+        # Ranges refer to the identity encoding
+        if "range" in request_headers:
+            return None
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        for coding, suffix in PRECOMPRESSED:
+            if coding not in accepted:
+                continue
+            try:
+                sibling_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            # A sibling older than its original is left over from a previous version
+            if sibling_stat.st_mtime >= stat_result.st_mtime:
+                return coding, full_path + suffix, sibling_stat
+        return None
+
+    def offload(self, full_path: str, scope: Scope, headers: Dict[str, str]) -> Response:
+        """Let the reverse proxy send the file."""
+        header = settings.STATIC_SENDFILE_HEADER
+        if header.lower() == "x-accel-redirect":
+            # An internal nginx location per mount, e.g. /protected/media/ for /media
+            mount_path = scope.get("root_path", "")[len(scope.get("app_root_path", "")):]
+            relative_path = os.path.relpath(full_path, os.path.realpath(self.directory)).replace(os.sep, "/")
+            location = f"{settings.STATIC_ACCEL_REDIRECT_PREFIX.rstrip('/')}{mount_path}/{relative_path}"
+        else:
+            location = full_path
+        headers = {name: value for name, value in headers.items() if name not in ("content-length", "accept-ranges")}
+        headers[header] = location
+        return Response(headers=headers)
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+        headers = {"Cache-Control": self.cache_control(full_path, scope)}
+
+        path, served_stat = full_path, stat_result
+        if is_compressible(media_type):
+            headers["Vary"] = "Accept-Encoding"
+            # The proxy picks precompressed files itself (gzip_static)
+            sibling = None if settings.STATIC_SENDFILE_HEADER else self.precompressed(
+                full_path, stat_result, request_headers
+            )
+            if sibling is not None:
+                coding, path, served_stat = sibling
+                headers["Content-Encoding"] = coding
+
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=served_stat
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        if settings.STATIC_SENDFILE_HEADER:
+            return self.offload(full_path, scope, dict(response.headers))
+        return response
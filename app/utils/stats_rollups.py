@@ -0,0 +1,270 @@
+"""
+Hourly and daily rollups of content and engagement metrics.
+
+Trend charts read StatsRollup rows instead of scanning articles, comments
+and logs by time. The stats rollup job keeps them current:
+
+- Hourly counts are recounted from the source tables, starting
+  STATS_ROLLUP_LOOKBACK_HOURS before the latest hour already rolled up
+  (from the oldest source row on the first run), so late changes within
+  the lookback are picked up and older hours are never scanned again
+- Views have no timestamps: each run records the sum of Article.views and
+  credits the increase since the previous hour to the current one
+- Daily values are the sums of the hourly rows of the days recounted
+
+Buckets are in UTC, like every timestamp in the database. Only buckets
+with a value are stored; get_series fills in the zeros.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import engine
+from app.models import Article, Comment, MediaBlob, MediaObject, StatsRollup, SystemLog
+from app.utils.logging import LOGIN_ACTION
+from app.utils.query import date_bucket
+
+ROLLUP_PERIODS = ("hour", "day")
+
+# Metrics available to charts
+METRICS = ("articles_published", "comments", "views", "uploads", "logins")
+
+# Sum of Article.views at the last run of each hour; views are its increases
+VIEWS_TOTAL = "views_total"
+
+_BUCKET_FORMATS = {"hour": "%Y-%m-%dT%H:%M", "day": "%Y-%m-%d"}
+_BUCKET_LENGTHS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# Buckets charted when no start is given
+_DEFAULT_BUCKETS = {"hour": 48, "day": 30}
+
+
+def bucket_start(moment: datetime, period: str) -> datetime:
+    """Truncate a UTC datetime to the start of its hour or day."""
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if period == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def _counted_sources() -> Dict[str, Tuple[Any, List[Any]]]:
+    """Return the timestamp column and conditions each counted metric is rolled up from."""
+    sources = {
+        "articles_published": (Article.published_at, [Article.published == True]),
+        "comments": (Comment.created_at, []),
+        "logins": (SystemLog.created_at, [SystemLog.action == LOGIN_ACTION]),
+    }
+    # Objects in the bucket, or stored files when they are deduplicated;
+    # local uploads without deduplication leave no record to count
+    if settings.USE_CLOUD_STORAGE:
+        sources["uploads"] = (MediaObject.last_modified, [])
+    elif settings.MEDIA_DEDUPLICATE:
+        sources["uploads"] = (MediaBlob.created_at, [])
+    return sources
+
+
+def _parse_bucket(label: str, period: str) -> datetime:
+    return datetime.strptime(label[:16], _BUCKET_FORMATS[period])
+
+
+def _count_by_hour(db: Session, column, conditions: List[Any], since: datetime) -> Dict[datetime, int]:
+    bucket = date_bucket(column, "hour", db.get_bind().dialect.name).label("bucket")
+    rows = db.execute(
+        select(bucket, func.count())
+        .where(column >= since, *conditions)
+        .group_by(bucket)
+    )
+    return {_parse_bucket(label, "hour"): count for label, count in rows if label is not None}
+
+
+def _sum_hours_by_day(db: Session, metric: str, since: datetime) -> Dict[datetime, int]:
+    bucket = date_bucket(StatsRollup.bucket_start, "day", db.get_bind().dialect.name).label("bucket")
+    rows = db.execute(
+        select(bucket, func.sum(StatsRollup.value))
+        .where(
+            StatsRollup.period == "hour",
+            StatsRollup.metric == metric,
+            StatsRollup.bucket_start >= since
+        )
+        .group_by(bucket)
+    )
+    return {_parse_bucket(label, "day"): int(total) for label, total in rows if label is not None}
+
+
+def _latest_bucket(db: Session, metric: str) -> Optional[datetime]:
+    return db.scalar(
+        select(func.max(StatsRollup.bucket_start))
+        .where(StatsRollup.period == "hour", StatsRollup.metric == metric)
+    )
+
+
+def _replace_buckets(db: Session, period: str, metric: str, since: datetime, values: Dict[datetime, int]):
+    """Replace the stored buckets of a metric from since on with values."""
+    db.execute(
+        delete(StatsRollup)
+        .where(
+            StatsRollup.period == period,
+            StatsRollup.metric == metric,
+            StatsRollup.bucket_start >= since
+        )
+    )
+    now = datetime.utcnow()
+    rows = [
+        {"period": period, "metric": metric, "bucket_start": bucket, "value": value, "updated_at": now}
+        for bucket, value in values.items()
+        if value
+    ]
+    if rows:
+        db.execute(insert(StatsRollup), rows)
+
+
+def _hourly_window_start(db: Session, metric: str, column, conditions: List[Any], now_hour: datetime) -> Optional[datetime]:
+    """Return the first hour to recount, or None if there is nothing to count yet."""
+    latest = _latest_bucket(db, metric)
+    if latest is not None:
+        return min(latest, now_hour) - timedelta(hours=settings.STATS_ROLLUP_LOOKBACK_HOURS)
+    oldest = db.scalar(select(func.min(column)).where(*conditions))
+    return bucket_start(oldest, "hour") if oldest is not None else None
+
+
+def _roll_up_views(db: Session, now_hour: datetime) -> Dict[datetime, int]:
+    total = db.scalar(select(func.coalesce(func.sum(Article.views), 0))) or 0
+    before = db.scalar(
+        select(StatsRollup.value)
+        .where(
+            StatsRollup.period == "hour",
+            StatsRollup.metric == VIEWS_TOTAL,
+            StatsRollup.bucket_start < now_hour
+        )
+        .order_by(StatsRollup.bucket_start.desc())
+        .limit(1)
+    )
+    _replace_buckets(db, "hour", VIEWS_TOTAL, now_hour, {now_hour: total})
+    # The first run only sets the baseline; deleted articles lower the total
+    # but do not count as negative views
+    return {now_hour: max(total - before, 0) if before is not None else 0}
+
+
+def roll_up(
+    now: Optional[datetime] = None,
+    on_progress: Optional[Callable[[int, Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Bring the hourly and daily rollups of every metric up to date.
+
+    Args:
+        now: Current UTC time, for tests and backfills
+        on_progress: Called with the number of metrics done and the report so far
+
+    Returns:
+        The first hour recounted and the hourly buckets stored for each metric
+    """
+    now_hour = bucket_start(now or datetime.utcnow(), "hour")
+    sources = _counted_sources()
+    report: Dict[str, Any] = {"metrics": {}}
+
+    for done, metric in enumerate(METRICS, start=1):
+        since, hourly = None, {}
+        with Session(engine) as db:
+            if metric == "views":
+                since = now_hour
+                hourly = _roll_up_views(db, now_hour)
+            elif metric in sources:
+                column, conditions = sources[metric]
+                since = _hourly_window_start(db, metric, column, conditions, now_hour)
+                if since is not None:
+                    hourly = _count_by_hour(db, column, conditions, since)
+
+            if since is not None:
+                _replace_buckets(db, "hour", metric, since, hourly)
+                day_since = bucket_start(since, "day")
+                _replace_buckets(db, "day", metric, day_since, _sum_hours_by_day(db, metric, day_since))
+                db.commit()
+
+        report["metrics"][metric] = {
+            "since": since.isoformat() if since is not None else None,
+            "hours": sum(1 for value in hourly.values() if value),
+        }
+        if on_progress:
+            on_progress(done, report)
+    return report
+
+
+def _utc(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def get_series(
+    db: Session,
+    metrics: List[str],
+    period: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Read chart series from the rollups.
+
+    Args:
+        db: Database session
+        metrics: Metrics to return, from METRICS
+        period: "hour" or "day"
+        start: First bucket (UTC unless the datetime has a timezone), truncated
+            to the period; defaults to 48 hours or 30 days before end
+        end: End of the range, exclusive; rounded up to the end of its bucket,
+            and defaults to the end of the current one
+
+    Returns:
+        The bucket start times and, per metric, the value of each bucket
+
+    Raises:
+        ValueError: For an unknown period or metric, or a range that is
+            empty or longer than STATS_SERIES_MAX_BUCKETS
+    """
+    if period not in ROLLUP_PERIODS:
+        raise ValueError(f"Unsupported period: {period}")
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+
+    step = _BUCKET_LENGTHS[period]
+    # The range ends with the bucket that contains end
+    end = _utc(end) if end else datetime.utcnow()
+    end_bucket = bucket_start(end, period)
+    end = end_bucket + step if end > end_bucket else end_bucket
+    start = bucket_start(_utc(start), period) if start else end - step * _DEFAULT_BUCKETS[period]
+    count = (end - start) // step
+    if count < 1:
+        raise ValueError("start must be before end")
+    if count > settings.STATS_SERIES_MAX_BUCKETS:
+        raise ValueError(f"At most {settings.STATS_SERIES_MAX_BUCKETS} buckets can be requested")
+
+    buckets = [start + step * index for index in range(count)]
+    positions = {bucket: index for index, bucket in enumerate(buckets)}
+    series = {metric: [0] * count for metric in metrics}
+    if metrics:
+        rows = db.execute(
+            select(StatsRollup.metric, StatsRollup.bucket_start, StatsRollup.value)
+            .where(
+                StatsRollup.period == period,
+                StatsRollup.metric.in_(metrics),
+                StatsRollup.bucket_start >= start,
+                StatsRollup.bucket_start < end
+            )
+        )
+        for metric, bucket, value in rows:
+            if bucket in positions:
+                series[metric][positions[bucket]] = value
+
+    return {
+        "period": period,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "buckets": [bucket.isoformat() for bucket in buckets],
+        "series": series,
+        "totals": {metric: sum(values) for metric, values in series.items()},
+    }
@@ -1,12 +1,92 @@
+import hashlib
+import io
 import os
+import tempfile
 import uuid
 from datetime import datetime
-import boto3
 from botocore.exceptions import ClientError
 from fastapi import UploadFile
-from typing import Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+from typing import BinaryIO, Optional, Tuple, Union
 
 from app.config import settings
+from app.database import engine
+from app.utils.blobs import BLOB_FOLDER, find_blob, hash_file, register_blob
+from app.utils.images import render_upload_variants
+from app.utils.media_inventory import record_object
+from app.utils.r2_storage import get_r2_client, get_transfer_config
+
+# Image types that get resized variants on upload (GIFs may be animated)
+RESIZABLE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+
+def shard_path(folder: str, filename: str) -> str:
+    """
+    Return the path a file is stored at: folder/ab/cd/filename.
+    
+    The two directory levels come from a hash of the filename, spreading
+    files over up to 65536 directories so none of them grows huge.
+    """
+    digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+    return f"{folder}/{digest[:2]}/{digest[2:4]}/{filename}"
+
+
+def is_sharded(relative_path: str) -> bool:
+    """Return True if a relative path already follows the shard_path layout."""
+    folder, _, filename = relative_path.replace(os.sep, "/").rpartition("/")
+    parent = folder.rsplit("/", 2)
+    return len(parent) == 3 and shard_path(parent[0], filename) == relative_path.replace(os.sep, "/")
+
+
+def unique_filename(filename: str) -> str:
+    """Return a filename that no other upload has: name_timestamp_id.ext."""
+    base, file_ext = os.path.splitext(filename)
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    unique_id = uuid.uuid4().hex[:8]
+    sanitized_name = ''.join(c for c in base if c.isalnum() or c in ['.', '_', '-']).replace(' ', '_')
+    return f"{sanitized_name}_{timestamp}_{unique_id}{file_ext.lower()}"
+
+
+class _KeepOpen:
+    """Wrap a file so closing the wrapper leaves it open; s3transfer closes what it uploads."""
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def close(self):
+        pass
+
+
+def blob_path(digest: str, file_ext: str) -> str:
+    """Return the path a file is stored at when deduplicated: blobs/ab/cd/<digest><ext>."""
+    return shard_path(BLOB_FOLDER, f"{digest}{file_ext}")
+
+
+def _find_stored_blob(digest: str) -> Optional[str]:
+    """Return the path of an already stored blob with this digest, if any."""
+    with Session(engine) as db:
+        blob = find_blob(db, digest)
+        if blob is None:
+            return None
+        path = blob.path
+        # Local files can be removed by hand; R2 is trusted so repeats skip the transfer
+        if not settings.USE_CLOUD_STORAGE and not os.path.isfile(os.path.join(settings.MEDIA_ROOT, blob.path)):
+            return None
+        # Reusing a blob makes it recent again, so media GC leaves it alone
+        # until the new reference is saved
+        blob.updated_at = datetime.utcnow()
+        db.commit()
+        return path
+
+
+def _register_blob(digest: str, path: str, size: int, content_type: Optional[str]):
+    with Session(engine) as db:
+        register_blob(db, digest, path, size, content_type)
+        db.commit()
 
 
 class StorageManager:
@@ -15,19 +95,35 @@ class StorageManager:
     or Cloudflare R2 cloud storage based on configuration.
     """
     
+    @staticmethod
+    def upload_size(file: UploadFile) -> int:
+        """Return the size of an upload in bytes without reading it."""
+        position = file.file.tell()
+        file.file.seek(0, os.SEEK_END)
+        size = file.file.tell()
+        file.file.seek(position)
+        return size
+    
     @staticmethod
     async def save_file(
         file: UploadFile, 
         folder: str = "uploads",
-        public: bool = True
+        public: bool = True,
+        content_type: Optional[str] = None
     ) -> Tuple[bool, str, Optional[str]]:
         """
         Save a file to either local filesystem or R2 based on configuration.
         
+        The upload is streamed in chunks rather than read into memory; files
+        larger than MAX_UPLOAD_SIZE_MB are rejected. With MEDIA_DEDUPLICATE,
+        files are stored under the SHA-256 of their content, and a file that
+        is already stored returns its existing path without being transferred.
+        
         Args:
             file: The FastAPI UploadFile object
-            folder: The subfolder to save the file in
+            folder: The subfolder to save the file in (without MEDIA_DEDUPLICATE)
             public: Whether the file should be publicly accessible
+            content_type: MIME type to store, if known better than the client's
             
         Returns:
             Tuple containing:
@@ -39,87 +135,144 @@ class StorageManager:
             return False, "", "No file provided"
         
         try:
-            # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            unique_id = uuid.uuid4().hex[:8]
-            file_ext = os.path.splitext(file.filename)[1].lower()
-            sanitized_name = ''.join(c for c in os.path.splitext(file.filename)[0] 
-                                     if c.isalnum() or c in ['.', '_', '-']).replace(' ', '_')
-            
-            new_filename = f"{sanitized_name}_{timestamp}_{unique_id}{file_ext}"
-            relative_path = f"{folder}/{new_filename}"
+            # Uploads are spooled to a temporary file, so their size is known up front
+            max_size = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+            size = StorageManager.upload_size(file)
+            if size > max_size:
+                return False, "", f"File is too large (max {settings.MAX_UPLOAD_SIZE_MB} MB)"
+            await file.seek(0)
             
-            # Read file content
-            file_content = await file.read()
+            file_ext = os.path.splitext(file.filename)[1].lower()
+            content_type = content_type or file.content_type
+            digest = None
+            if settings.MEDIA_DEDUPLICATE:
+                # Hash the spooled file before transferring it, so a file that is
+                # already stored is not sent again
+                digest, _ = await run_in_threadpool(hash_file, file.file)
+                stored_path = await run_in_threadpool(_find_stored_blob, digest)
+                if stored_path is not None:
+                    if settings.USE_CLOUD_STORAGE:
+                        return True, StorageManager.get_file_url(stored_path), None
+                    return True, stored_path, None
+                relative_path = blob_path(digest, file_ext)
+            else:
+                relative_path = shard_path(folder, unique_filename(file.filename))
             
             # Determine if we should use cloud storage
             if settings.USE_CLOUD_STORAGE:
-                return StorageManager._save_to_r2(
-                    file_content=file_content,
+                # boto3 blocks, so upload from a worker thread
+                result = await run_in_threadpool(
+                    StorageManager._save_to_r2,
+                    file_content=file.file,
                     relative_path=relative_path,
-                    content_type=file.content_type,
+                    content_type=content_type,
                     public=public
                 )
             else:
-                return StorageManager._save_to_local(
-                    file_content=file_content,
-                    relative_path=relative_path
+                # Disk writes block too, so they also run in a worker thread
+                result = await run_in_threadpool(
+                    StorageManager._save_to_local,
+                    file_content=file.file,
+                    relative_path=relative_path,
+                    max_size=max_size
                 )
+            
+            if result[0] and settings.USE_CLOUD_STORAGE:
+                await run_in_threadpool(record_object, relative_path, size, content_type)
+            if result[0] and digest is not None:
+                await run_in_threadpool(_register_blob, digest, relative_path, size, content_type)
+            
+            # Render the resized versions of images before they are first requested;
+            # R2 uploads are rendered from the spooled upload, local ones from the stored file
+            if result[0] and content_type in RESIZABLE_TYPES:
+                source = file.file if settings.USE_CLOUD_STORAGE else None
+                await run_in_threadpool(render_upload_variants, relative_path, source)
+            return result
                 
         except Exception as e:
             return False, "", f"Error saving file: {str(e)}"
     
     @staticmethod
-    def _save_to_local(file_content: bytes, relative_path: str) -> Tuple[bool, str, Optional[str]]:
-        """Save file to local filesystem"""
+    def _save_to_local(
+        file_content: Union[bytes, BinaryIO],
+        relative_path: str,
+        max_size: Optional[int] = None
+    ) -> Tuple[bool, str, Optional[str]]:
+        """
+        Save file to local filesystem, copying file objects in chunks.
+        
+        The file is written to a temporary name in the target directory and
+        renamed into place, so readers never see a partially written file.
+        """
+        media_dir = settings.MEDIA_ROOT
+        target_path = os.path.join(media_dir, relative_path)
+        temp_path = None
         try:
-            media_dir = settings.MEDIA_ROOT
-            target_path = os.path.join(media_dir, relative_path)
-            
             # Ensure directory exists
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            target_dir = os.path.dirname(target_path)
+            os.makedirs(target_dir, exist_ok=True)
+            
+            if isinstance(file_content, bytes):
+                file_content = io.BytesIO(file_content)
             
             # Write file
-            with open(target_path, "wb") as f:
-                f.write(file_content)
+            written = 0
+            fd, temp_path = tempfile.mkstemp(dir=target_dir, prefix=".upload-")
+            with os.fdopen(fd, "wb") as f:
+                while chunk := file_content.read(settings.UPLOAD_CHUNK_SIZE):
+                    written += len(chunk)
+                    if max_size is not None and written > max_size:
+                        raise ValueError(f"File is too large (max {max_size} bytes)")
+                    f.write(chunk)
+            # mkstemp creates the file readable by the owner only
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, target_path)
                 
             return True, relative_path, None
             
         except Exception as e:
+            # Don't leave a partial file behind
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
             return False, "", f"Error saving to local storage: {str(e)}"
     
     @staticmethod
     def _save_to_r2(
-        file_content: bytes, 
+        file_content: Union[bytes, BinaryIO], 
         relative_path: str, 
         content_type: str = "application/octet-stream",
         public: bool = True
     ) -> Tuple[bool, str, Optional[str]]:
-        """Save file to Cloudflare R2"""
+        """
+        Save file to Cloudflare R2.
+        
+        File objects are read in parts: files above R2_MULTIPART_THRESHOLD_MB
+        are sent as a multipart upload with several parts in flight at once.
+        """
         try:
-            # Set up S3 client for R2
-            s3 = boto3.client(
-                service_name='s3',
-                endpoint_url=settings.R2_ENDPOINT_URL,
-                aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-                region_name=settings.R2_REGION_NAME
-            )
+            s3 = get_r2_client()
+            
+            if isinstance(file_content, bytes):
+                file_content = io.BytesIO(file_content)
+            else:
+                # The caller still needs the upload, e.g. to render resized variants
+                file_content = _KeepOpen(file_content)
             
             # Build extra args based on whether file should be public
             extra_args = {
-                'ContentType': content_type,
+                'ContentType': content_type or "application/octet-stream",
             }
             
             if public:
                 extra_args['ACL'] = 'public-read'
             
             # Upload file to R2
-            s3.put_object(
-                Bucket=settings.R2_BUCKET_NAME,
-                Key=relative_path,
-                Body=file_content,
-                **extra_args
+            s3.upload_fileobj(
+                file_content,
+                settings.R2_BUCKET_NAME,
+                relative_path,
+                ExtraArgs=extra_args,
+                Config=get_transfer_config()
             )
             
             # Return the public URL if we have one configured, otherwise return the relative path
@@ -0,0 +1,177 @@
+from sqlmodel import Session, select, delete, insert, func, or_
+from sqlalchemy import and_
+from datetime import datetime
+from typing import Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+import uuid
+
+from app.models import Tag, ArticleTagLink
+from app.utils.query import insert_ignore
+from app.utils.text import slugify, generate_unique_slug
+
+TAG_NAME_MAX_LENGTH = 50
+
+
+def _normalize_names(tag_names: Iterable[str]) -> dict:
+    """Strip and de-duplicate tag names case-insensitively, keeping the first spelling."""
+    names = {}
+    for name in tag_names or []:
+        name = (name or "").strip()
+        if not name:
+            continue
+        if len(name) > TAG_NAME_MAX_LENGTH:
+            raise ValueError(f"Tag name is too long (max {TAG_NAME_MAX_LENGTH} characters): {name}")
+        names.setdefault(name.lower(), name)
+    return names
+
+
+def _create_tags(db: Session, names: List[str]):
+    """Insert many tags in one statement, skipping any created concurrently."""
+    # Only fetch slugs that could collide with the new ones
+    base_slugs = {name: slugify(name)[:TAG_NAME_MAX_LENGTH] or "tag" for name in names}
+    existing_slugs = set(db.execute(
+        select(Tag.slug).where(or_(*[Tag.slug.like(f"{base}%") for base in set(base_slugs.values())]))
+    ).scalars().all())
+
+    now = datetime.utcnow()
+    rows = []
+    for name in names:
+        slug = generate_unique_slug(base_slugs[name], list(existing_slugs), max_length=TAG_NAME_MAX_LENGTH)
+        existing_slugs.add(slug)
+        rows.append({
+            "id": uuid.uuid4(),
+            "name": name,
+            "slug": slug,
+            "created_at": now,
+            "updated_at": now
+        })
+
+    stmt = insert_ignore(Tag, db.get_bind().dialect.name)
+    db.execute(stmt if stmt is not None else insert(Tag), rows)
+
+
+def _find_tags(db: Session, names: dict) -> dict:
+    """
+    Return the IDs of existing tags, keyed like names.
+
+    SQL lower() only folds ASCII on some databases, so candidates are fetched
+    by exact name or SQL lower() and matched on Python's str.lower().
+    """
+    candidates = db.execute(
+        select(Tag.id, Tag.name).where(
+            or_(Tag.name.in_(names.values()), func.lower(Tag.name).in_(names.keys()))
+        )
+    ).all()
+    found = {}
+    for tag_id, name in candidates:
+        key = name.lower()
+        # Prefer the exact spelling when several tags differ only in case
+        if key in names and (key not in found or name == names[key]):
+            found[key] = tag_id
+    return found
+
+
+def resolve_tags(
+    db: Session,
+    tag_ids: Optional[Iterable[UUID]] = None,
+    tag_names: Optional[Iterable[str]] = None,
+    create_missing: bool = True
+) -> Tuple[Set[UUID], List[UUID]]:
+    """
+    Resolve tag ids and tag names to a set of existing tag IDs.
+
+    Ids are validated with one IN query. Names are matched case-insensitively
+    with one IN query and, if create_missing is set, the unknown ones are
+    created in a single bulk insert.
+
+    Args:
+        db: Database session (not committed)
+        tag_ids: IDs of existing tags
+        tag_names: Tag names, created when they don't exist yet
+        create_missing: Whether to create tags for unknown names; when not
+            set, unknown names are ignored
+
+    Returns:
+        Tuple containing:
+        - resolved (Set[UUID]): IDs of all matching tags
+        - missing (List[UUID]): Tag IDs that do not exist
+
+    Raises:
+        ValueError: If a name is too long, or a tag could not be created
+    """
+    resolved = set()
+    missing = []
+
+    tag_ids = set(tag_ids or [])
+    if tag_ids:
+        resolved = set(db.execute(select(Tag.id).where(Tag.id.in_(tag_ids))).scalars().all())
+        missing = sorted(tag_ids - resolved, key=str)
+
+    names = _normalize_names(tag_names)
+    if names:
+        found = _find_tags(db, names)
+
+        if create_missing:
+            # A second attempt picks new slugs for rows skipped because a
+            # concurrent insert took their slug
+            for _ in range(2):
+                new_names = [names[key] for key in names if key not in found]
+                if not new_names:
+                    break
+                _create_tags(db, new_names)
+                found = _find_tags(db, names)
+
+            unresolved = [names[key] for key in names if key not in found]
+            if unresolved:
+                raise ValueError(f"Could not create tags: {', '.join(unresolved)}")
+
+        resolved.update(found.values())
+
+    return resolved, missing
+
+
+def get_article_tag_ids(db: Session, article_id: UUID) -> List[UUID]:
+    """Return the IDs of the tags linked to an article without loading the tags."""
+    return db.execute(
+        select(ArticleTagLink.tag_id).where(ArticleTagLink.article_id == article_id)
+    ).scalars().all()
+
+
+def sync_article_tags(db: Session, article_id: UUID, tag_ids: Iterable[UUID]) -> Tuple[int, int]:
+    """
+    Make an article's tags match tag_ids, touching only the links that change.
+
+    Removed links are deleted in one DELETE and new links are inserted in one
+    statement, so the cost depends on the size of the change.
+
+    Args:
+        db: Database session (not committed)
+        article_id: ID of the article
+        tag_ids: IDs of the tags the article should have (must exist)
+
+    Returns:
+        Tuple containing:
+        - added (int): Number of links inserted
+        - removed (int): Number of links deleted
+    """
+    desired = set(tag_ids)
+    current = set(get_article_tag_ids(db, article_id))
+
+    to_remove = current - desired
+    to_add = desired - current
+
+    if to_remove:
+        db.execute(
+            delete(ArticleTagLink).where(
+                and_(ArticleTagLink.article_id == article_id, ArticleTagLink.tag_id.in_(to_remove))
+            )
+        )
+
+    if to_add:
+        stmt = insert_ignore(ArticleTagLink, db.get_bind().dialect.name)
+        db.execute(
+            stmt if stmt is not None else insert(ArticleTagLink),
+            [{"article_id": article_id, "tag_id": tag_id} for tag_id in to_add]
+        )
+
+    return len(to_add), len(to_remove)
@@ -0,0 +1,173 @@
+"""
+Bulk user import.
+
+Users are validated, checked against existing accounts and inserted in
+batches of USER_IMPORT_BATCH_SIZE, each batch in its own transaction. Plain
+passwords are hashed across all cores with the bulk hashing process pool;
+bcrypt hashes exported from another system are stored as they are, so
+migrations are not limited by hashing at all. Users whose username or email
+already exists are skipped, which makes re-running an interrupted import safe.
+"""
+import csv
+import json
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Union
+
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlmodel import Session
+
+from app.auth.hashing import hash_passwords, is_bcrypt_hash
+from app.config import settings
+from app.database import engine
+from app.models import User, UserImport, UserImportError, UserImportResult
+from app.utils.query import insert_ignore
+
+
+def read_import_file(path: Union[str, Path]) -> Iterator[dict]:
+    """
+    Read users from a CSV (with a header row), JSON Lines or JSON array file.
+
+    Empty CSV cells are treated as missing values.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with path.open(newline="", encoding="utf-8") as f:
+        if suffix == ".csv":
+            for row in csv.DictReader(f):
+                yield {key: value for key, value in row.items() if value not in ("", None)}
+        elif suffix in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif suffix == ".json":
+            yield from json.load(f)
+        else:
+            raise ValueError(f"Unsupported file type: {path.suffix} (use .csv, .jsonl or .json)")
+
+
+def _validation_message(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first.get("loc", ()))
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+def _insert_batch(batch: List[UserImport]) -> tuple:
+    """Insert one batch of validated users; return (created, skipped)."""
+    usernames = [user.username for user in batch]
+    emails = [user.email for user in batch]
+
+    with Session(engine) as db:
+        existing = db.execute(
+            select(User.username, User.email).where(or_(User.username.in_(usernames), User.email.in_(emails)))
+        ).all()
+        taken_usernames = {row.username for row in existing}
+        taken_emails = {row.email for row in existing}
+        new_users = [
+            user for user in batch
+            if user.username not in taken_usernames and user.email not in taken_emails
+        ]
+        if not new_users:
+            return 0, len(batch)
+
+        # Only plain passwords need hashing; do them all in one parallel pass
+        plain = [user.password for user in new_users if user.password_hash is None]
+        hashed = iter(hash_passwords(plain))
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "username": user.username,
+                "email": user.email,
+                "password": user.password_hash if user.password_hash is not None else next(hashed),
+                "is_active": user.is_active,
+                "is_superuser": user.is_superuser,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "created_at": now,
+                "updated_at": now
+            }
+            for user in new_users
+        ]
+
+        connection = db.connection()
+        stmt = insert_ignore(User, connection.dialect.name)
+        if stmt is None:
+            stmt = insert(User)
+        # Users created concurrently since the check above are skipped, not failed
+        if connection.dialect.insert_executemany_returning:
+            created = len(connection.execute(stmt.returning(User.id), rows).all())
+        else:
+            created = max(connection.execute(stmt, rows).rowcount or 0, 0)
+        db.commit()
+
+    return created, len(batch) - created
+
+
+def import_users(
+    users: Iterable[Union[dict, UserImport, Any]],
+    batch_size: Optional[int] = None,
+    on_progress: Optional[Callable[[int, UserImportResult], None]] = None
+) -> UserImportResult:
+    """
+    Import users in batches.
+
+    Args:
+        users: Users as dicts or UserImport objects; rows are numbered from 1
+            in errors, and rows that are neither are reported as invalid
+        batch_size: Users inserted per transaction (defaults to USER_IMPORT_BATCH_SIZE)
+        on_progress: Called with the number of rows processed and the result so far
+            after every batch
+
+    Returns:
+        UserImportResult with the number of users created and skipped and the
+        rows that were rejected
+    """
+    batch_size = max(batch_size or settings.USER_IMPORT_BATCH_SIZE, 1)
+    result = UserImportResult()
+    seen_usernames = set()
+    seen_emails = set()
+    batch: List[UserImport] = []
+    processed = 0
+
+    def flush():
+        created, skipped = _insert_batch(batch)
+        result.created += created
+        result.skipped += skipped
+        batch.clear()
+        if on_progress:
+            on_progress(processed, result)
+
+    for row_number, row in enumerate(users, start=1):
+        processed = row_number
+        if isinstance(row, dict):
+            username = row.get("username")
+        else:
+            username = getattr(row, "username", None)
+        if not isinstance(username, str):
+            username = None
+        try:
+            user = UserImport.model_validate(row)
+        except ValidationError as e:
+            result.errors.append(UserImportError(row=row_number, username=username, detail=_validation_message(e)))
+            continue
+
+        if user.password_hash is not None and not is_bcrypt_hash(user.password_hash):
+            result.errors.append(UserImportError(row=row_number, username=username, detail="password_hash is not a bcrypt hash"))
+            continue
+        if user.username in seen_usernames or user.email in seen_emails:
+            result.errors.append(UserImportError(row=row_number, username=username, detail="Duplicate username or email in import"))
+            continue
+        seen_usernames.add(user.username)
+        seen_emails.add(user.email)
+
+        batch.append(user)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return result
@@ -15,10 +15,9 @@ else
   echo "WARNING: ROOT_CERT environment variable not set, SSL certificate not configured"
 fi
 
-# Run migrations if needed
-# If using Alembic or other migration tools, uncomment the relevant command
-# alembic revision --autogenerate -m "Initial migration"
-# alembic upgrade head
+# Bring existing databases up to date; tables that do not exist yet are
+# created by the application on startup
+alembic upgrade head
 
 # python scripts/generate_test_data.py
 
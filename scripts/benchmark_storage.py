@@ -0,0 +1,125 @@
+"""
+Script to benchmark uploads to S3-compatible storage
+Compares creating a boto3 client for every upload (the old behaviour) with the
+shared, pooled client from app.utils.r2_storage, and reports requests per
+second and latency percentiles for each.
+
+By default it runs against a local S3 stand-in started with moto
+(pip install "moto[server]"); pass --endpoint-url to use another server such
+as MinIO, with credentials in R2_ACCESS_KEY_ID / R2_SECRET_ACCESS_KEY.
+
+Usage: python scripts/benchmark_storage.py [--uploads 500] [--concurrency 16] [--size 65536]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the parent directory to sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def start_local_s3():
+    """Start moto's S3 server on a free port and return (server, endpoint URL)."""
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit('moto is not installed: pip install "moto[server]", or pass --endpoint-url')
+
+    # Keep the server's request log out of the results
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return server, f"http://{host}:{port}"
+
+
+def run(name, upload, uploads, concurrency):
+    latencies = []
+
+    def timed_upload(i):
+        start = time.perf_counter()
+        upload(i)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed_upload, range(uploads)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:<10} {uploads / elapsed:8.1f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark uploads with per-call and pooled S3 clients")
+    parser.add_argument("--uploads", type=int, default=500, help="Uploads per run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent uploads")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="Bytes per upload")
+    parser.add_argument("--endpoint-url", default=None, help="S3 endpoint (default: local moto server)")
+    parser.add_argument("--bucket", default="benchmark", help="Bucket to upload to")
+    args = parser.parse_args(argv)
+
+    server = None
+    endpoint_url = args.endpoint_url
+    if endpoint_url is None:
+        server, endpoint_url = start_local_s3()
+
+    # Point the app's storage settings at the benchmark server before importing it
+    os.environ.update({
+        "USE_CLOUD_STORAGE": "true",
+        "R2_ENDPOINT_URL": endpoint_url,
+        "R2_BUCKET_NAME": args.bucket,
+        "R2_REGION_NAME": "us-east-1"
+    })
+    os.environ.setdefault("R2_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("R2_SECRET_ACCESS_KEY", "benchmark")
+
+    import boto3
+    from app.config import settings
+    from app.utils.r2_storage import get_r2_client
+    from app.utils.storage import StorageManager
+
+    try:
+        s3 = get_r2_client()
+        try:
+            s3.create_bucket(Bucket=args.bucket)
+        except s3.exceptions.BucketAlreadyOwnedByYou:
+            pass
+
+        body = os.urandom(args.size)
+
+        def per_call_upload(i):
+            client = boto3.client(
+                service_name="s3",
+                endpoint_url=settings.R2_ENDPOINT_URL,
+                aws_access_key_id=settings.R2_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
+                region_name=settings.R2_REGION_NAME
+            )
+            client.put_object(Bucket=args.bucket, Key=f"benchmark/per-call/{i}", Body=body)
+
+        def pooled_upload(i):
+            success, _, error = StorageManager._save_to_r2(body, f"benchmark/pooled/{i}", public=False)
+            if not success:
+                raise RuntimeError(error)
+
+        print(f"{args.uploads} uploads of {args.size} bytes, {args.concurrency} at a time, to {endpoint_url}")
+        run("per-call", per_call_upload, args.uploads, args.concurrency)
+        run("pooled", pooled_upload, args.uploads, args.concurrency)
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
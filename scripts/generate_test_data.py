@@ -10,9 +10,11 @@ from pathlib import Path
 # Add the parent directory to sys.path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel import Session, SQLModel, create_engine, select
 from app.models import User, Article, Category, Tag, Comment, Product, ArticleTagLink, ProductArticleLink
 from app.auth.utils import get_password_hash
+from app.auth.hashing import shutdown_process_pool
+from app.utils.user_import import import_users
 from app.config import settings
 from app.database import engine  # Import engine directly instead of get_engine
 from faker import Faker
@@ -42,9 +44,9 @@ def create_test_data():
             session.commit()
             print("- Admin user created")
         
-        # Create regular users
-        users = [admin]  # Start with admin
+        # Create regular users, hashing their passwords on all cores
         user_count = 50
+        rows = []
         
         for i in range(1, user_count):
             first_name = fake.first_name()
@@ -52,20 +54,21 @@ def create_test_data():
             username = f"{first_name.lower()}{i}"
             email = f"{username}@example.com"
             
-            user = User(
-                username=username,
-                email=email,
-                password=get_password_hash("password123"),
-                is_active=random.choice([True, True, True, False]),  # 75% active
-                is_superuser=random.choice([False, False, False, True]),  # 25% admin
-                first_name=first_name,
-                last_name=last_name
-            )
-            session.add(user)
-            users.append(user)
-        
-        session.commit()
-        print(f"- {user_count} users created")
+            rows.append({
+                "username": username,
+                "email": email,
+                "password": "password123",
+                "is_active": random.choice([True, True, True, False]),  # 75% active
+                "is_superuser": random.choice([False, False, False, True]),  # 25% admin
+                "first_name": first_name,
+                "last_name": last_name
+            })
+        
+        result = import_users(rows)
+        users = [admin] + session.exec(
+            select(User).where(User.username.in_([row["username"] for row in rows]))
+        ).all()
+        print(f"- {result.created} users created")
         
         # Create categories
         categories = []
@@ -187,7 +190,7 @@ def create_test_data():
                 slug=fake.slug(),
                 description=fake.paragraph(nb_sentences=5),
                 featured_image=None,
-                social_links=str(social_links).replace("'", "\"")
+                social_links=social_links
             )
             session.add(product)
             products.append(product)
@@ -210,4 +213,7 @@ def create_test_data():
 
 
 if __name__ == "__main__":
-    create_test_data() 
\ No newline at end of file
+    try:
+        create_test_data()
+    finally:
+        shutdown_process_pool() 
\ No newline at end of file
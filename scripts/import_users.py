@@ -0,0 +1,62 @@
+"""
+Script to import users from a file
+Reads users from a CSV (with a header row), JSON Lines or JSON array file and
+creates them in batches. Each user has a plain "password" or a bcrypt
+"password_hash" exported from another system; plain passwords are hashed on
+all cores. Users whose username or email already exists are skipped, so an
+interrupted import can simply be run again.
+
+Usage: python scripts/import_users.py users.csv [--batch-size 1000] [--processes 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import users from a CSV, JSON Lines or JSON file")
+    parser.add_argument("path", help="File with one user per row")
+    parser.add_argument("--batch-size", type=int, default=None, help="Users inserted per transaction")
+    parser.add_argument("--processes", type=int, default=None, help="Processes hashing passwords (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    # The hashing pool reads its size from the settings when it starts
+    if args.processes:
+        os.environ["PASSWORD_HASH_PROCESSES"] = str(args.processes)
+
+    from app.auth.hashing import shutdown_process_pool
+    from app.database import create_db_and_tables
+    from app.utils.user_import import import_users, read_import_file
+
+    create_db_and_tables()
+    start = time.perf_counter()
+
+    def report(processed, result):
+        elapsed = time.perf_counter() - start
+        print(
+            f"- {processed} rows: {result.created} created, {result.skipped} skipped, "
+            f"{len(result.errors)} rejected ({processed / elapsed:.0f} rows/s)"
+        )
+
+    try:
+        result = import_users(read_import_file(args.path), batch_size=args.batch_size, on_progress=report)
+    finally:
+        shutdown_process_pool()
+
+    for error in result.errors:
+        print(f"  row {error.row} ({error.username or 'no username'}): {error.detail}")
+    print(
+        f"Import complete: {result.created} created, {result.skipped} skipped, "
+        f"{len(result.errors)} rejected in {time.perf_counter() - start:.1f}s"
+    )
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Script to move local media files into the sharded directory layout
+Uploads used to be stored in flat folders such as media/uploads/images; new
+uploads go to folder/ab/cd/name (see app.utils.storage.shard_path). This
+script moves existing files there and rewrites the references to them in
+featured images and in article and product text.
+
+Files are first hard-linked to their new path, then the database is updated,
+and only then are the old paths removed, so the script can be interrupted and
+run again at any point.
+
+Usage: python scripts/migrate_media_layout.py [--dry-run] [--batch-size 500]
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+
+# Add the parent directory to sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlmodel import Session, select, update
+
+from app.config import settings
+from app.database import engine
+from app.models import Article, Product
+from app.utils.storage import is_sharded, shard_path
+
+# Columns that may reference media files, as a bare relative path or a /media/ URL
+REFERENCE_COLUMNS = [
+    (Article, ["featured_image", "content", "excerpt", "footer_content"]),
+    (Product, ["featured_image", "description"]),
+]
+
+_MEDIA_URL = re.compile(r"/media/([^\s\"'<>()?#]+)")
+
+
+def find_unsharded_files(media_root: str) -> dict:
+    """Map the relative path of every file outside the sharded layout to its new path."""
+    moves = {}
+    for dirpath, dirnames, filenames in os.walk(media_root):
+        # Skip hidden directories such as caches
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+        for filename in filenames:
+            if filename.startswith("."):
+                continue
+            relative_path = os.path.relpath(os.path.join(dirpath, filename), media_root).replace(os.sep, "/")
+            folder = relative_path.rpartition("/")[0]
+            # Files directly in MEDIA_ROOT were not uploaded through StorageManager
+            if folder and not is_sharded(relative_path):
+                moves[relative_path] = shard_path(folder, filename)
+    return moves
+
+
+def link_files(media_root: str, moves: dict):
+    """Make every file reachable at its new path as well as the old one."""
+    for old_path, new_path in moves.items():
+        source = os.path.join(media_root, old_path)
+        target = os.path.join(media_root, new_path)
+        if os.path.exists(target):
+            continue  # Linked by an earlier, interrupted run
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+
+def rewrite_value(value: str, moves: dict) -> str:
+    if value in moves:
+        return moves[value]
+    return _MEDIA_URL.sub(lambda match: f"/media/{moves.get(match.group(1), match.group(1))}", value)
+
+
+def rewrite_references(moves: dict, batch_size: int, dry_run: bool) -> int:
+    """Rewrite references to moved files; return the number of rows changed."""
+    changed = 0
+    for model, columns in REFERENCE_COLUMNS:
+        last_id = None
+        while True:
+            with Session(engine) as db:
+                query = select(model).order_by(model.id).limit(batch_size)
+                if last_id is not None:
+                    query = query.where(model.id > last_id)
+                rows = db.execute(query).scalars().all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                for row in rows:
+                    values = {}
+                    for column in columns:
+                        value = getattr(row, column)
+                        new_value = rewrite_value(value, moves) if value else value
+                        if new_value != value:
+                            values[column] = new_value
+                    if values:
+                        # Moving files is not an edit, so keep updated_at as it was
+                        db.execute(
+                            update(model).where(model.id == row.id).values(**values, updated_at=model.updated_at)
+                        )
+                        changed += 1
+
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+    return changed
+
+
+def remove_old_files(media_root: str, moves: dict):
+    for old_path in moves:
+        path = os.path.join(media_root, old_path)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move media files into the sharded directory layout")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without changing it")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows updated per transaction")
+    args = parser.parse_args(argv)
+
+    media_root = settings.MEDIA_ROOT
+    moves = find_unsharded_files(media_root)
+    print(f"- {len(moves)} files to move in {media_root}")
+    if not moves:
+        return
+
+    if args.dry_run:
+        for old_path, new_path in list(moves.items())[:20]:
+            print(f"  {old_path} -> {new_path}")
+        if len(moves) > 20:
+            print(f"  ... and {len(moves) - 20} more")
+        print(f"- {rewrite_references(moves, args.batch_size, dry_run=True)} rows would be updated")
+        return
+
+    link_files(media_root, moves)
+    print("- Files linked at their new paths")
+    print(f"- {rewrite_references(moves, args.batch_size, dry_run=False)} rows updated")
+    remove_old_files(media_root, moves)
+    print("- Old paths removed")
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    main()
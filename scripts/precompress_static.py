@@ -0,0 +1,101 @@
+"""
+Script to write precompressed copies of static files
+For every compressible file (CSS, JavaScript, SVG, JSON, ...) it writes
+name.gz, and name.br when the brotli package is installed, next to the
+original. CachedStaticFiles serves them to browsers that accept them; with
+STATIC_SENDFILE_HEADER set, nginx's gzip_static and brotli_static do.
+
+Copies that would not be smaller are skipped, and copies newer than their
+original are kept, so the script can run on every deploy.
+
+Usage: python scripts/precompress_static.py [--directory static] [--force]
+"""
+
+import argparse
+import gzip
+import mimetypes
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings
+from app.utils.static_files import PRECOMPRESSED, is_compressible
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Copies must save at least this fraction of the original to be kept
+MIN_SAVING = 0.05
+
+
+def compress(data: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def precompress_file(path: str, force: bool = False) -> int:
+    """Write the compressed copies of one file; returns how many were written."""
+    written = 0
+    original = os.stat(path)
+    data = None
+    for coding, suffix in PRECOMPRESSED:
+        if coding == "br" and brotli is None:
+            continue
+        target = path + suffix
+        try:
+            if not force and os.stat(target).st_mtime >= original.st_mtime:
+                continue
+        except FileNotFoundError:
+            pass
+
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        compressed = compress(data, coding)
+        if len(compressed) > len(data) * (1 - MIN_SAVING):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+
+        temp_path = f"{target}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(temp_path, target)
+        # Same mtime as the original, so the copy counts as current
+        os.utime(target, ns=(original.st_atime_ns, original.st_mtime_ns))
+        written += 1
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write gzip and brotli copies of static files")
+    parser.add_argument("--directory", default=settings.STATIC_ROOT, help="Directory to compress")
+    parser.add_argument("--force", action="store_true", help="Rewrite copies that are up to date")
+    args = parser.parse_args(argv)
+
+    if brotli is None:
+        print("- brotli is not installed; writing gzip copies only (pip install brotli)")
+
+    suffixes = tuple(suffix for _, suffix in PRECOMPRESSED)
+    files = written = 0
+    for dirpath, _, filenames in os.walk(args.directory):
+        for filename in filenames:
+            if filename.endswith(suffixes):
+                continue
+            media_type = mimetypes.guess_type(filename)[0] or ""
+            if not is_compressible(media_type):
+                continue
+            files += 1
+            written += precompress_file(os.path.join(dirpath, filename), force=args.force)
+
+    print(f"- {files} compressible files in {args.directory}, {written} copies written")
+
+
+if __name__ == "__main__":
+    main()